@@ -0,0 +1,193 @@
+import asyncio
+import json
+from typing import Any, Dict, Literal
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from mangum import Mangum
+from pydantic import BaseModel, Field
+
+from services.jobs import get_job_manager
+
+# Serviço HTTP do scorer, para outros sistemas chamarem sem passar pelo Streamlit.
+#
+#   uvicorn api:app --port 8000
+#
+# Em Lambda, use `api.handler` (adaptador do Mangum). Ele só expõe as rotas síncronas
+# (`routes`): o Mangum devolve a resposta inteira de uma vez, então o SSE não chegaria
+# em tempo real, e os jobs em segundo plano ficariam congelados entre invocações.
+#
+# O catálogo de fundos e os clientes LLM são compartilhados pelo processo
+# (workflow.get_fund_catalog / workflow.get_llm), e as execuções longas rodam no
+# mesmo JobManager usado pelo app, fora do event loop.
+
+app = FastAPI(title="Walter Intro Maker API")
+# Rotas que respondem dentro da própria requisição (servidas também pelo handler do Lambda)
+routes = APIRouter()
+
+
+class ScoreRequest(BaseModel):
+    inputs: Dict[str, Any] = Field(description="Dados da empresa e da rodada (mesmo formato do app)")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Parâmetros de geração")
+    owner: str | None = None
+    job_id: str | None = Field(default=None, description="Retoma um job interrompido (com WALTER_JOBS_CHECKPOINTS=1)")
+
+
+def _serialize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    data = {
+        "fund_names": result["fund_names"],
+        "top_funds": [
+            {"fund_name": f.fund_name, "score": f.score, "reason": f.reason}
+            for f in result["top_funds"]
+        ],
+        "plan": result.get("plan"),
+    }
+    if result.get("profile"):
+        data["profile"] = result["profile"]
+    return data
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _stream_job(job_id: str):
+    """Eventos do job em server-sent events; termina com o resultado (ou erro)."""
+    manager = get_job_manager()
+    cursor = 0
+    finished = False
+    while not finished:
+        # Espera no próprio event loop: conexões SSE abertas não ocupam threads do pool
+        events, cursor, finished = await manager.aevents_since(job_id, cursor, 15)
+        if not events and not finished:
+            yield ": keep-alive\n\n"
+        for event in events:
+            yield _sse(event["type"], event)
+
+    job = manager.get(job_id)
+    if job.result is not None:
+        yield _sse("result", _serialize_result(job.result))
+    else:
+        yield _sse("error", {"error": job.error, "status": job.status})
+
+
+@routes.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@routes.get("/metrics")
+async def metrics():
+    """Métricas dos caches em processo."""
+    from database.query_cache import get_query_cache
+    from services.attio_cache import get_record_entries_cache
+    from services.scrape_cache import get_scrape_cache
+
+    scrape_cache = get_scrape_cache()
+    return {
+        "athena_query_cache": get_query_cache().stats(),
+        "attio_record_cache": get_record_entries_cache().stats(),
+        "scrape_cache": scrape_cache.stats() if scrape_cache else None,
+    }
+
+
+@routes.post("/webhooks/attio")
+async def attio_webhook(request: Request):
+    """Invalida o cache de registros do Attio a partir dos eventos de webhook (registros, entradas e notas)."""
+    from services.attio_cache import (
+        ATTIO_WEBHOOK_SECRET,
+        get_record_entries_cache,
+        record_ids_from_webhook,
+        verify_webhook_signature,
+    )
+
+    # Sem segredo não há como autenticar quem invalida o cache
+    if not ATTIO_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook desligado: defina WALTER_ATTIO_WEBHOOK_SECRET")
+    body = await request.body()
+    if not verify_webhook_signature(body, request.headers.get("Attio-Signature")):
+        raise HTTPException(status_code=401, detail="Assinatura inválida")
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Corpo do webhook não é JSON válido")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Corpo do webhook deve ser um objeto JSON")
+    record_ids = record_ids_from_webhook(payload)
+    cache = get_record_entries_cache()
+    for record_id in record_ids:
+        cache.invalidate(record_id)
+    return {"invalidated": record_ids}
+
+
+@routes.get("/companies/lookup")
+async def lookup_company(name: str, object: Literal["companies", "people"] = "companies", additional_info: str = ""):
+    """Busca o registro no Athena/Attio (`get_record_id_from_name`)."""
+    from get_record_info import get_record_id_from_name
+
+    try:
+        return await asyncio.to_thread(get_record_id_from_name, name, object, additional_info)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Erro ao buscar informações: {e}")
+
+
+@routes.post("/scores")
+async def score_funds(request: ScoreRequest):
+    """Executa o workflow completo e retorna os fundos selecionados."""
+    manager = get_job_manager()
+    job_id = manager.submit(request.inputs, request.parameters, owner=request.owner)
+    # Aguarda o job sem ocupar nenhuma thread
+    await asyncio.wrap_future(manager.future(job_id))
+
+    job = manager.get(job_id)
+    if job.result is None:
+        raise HTTPException(status_code=500, detail=job.error or job.status)
+    return {"job_id": job_id, **_serialize_result(job.result)}
+
+
+@app.post("/scores/stream")
+async def score_funds_stream(request: ScoreRequest):
+    """Como /scores, mas envia os resultados de cada lote assim que ficam prontos (SSE)."""
+    job_id = get_job_manager().submit(request.inputs, request.parameters, owner=request.owner)
+    return StreamingResponse(_stream_job(job_id), media_type="text/event-stream", headers={"X-Job-Id": job_id})
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: ScoreRequest):
+    try:
+        job_id = get_job_manager().submit(request.inputs, request.parameters, owner=request.owner, job_id=request.job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"job_id": job_id}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, include_partial: bool = False):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    data = job.to_dict(include_partial=include_partial)
+    if job.result is not None:
+        data["result"] = _serialize_result(job.result)
+    return data
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if get_job_manager().get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return StreamingResponse(_stream_job(job_id), media_type="text/event-stream")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not get_job_manager().cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job não pode ser cancelado (já iniciado ou inexistente)")
+    return {"job_id": job_id, "status": "cancelled"}
+
+
+app.include_router(routes)
+
+lambda_app = FastAPI(title="Walter Intro Maker API (Lambda)")
+lambda_app.include_router(routes)
+handler = Mangum(lambda_app, lifespan="off")
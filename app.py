@@ -1,16 +1,13 @@
 import streamlit as st
-import pandas as pd
-import json
-import time
-from workflow import run_fund_selection_workflow, load_data
-import subprocess
-from get_record_info import get_record_id_from_name
-from langchain_openai import ChatOpenAI
-from typing import TypedDict, Optional, Dict
-from langchain.output_parsers.structured import StructuredOutputParser
+import uuid
+from typing import TypedDict, Optional
 import asyncio
-from pydantic import BaseModel
-from services.web_scraper import get_search_results
+from services import cassette
+from services.attio_compactor import compact_company_record, to_prompt_text
+from services.jobs import get_job_manager, COMPLETED, FAILED, CANCELLED
+
+# LangChain/OpenAI, pandas e o web scraper são importados dentro das funções que os
+# usam: cada worker do Streamlit só paga por eles quando o fluxo correspondente roda.
 
 # Configuração da página
 st.set_page_config(
@@ -44,6 +41,19 @@ if 'inputs' not in st.session_state:
 if 'progress' not in st.session_state:
     st.session_state.progress = None
 
+if 'session_owner' not in st.session_state:
+    st.session_state.session_owner = uuid.uuid4().hex
+
+# Jobs em segundo plano desta sessão (o id também vai para a URL para reanexar após refresh)
+if 'job_ids' not in st.session_state:
+    st.session_state.job_ids = []
+
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = st.query_params.get("job")
+    if st.session_state.job_id:
+        st.session_state.job_ids.append(st.session_state.job_id)
+        st.session_state.progress = "running"
+
 if 'company_data' not in st.session_state:
     st.session_state.company_data = {
         "company": "",
@@ -75,14 +85,31 @@ class CompanyInfo(TypedDict):
     industry: str
     observations: str
 
+# Resumo do perfil de um run (services/profiling.py): tempo, memória e maiores alocações por etapa
+def show_profile(profile):
+    with st.expander("Perfil (CPU/alocações)"):
+        st.dataframe(
+            [{k: v for k, v in stage.items() if k != "top"} for stage in profile["stages"]],
+            hide_index=True,
+        )
+        for stage in profile["stages"]:
+            if stage["top"]:
+                st.caption(f"Maiores alocações em {stage['stage']}")
+                st.dataframe(stage["top"], hide_index=True)
+        st.caption("Arquivos: " + ", ".join(f"`{path}`" for path in profile["files"].values()))
+
 # Função para extrair informações da empresa usando LLM
-def extract_company_info(company_record):
+async def aextract_company_info(company_record):
 
+    from langchain_openai import ChatOpenAI
+
+    # Só os valores preenchidos, com nomes legíveis, e as notas mais recentes
+    company_record = to_prompt_text(compact_company_record(company_record))
     print(f"Company record: {company_record}")
     llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
     
     # Configurar LLM para retornar saída estruturada
-    llm = llm.with_structured_output(CompanyInfo)
+    llm = cassette.wrap_llm(llm.with_structured_output(CompanyInfo), "extract_company_info")
     
     prompt = f"""
     Baseado nas informações da empresa a seguir, extraia dados para preencher um formulário.
@@ -105,7 +132,7 @@ def extract_company_info(company_record):
     
     # O LLM já retornará diretamente a estrutura definida em CompanyInfo
     try:
-        company_data = llm.invoke(prompt)
+        company_data = await llm.ainvoke(prompt)
 
         print(f"Company data: {company_data}")
                 
@@ -129,52 +156,6 @@ def extract_company_info(company_record):
             "observations": f"Erro ao processar: {str(e)}"
         }
 
-# Adicionar após a definição da classe CompanyInfo
-async def enrich_company_information(company_name: str, industry: str) -> dict:
-
-    class Query(BaseModel):
-        query_name: str
-        query_market: str
-
-    # Criar queries para busca
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
-    
-    query_prompt = f"""
-    Crie duas queries de busca diferentes para obter informações sobre:
-    1. Uma query que me dá informações sobre {company_name}
-    2. Uma query que me dá estatísticas quantitativas sobre o mercado {industry}
-    
-    Retorne apenas as duas queries, uma por linha, sem numeração ou texto adicional.
-    """
-    
-    queries = llm.with_structured_output(Query).invoke(query_prompt)
-    company_query, market_query = queries.query_name, queries.query_market
-    
-    # Realizar web scraping
-    company_results = await get_search_results(company_query, max_results=2)
-    market_results = await get_search_results(market_query, max_results=4)
-    
-    # Consolidar informações usando LLM
-    consolidation_prompt = f"""
-    Analise as informações coletadas e crie um resumo estruturado.
-    
-    Informações da empresa:
-    {json.dumps(company_results, indent=2)}
-    
-    Informações do mercado:
-    {json.dumps(market_results, indent=2)}
-    
-    Formate o resumo em tópicos separados para Empresa e Mercado.
-    """
-    
-    summary = llm.invoke(consolidation_prompt)
-    
-    return {
-        "company_info": company_results,
-        "market_info": market_results,
-        "summary": summary
-    }
-
 with tab1:
     # Campo para buscar empresa por nome
     company_name = st.text_input("Buscar empresa por nome", value=st.session_state.company_data["company"])
@@ -183,37 +164,77 @@ with tab1:
     check = st.checkbox("Enrich with web search (takes more time, not performing well yet)")
     
     if st.button("Buscar informações"):
+        from services.company_pipeline import run_company_pipeline
+
         try:
-            with st.spinner("Buscando informações da empresa..."):
-                # Obter informações da empresa usando a função get_record_id_from_name
-                company_record = get_record_id_from_name(company_name, "companies")
-                
-                # Extrair informações relevantes usando LLM
-                company_info = extract_company_info(company_record)
-                
-                # Atualizar o estado da sessão com as informações obtidas
-                st.session_state.company_data.update({
-                    "company": company_name,
-                    **company_info
-                })
-            if check:
+            status = st.status("Buscando informações da empresa...", expanded=False)
+            stage_labels = {
+                "lookup": "Registro encontrado no Athena/Attio",
+                "extract": "Dados do formulário extraídos",
+                "queries": "Queries de busca geradas",
+                "search_company": "Busca sobre a empresa concluída",
+                "search_market": "Busca sobre o mercado concluída",
+                "summary": "Resumo da web gerado",
+            }
+
+            def on_stage(name, timing):
+                status.write(f"{stage_labels.get(name, name)} ({timing['duration']:.1f}s)")
+
+            async def search_company():
+                from services.web_scraper import get_web_scraper
+
+                try:
+                    return await run_company_pipeline(
+                        company_name,
+                        aextract_company_info,
+                        enrich=check,
+                        # O setor do formulário é o da última busca: só vale como dica se for a mesma empresa
+                        industry_hint=(st.session_state.company_data.get("industry", "")
+                                       if st.session_state.company_data.get("company") == company_name else ""),
+                        on_stage=on_stage,
+                        profile=st.session_state.parameters.get("profile"),
+                    )
+                finally:
+                    # A sessão do scraper pertence a este event loop, que termina aqui
+                    await get_web_scraper().close_session()
+
+            # Busca do registro, extração e (opcionalmente) buscas na web em um único event loop
+            pipeline = asyncio.run(search_company())
+            company_info = pipeline["company_info"]
+            timings = pipeline["timings"]
+            status.update(label=f"Informações obtidas em {timings['total']:.1f}s", state="complete")
+
+            # Atualizar o estado da sessão com as informações obtidas
+            st.session_state.company_data.update({
+                "company": company_name,
+                **company_info
+            })
+
+            with st.expander("Tempo por etapa"):
+                st.dataframe(
+                    [{"etapa": name, **timing} for name, timing in sorted(timings["stages"].items(), key=lambda item: item[1]["start"])],
+                    hide_index=True,
+                )
+            if pipeline["profile"]:
+                show_profile(pipeline["profile"])
+
+            enriched_info = pipeline["enriched"]
+            if enriched_info is not None:
                 with st.expander("Informações Adicionais"):
-                    with st.spinner("Buscando informações complementares..."):
-                        enriched_info = asyncio.run(enrich_company_information(company_name, company_info))
-                        
+                    if "error" in enriched_info:
+                        st.warning(f"Não foi possível buscar informações complementares: {enriched_info['error']}")
+                    else:
                         # Exibir resultados
                         st.text("Informações coletadas da web:")
                         st.markdown(enriched_info["summary"].content)
-                        
+
                         st.write("Fontes sobre a empresa:")
                         for result in enriched_info["company_info"]:
                             st.write(f"- [{result.get('title', 'Link')}]({result.get('url', '#')})")
-                    
+
                         st.write("Fontes sobre o mercado:")
                         for result in enriched_info["market_info"]:
                             st.write(f"- [{result.get('title', 'Link')}]({result.get('url', '#')})")
-                        
-                        
 
                         st.success(f"Informações de {company_name} encontradas e preenchidas!")
         except Exception as e:
@@ -301,7 +322,16 @@ with tab1:
             }
             
             # Iniciar processamento em segundo plano e mudar para a aba de resultados
-            st.session_state.progress = "starting"
+            job_id = get_job_manager().submit(
+                st.session_state.inputs,
+                st.session_state.parameters,
+                owner=st.session_state.session_owner
+            )
+            st.session_state.job_id = job_id
+            st.session_state.job_ids.append(job_id)
+            st.query_params["job"] = job_id
+            st.session_state.results = None
+            st.session_state.progress = "running"
             st.rerun()
 
 
@@ -310,7 +340,14 @@ with tab2:
     
     # Formulário para parâmetros
     with st.form("parameters_form"):
-        batch_size = st.slider("Batch Size", 1, 50, int(st.session_state.parameters.get("batch_size", 10)))
+        auto_tune = st.checkbox("Auto-tune batch size and workers", value=st.session_state.parameters.get("auto_tune", False),
+                                help="Escolhe lotes e workers pelo tempo de lote aprendido nas execuções anteriores")
+        col_target, col_cost = st.columns(2)
+        target_seconds = col_target.number_input("Target time (s)", min_value=10, value=int(st.session_state.parameters.get("target_seconds", 120)))
+        max_cost = col_cost.number_input("Cost budget (USD, 0 = no limit)", min_value=0.0,
+                                         value=float(st.session_state.parameters.get("max_cost", 0.0)), step=0.5)
+        batch_size = st.slider("Batch Size", 1, 50, int(st.session_state.parameters.get("batch_size", 10)),
+                               disabled=auto_tune, help="Ignorado com o auto-tune")
         surviving_percentage = st.slider("Survival Percentage", 0.1, 1.0, float(st.session_state.parameters.get("surviving_percentage", 1)), 0.1)
         
         # Adicionar campo para ID do Google Doc
@@ -321,63 +358,108 @@ with tab2:
         params_submitted = st.form_submit_button("Save Parameters")
 
         use_docs = st.checkbox("Use Google Docs", value=st.session_state.parameters.get("use_docs", False))
+        profile = st.checkbox("Profile runs (CPU/allocations)", value=st.session_state.parameters.get("profile", False),
+                              help="Grava speedscope, flamegraph e alocações por etapa em WALTER_PROFILE_DIR (deixa o run mais lento)")
         
         if params_submitted:
             st.session_state.parameters = {
                 "batch_size": batch_size,
                 "surviving_percentage": surviving_percentage,
                 "gdoc_id": gdoc_id,  # Adicionar o ID do Google Doc aos parâmetros
-                "use_docs": use_docs
+                "use_docs": use_docs,
+                "profile": profile,
+                "auto_tune": auto_tune,
+                "target_seconds": target_seconds,
+                "max_cost": max_cost,
             }
             
             st.success("Parâmetros salvos com sucesso!")
 
+    from services.batch_planner import get_batch_planner
+
+    latency_profiles = get_batch_planner().profiles()
+    if latency_profiles:
+        with st.expander("Latency profiles (seconds per batch = a + b × batch size)"):
+            st.dataframe(latency_profiles, hide_index=True)
+
 st.subheader("Analysis Results")
 
 st.info("This demo takes a while to run since it runs fund by fund. Please be patient.")
 
-# Verificar se o processamento deve começar
-if st.session_state.progress == "starting" and st.session_state.inputs:
-    # Container para exibir progresso
-    progress_container = st.empty()
-    status_container = st.empty()
-    
-    # Mostrar processo de execução
-    try:
+# Acompanhar o job em execução (o workflow roda fora do script do Streamlit). Só o painel
+# é reexecutado a cada 2s; o app inteiro roda de novo quando o job termina.
+@st.fragment(run_every=2)
+def job_panel():
+    job = get_job_manager().get(st.session_state.job_id)
 
-        # Carregar dados
-        status_container.info("Loading data...")
-        progress_container.progress(10)
-        
-        # Processar seleção de fundos
-        status_container.info("Analyzing compatible funds...")
-        progress_container.progress(30)
-        
-        # Chamar a função do workflow
-        results = run_fund_selection_workflow(
-            st.session_state.inputs, 
-            st.session_state.parameters
-        )
-        
-        progress_container.progress(100)
-        status_container.success("Processing completed!")
-        
+    if job is None:
+        st.session_state.job_error = "Job não encontrado (o servidor pode ter sido reiniciado)."
+    elif job.status == COMPLETED:
         # Armazenar resultados
-        st.session_state.results = results
+        st.session_state.results = job.result
         st.session_state.progress = "completed"
-        
-        # Recarregar para exibir resultados completos
         st.rerun()
-        
-    except Exception as e:
-        status_container.error(f"Error during processing: {str(e)}")
-        st.session_state.progress = None
+    elif job.status in (FAILED, CANCELLED):
+        st.session_state.job_error = f"Error during processing: {job.error or job.status}"
+    else:
+        stage_labels = {
+            None: "Waiting for a worker...",
+            "load": "Loading data...",
+            "filter": "Filtering funds...",
+            "score": "Analyzing compatible funds...",
+            "normalize": "Normalizing scores...",
+            "select": "Selecting funds...",
+        }
+        st.info(stage_labels.get(job.stage, job.stage))
+        if job.plan:
+            st.caption(f"Plan: batches of {job.plan['batch_size']}, {job.plan['max_workers']} workers "
+                       f"— predicted {job.plan['predicted_seconds']:.0f}s ({job.plan['reason']})")
+        st.progress(job.progress, text=f"{job.batches_done}/{job.total_batches or '?'} batches")
+        st.caption(f"Job {job.id}")
+
+        if job.partial_results:
+            import pandas as pd
+
+            partial_df = pd.DataFrame(job.partial_results).sort_values("score", ascending=False)
+            with st.expander(f"Partial results ({len(partial_df)} funds scored so far)"):
+                st.dataframe(partial_df)
+        return
+
+    # Job encerrado sem resultado: o erro é mostrado pelo app fora do painel
+    st.session_state.progress = None
+    if job is None:
+        st.session_state.job_id = None
+    st.rerun()
+
+if st.session_state.get("job_error"):
+    st.error(st.session_state.pop("job_error"))
+
+if st.session_state.progress == "running" and st.session_state.job_id:
+    job_panel()
+
+# Outros jobs desta sessão (vários podem rodar em paralelo)
+if len(st.session_state.job_ids) > 1:
+    with st.expander("Runs in this session"):
+        for other_id in reversed(st.session_state.job_ids):
+            other = get_job_manager().get(other_id)
+            if other is None:
+                continue
+            col_status, col_button = st.columns([4, 1])
+            col_status.write(f"`{other.id[:8]}` — {other.status} ({other.batches_done}/{other.total_batches or '?'} batches)")
+            if other.id != st.session_state.job_id and col_button.button("Open", key=f"open_{other.id}"):
+                st.session_state.job_id = other.id
+                st.query_params["job"] = other.id
+                st.session_state.results = None
+                st.session_state.progress = "running"
+                st.rerun()
 
 # Exibir resultados se disponíveis
 if st.session_state.results:
     # Exibir tabela com os melhores fundos
     st.subheader("Selected Funds")
     
+    import pandas as pd
+
     # Criar DataFrame para exibição
     fund_data = []
     for fund in st.session_state.results["top_funds"]:
@@ -399,6 +481,22 @@ if st.session_state.results:
         mime="text/csv"
     )
 
+    plan = st.session_state.results.get("plan")
+    if plan:
+        with st.expander("Batch plan: predicted vs actual"):
+            col_size, col_predicted, col_actual, col_cost = st.columns(4)
+            col_size.metric("Batch size × workers", f"{plan['batch_size']} × {plan['max_workers']}")
+            col_predicted.metric("Predicted", f"{plan['predicted_seconds']:.0f}s")
+            if plan.get("actual_seconds") is not None:
+                col_actual.metric("Actual", f"{plan['actual_seconds']:.0f}s",
+                                  delta=f"{plan['actual_seconds'] - plan['predicted_seconds']:+.0f}s", delta_color="inverse")
+            if plan.get("predicted_cost") is not None:
+                col_cost.metric("Predicted cost", f"US$ {plan['predicted_cost']:.2f}")
+            st.caption(f"{plan['model']}: {plan['reason']}")
+
+    if st.session_state.results.get("profile"):
+        show_profile(st.session_state.results["profile"])
+
 elif st.session_state.progress is None:
     st.info("Fill in the company information and click 'Generate Introduction' to analyze compatible funds.")
 
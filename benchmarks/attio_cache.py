@@ -0,0 +1,74 @@
+"""
+Cache por registro do Attio (services/attio_cache.py) contra o servidor falso de attio_fanout.py.
+
+    python benchmarks/attio_cache.py --latency 0.08
+
+Percorre os casos do cache e mostra tempo e requisições de cada um:
+miss, hit em memória, revalidação sem mudança (304), revalidação com mudança
+(nota nova), invalidação explícita e hit em disco após "reiniciar" o processo.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lists", type=int, default=8)
+    parser.add_argument("--notes", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--ttl", type=float, default=0.5)
+    parser.add_argument("--no-etags", action="store_true", help="Servidor sem ETag: revalida pelo hash da página")
+    parser.add_argument("--port", type=int, default=8798)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        "ATTIO_BASE_URL": base_url,
+        "ATTIO_API_KEY": "test",
+        "WALTER_CASSETTE_MODE": "off",
+        "WALTER_ATTIO_CACHE_PATH": str(Path(tempfile.mkdtemp()) / "attio_records.sqlite"),
+        "WALTER_ATTIO_CACHE_TTL": str(args.ttl),
+    })
+
+    from attio_fanout import RECORD_ID, MockAttio
+
+    server = MockAttio(args.lists, args.notes, args.latency, handshake=0, etags=not args.no_etags)
+    server.start(args.port)
+
+    from services.attio_cache import RecordEntriesCache, get_record_entries_cache
+    from services.find_record import _fetch_record_entries, list_record_entries
+
+    def step(label, fn=lambda: list_record_entries(RECORD_ID, "companies")):
+        server.reset()
+        start = time.perf_counter()
+        result = fn()
+        print(f"{label:>32}: {(time.perf_counter() - start) * 1000:7.1f} ms | requisições {server.requests:3d} | "
+              f"notas {len(result[-1])}")
+        return result
+
+    step("miss")
+    step("hit (memória)")
+    time.sleep(args.ttl)
+    step("TTL vencido, nada mudou")
+    server.add_note("Reunião nova")
+    time.sleep(args.ttl)
+    result = step("TTL vencido, nota nova")
+    assert result[-1][0]["title"] == "Reunião nova", "a revalidação não detectou a nota nova"
+    get_record_entries_cache().invalidate(RECORD_ID)
+    step("após invalidate()")
+
+    restarted = RecordEntriesCache(path=os.environ["WALTER_ATTIO_CACHE_PATH"], ttl=args.ttl)
+    step("novo processo (disco)", lambda: restarted.get_or_fetch(
+        RECORD_ID, "companies", lambda: _fetch_record_entries(RECORD_ID, "companies")
+    ))
+    print(f"métricas: {get_record_entries_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Busca de entradas + notas no Attio contra um servidor falso local.
+
+    python benchmarks/attio_fanout.py --lists 8 --latency 0.08 --handshake 0.05 --repeat 5
+
+O servidor (aiohttp) imita /v2/lists, /v2/objects/{object}/records/{id}/entries, /v2/lists/{slug}/entries/{id}
+e /v2/notes com paginação limit/offset (e ETag nas listagens). Cada requisição espera --latency e a primeira de
+cada conexão TCP espera também --handshake (custo de um handshake TLS novo).
+
+Compara o fluxo antigo (requests.get sequencial, sem sessão) com o cliente síncrono
+(sessão com pool + threads) e o assíncrono (aiohttp), e reporta conexões abertas.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+RECORD_ID = "00000000-0000-0000-0000-000000000001"
+
+
+class MockAttio:
+    def __init__(self, lists, notes, latency, handshake, etags=True):
+        self.lists = json.loads((Path(__file__).resolve().parents[1] / "services" / "lists.json").read_text())["data"]
+        slugs = [list_["api_slug"] for list_ in self.lists]
+        self.entries = [
+            {"list_api_slug": slugs[i % len(slugs)], "entry_id": f"entry-{i}", "created_at": f"2025-01-{i % 28 + 1:02d}",
+             "list_id": f"list-{i}"}
+            for i in range(lists)
+        ]
+        self.notes = [{"id": f"note-{i}", "title": f"Note {i}", "content_plaintext": "..." * 20} for i in range(notes)]
+        self.latency = latency
+        self.handshake = handshake
+        self.etags = etags
+        self.requests = 0
+        self.connections = set()
+
+    async def _delay(self, request):
+        self.requests += 1
+        transport = id(request.transport)
+        if transport not in self.connections:
+            self.connections.add(transport)
+            await asyncio.sleep(self.handshake)
+        await asyncio.sleep(self.latency)
+
+    @staticmethod
+    def _page(items, request):
+        limit = int(request.query.get("limit", len(items) or 1))
+        offset = int(request.query.get("offset", 0))
+        return items[offset:offset + limit]
+
+    def _list_response(self, items, request):
+        """Página com ETag; responde 304 se o If-None-Match ainda vale."""
+        from aiohttp import web
+        body = json.dumps({"data": self._page(items, request)})
+        etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:16] + '"'
+        if self.etags and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        headers = {"ETag": etag} if self.etags else {}
+        return web.Response(text=body, content_type="application/json", headers=headers)
+
+    async def record_entries(self, request):
+        await self._delay(request)
+        return self._list_response(self.entries, request)
+
+    async def entry(self, request):
+        from aiohttp import web
+        await self._delay(request)
+        entry_id = request.match_info["entry_id"]
+        return web.json_response({"data": {"entry_id": entry_id, "entry_values": {"status": [{"value": "open"}]}}})
+
+    async def lists_handler(self, request):
+        from aiohttp import web
+        await self._delay(request)
+        return web.json_response({"data": self.lists})
+
+    async def notes_handler(self, request):
+        await self._delay(request)
+        return self._list_response(self.notes, request)
+
+    def add_note(self, title):
+        self.notes.insert(0, {"id": f"note-{len(self.notes)}", "title": title, "content_plaintext": title})
+
+    def start(self, port):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/v2/objects/{object}/records/{record_id}/entries", self.record_entries)
+        app.router.add_get("/v2/lists/{slug}/entries/{entry_id}", self.entry)
+        app.router.add_get("/v2/notes", self.notes_handler)
+        app.router.add_get("/v2/lists", self.lists_handler)
+
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            runner = web.AppRunner(app)
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+
+    def reset(self):
+        self.requests = 0
+        self.connections = set()
+
+
+def sequential_baseline(base_url):
+    """Fluxo anterior: um requests.get novo por chamada, detalhes e notas em sequência (sem paginação)."""
+    import requests
+
+    entries = requests.get(f"{base_url}/v2/objects/companies/records/{RECORD_ID}/entries").json()["data"]
+    latest = {}
+    for entry in entries:
+        latest.setdefault(entry["list_api_slug"], entry)
+    for slug, entry in latest.items():
+        entry["details"] = requests.get(f"{base_url}/v2/lists/{slug}/entries/{entry['entry_id']}").json()["data"]
+    notes = requests.get(f"{base_url}/v2/notes", params={"parent_object": "companies", "parent_record_id": RECORD_ID}).json()["data"]
+    return list(latest.values()) + [notes]
+
+
+def measure(label, fn, server, repeat):
+    times = []
+    server.reset()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    print(
+        f"{label:>22}: média {statistics.mean(times) * 1000:.0f} ms | mín {min(times) * 1000:.0f} ms | "
+        f"requisições {server.requests // repeat}/busca | conexões {len(server.connections)} em {repeat} buscas"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lists", type=int, default=8, help="Listas em que o registro está")
+    parser.add_argument("--notes", type=int, default=120, help="Notas do registro (paginadas de 50 em 50)")
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--handshake", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        "ATTIO_BASE_URL": base_url, "ATTIO_API_KEY": "test", "WALTER_CASSETTE_MODE": "off", "WALTER_ATTIO_CACHE": "0",
+    })
+
+    server = MockAttio(args.lists, args.notes, args.latency, args.handshake)
+    server.start(args.port)
+
+    from services.attio_client import AsyncAttioClient
+    from services.find_record import alist_record_entries, list_record_entries
+
+    measure("sequencial (antigo)", lambda: sequential_baseline(base_url), server, args.repeat)
+    sync_result = measure("cliente síncrono", lambda: list_record_entries(RECORD_ID, "companies"), server, args.repeat)
+
+    async def run_async():
+        async with AsyncAttioClient() as client:
+            times = []
+            server.reset()
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = await alist_record_entries(RECORD_ID, "companies", client)
+                times.append(time.perf_counter() - start)
+            return result, times
+
+    async_result, times = asyncio.run(run_async())
+    print(
+        f"{'cliente assíncrono':>22}: média {statistics.mean(times) * 1000:.0f} ms | mín {min(times) * 1000:.0f} ms | "
+        f"requisições {server.requests // args.repeat}/busca | conexões {len(server.connections)} em {args.repeat} buscas"
+    )
+    print(f"notas completas (paginadas): {len(sync_result[-1])} de {args.notes} | resultados iguais: {sync_result == async_result}")
+
+
+if __name__ == "__main__":
+    main()
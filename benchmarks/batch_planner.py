@@ -0,0 +1,81 @@
+"""
+Auto-tune de batch_size/max_workers (services/batch_planner.py): previsto x real.
+
+    python benchmarks/batch_planner.py --funds 600 --runs 6 --target 60 --true-a 6 --true-b 0.4
+
+Simula um modelo cujo lote leva true-a + true-b·tamanho segundos (±15% de ruído),
+executado como no workflow: o primeiro lote sozinho e o resto em ondas de max_workers.
+A cada run o planner escolhe o plano para o prazo --target com o perfil aprendido
+até ali, a execução simulada é registrada e o perfil é atualizado. Compara com o
+padrão fixo (lotes de 10, 4 workers).
+
+No fim roda o workflow de verdade uma vez com o LLM falso (WALTER_FAKE_LLM) e
+auto_tune, e mostra o plano devolvido no resultado.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def simulate(rng, funds, batch_size, max_workers, a, b):
+    """Tempo de parede e (tamanho, segundos) de cada lote."""
+    sizes = [min(batch_size, funds - i) for i in range(0, funds, batch_size)]
+    timings = [(size, (a + b * size) * rng.uniform(0.85, 1.15)) for size in sizes]
+    elapsed = timings[0][1] if timings else 0.0
+    rest = [seconds for _, seconds in timings[1:]]
+    for i in range(0, len(rest), max_workers):
+        elapsed += max(rest[i:i + max_workers])
+    return elapsed, timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--funds", type=int, default=600)
+    parser.add_argument("--runs", type=int, default=6)
+    parser.add_argument("--target", type=float, default=60)
+    parser.add_argument("--true-a", type=float, default=6.0)
+    parser.add_argument("--true-b", type=float, default=0.4)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    os.environ["WALTER_BATCH_PROFILE_PATH"] = str(workdir / "batch_profile.json")
+
+    from services.batch_planner import BatchPlanner
+
+    rng = random.Random(5)
+    planner = BatchPlanner(str(workdir / "simulado.json"))
+    model = "o3-mini"
+    prompt_tokens, tokens_per_fund = 900, 60
+
+    fixed, _ = simulate(rng, args.funds, 10, 4, args.true_a, args.true_b)
+    print(f"fixo (10 x 4 workers): {fixed:6.1f}s, {math.ceil(args.funds / 10)} chamadas")
+    for run in range(1, args.runs + 1):
+        plan = planner.plan(args.funds, model, target_seconds=args.target,
+                            prompt_tokens=prompt_tokens, tokens_per_fund=tokens_per_fund)
+        actual, timings = simulate(rng, args.funds, plan.batch_size, plan.max_workers, args.true_a, args.true_b)
+        planner.record(model, timings)
+        a, b = planner.latency(model)
+        print(f"run {run}: lotes de {plan.batch_size:2d} x {plan.max_workers:2d} workers ({plan.batches:3d} chamadas) | "
+              f"previsto {plan.predicted_seconds:6.1f}s | real {actual:6.1f}s | US$ {plan.predicted_cost:.3f} | "
+              f"perfil a={a:.2f} b={b:.3f}")
+
+    from load_test_api import INPUTS, write_catalog
+
+    write_catalog(workdir / "funds.csv", args.funds)
+    os.environ.update({"WALTER_FAKE_LLM": "1", "WALTER_FAKE_LLM_LATENCY": "0.05",
+                       "WALTER_FUNDS_CSV": str(workdir / "funds.csv")})
+    from workflow import run_fund_selection_workflow
+
+    for _ in range(2):
+        result = run_fund_selection_workflow(INPUTS, {"auto_tune": True, "target_seconds": 2, "surviving_percentage": 0.5})
+        print(f"\nworkflow (LLM falso): {result['plan']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Latência do checkpointer com várias threads do LangGraph ao mesmo tempo: DynamoDBSaver
+chamado de dentro do event loop x AsyncDynamoDBSaver.
+
+    python benchmarks/checkpoint_async.py --threads 32 --rtt 0.01
+
+Usa o moto (DynamoDB em memória) com --rtt segundos de atraso em cada chamada,
+simulando a ida e volta até o DynamoDB. Cada thread do LangGraph faz o ciclo de um
+passo: aput do checkpoint, aput_writes de 3 writes, aget_tuple por id e aget_tuple
+do último checkpoint. Com o saver síncrono as chamadas bloqueiam o event loop e
+rodam uma de cada vez; com o assíncrono rodam no pool de threads e o aget_tuple por
+id lê checkpoint e writes em paralelo.
+
+"passo completo" é o tempo até cada thread terminar o passo, contado a partir do
+início de todas. O moto roda no mesmo processo e disputa o GIL com as threads do
+pool, então as latências por operação do saver assíncrono ficam infladas aqui; o
+DynamoDB real (ou o Local, via HTTP) não tem esse custo no cliente.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def with_rtt(saver, rtt):
+    """Faz cada chamada ao DynamoDB dos recursos do saver esperar rtt segundos."""
+    create = saver._create_resource
+
+    def create_resource():
+        resource = create()
+        resource.meta.client.meta.events.register("before-sign.dynamodb.*", lambda **kwargs: time.sleep(rtt))
+        return resource
+
+    saver._create_resource = create_resource
+    return saver
+
+
+async def langgraph_step(saver, thread_id, latencies, blocking, started):
+    from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+    async def timed(name, call):
+        start = time.perf_counter()
+        result = call() if blocking else await call()
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+    checkpoint["channel_values"] = {"batch": list(range(200))}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    put, put_writes, get_tuple = ((saver.put, saver.put_writes, saver.get_tuple) if blocking
+                                  else (saver.aput, saver.aput_writes, saver.aget_tuple))
+
+    config = await timed("put", lambda: put(config, checkpoint, {"step": 1}, {}))
+    writes = [("scores", {"fund": i, "score": i / 10}) for i in range(3)]
+    await timed("put_writes", lambda: put_writes(config, writes, "task-1"))
+    by_id = await timed("get_tuple (id)", lambda: get_tuple(config))
+    latest = await timed("get_tuple (último)", lambda: get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}))
+    assert len(by_id.pending_writes) == 3 and latest.config == by_id.config
+    # Desde o início do gather: inclui a espera enquanto o loop está bloqueado por outras threads
+    latencies.setdefault("passo completo", []).append(time.perf_counter() - started)
+
+
+async def run(label, saver, threads, blocking):
+    latencies = {}
+    start = time.perf_counter()
+    steps = [langgraph_step(saver, f"{label}-{i}", latencies, blocking, start) for i in range(threads)]
+    await asyncio.gather(*steps)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {threads} threads em {elapsed:.2f}s")
+    for name, values in latencies.items():
+        values.sort()
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"  {name:>20}: p50 {statistics.median(values) * 1000:6.1f} ms | p95 {p95 * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rtt", type=float, default=0.01)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+    from moto import mock_aws
+
+    with mock_aws():
+        from database.dynamo_db_memory import AsyncDynamoDBSaver, DynamoDBSaver, create_checkpoint_tables
+
+        create_checkpoint_tables("checkpoints", "checkpoint_writes", "us-east-1")
+        sync_saver = with_rtt(DynamoDBSaver("checkpoints", "checkpoint_writes", "us-east-1"), args.rtt)
+        async_saver = with_rtt(AsyncDynamoDBSaver("checkpoints", "checkpoint_writes", "us-east-1",
+                                                  max_concurrency=args.workers), args.rtt)
+
+        async def main_async():
+            # Aquece os recursos boto3 (um por thread do pool) antes de medir
+            await asyncio.gather(*(async_saver.aget_tuple({"configurable": {"thread_id": "warmup", "checkpoint_ns": ""}})
+                                   for _ in range(args.workers)))
+            sync_saver.get_tuple({"configurable": {"thread_id": "warmup", "checkpoint_ns": ""}})
+
+            await run("síncrono no event loop", sync_saver, args.threads, blocking=True)
+            await run("AsyncDynamoDBSaver", async_saver, args.threads, blocking=False)
+
+        asyncio.run(main_async())
+        async_saver.close()
+
+
+if __name__ == "__main__":
+    main()
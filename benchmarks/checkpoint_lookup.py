@@ -0,0 +1,194 @@
+"""
+Capacidade de leitura por busca de checkpoint por id (DynamoDBSaver.get_tuple).
+
+    python benchmarks/checkpoint_lookup.py --checkpoints 120 --size-kb 20 --lookups 30
+    python benchmarks/checkpoint_lookup.py --endpoint-url http://localhost:8000
+
+Grava uma thread com --checkpoints checkpoints de ~--size-kb KB e busca --lookups ids
+aleatórios em três situações (a compressão do saver fica desligada: o corpo de teste
+é repetitivo e viraria itens de poucos bytes, que cabem numa página só):
+
+  1. tabela no formato antigo de chave, leitura como antes (uma query com filtro):
+     lê a partição desde o início e não acha itens além da primeira página de 1 MB
+  2. a mesma tabela com o saver novo: GetItem falha e cai na query paginada (acha tudo)
+  3. depois de migrate_checkpoint_keys: um GetItem por busca
+
+Todas as chamadas ao DynamoDB saem com ReturnConsumedCapacity=TOTAL e a capacidade
+devolvida é somada. O moto não calcula capacidade real (devolve valores fixos), então
+também é mostrada a estimativa pelas regras do DynamoDB (0,5 RCU por 4 KB lidos em
+leitura eventualmente consistente, somando todos os itens percorridos pela query).
+Com --endpoint-url (DynamoDB Local ou AWS), a coluna "informado" é a capacidade real.
+"""
+import argparse
+import contextlib
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+PAGE_BYTES = 1024 * 1024
+
+
+def item_size(item):
+    """Tamanho do item pelas regras do DynamoDB (nomes + valores em UTF-8; números ~ dígitos/2 + 1)."""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode())
+        value = getattr(value, "value", value)  # Binary
+        if isinstance(value, str):
+            size += len(value.encode())
+        elif isinstance(value, bytes):
+            size += len(value)
+        elif value is None:
+            size += 1
+        else:
+            size += len(str(value)) // 2 + 1
+    return size
+
+
+def read_units(size):
+    return math.ceil(size / 4096) * 0.5
+
+
+class CapacityMeter:
+    """Pede e soma ConsumedCapacity de todas as chamadas de um cliente boto3."""
+
+    def __init__(self, client):
+        self.calls = 0
+        self.units = 0.0
+        client.meta.events.register("provide-client-params.dynamodb.*", self._request)
+        client.meta.events.register("after-call.dynamodb.*", self._response)
+
+    def _request(self, params, **kwargs):
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+    def _response(self, parsed, **kwargs):
+        self.calls += 1
+        capacity = parsed.get("ConsumedCapacity")
+        for entry in capacity if isinstance(capacity, list) else [capacity] if capacity else []:
+            self.units += entry.get("CapacityUnits", 0)
+
+    def reset(self):
+        self.calls, self.units = 0, 0.0
+
+
+def scan_all(table):
+    response = table.scan()
+    items = response["Items"]
+    while "LastEvaluatedKey" in response:
+        response = table.scan(ExclusiveStartKey=response["LastEvaluatedKey"])
+        items.extend(response["Items"])
+    return items
+
+
+def to_legacy_keys(table):
+    """Regrava os itens no formato antigo de chave ("<ns>#<created_at zero-padded>")."""
+    items = scan_all(table)
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.delete_item(Key={"thread_id": item["thread_id"], "sort_key": item["sort_key"]})
+    with table.batch_writer() as batch:
+        for item in items:
+            ns = item["sort_key"].rpartition("#")[0]
+            batch.put_item(Item=dict(item, sort_key=f"{ns}#{int(item['created_at']):020d}"))
+
+
+def legacy_get(table, thread_id, checkpoint_id):
+    """Busca por id como o saver fazia antes: uma única query com filtro."""
+    from boto3.dynamodb.conditions import Attr, Key
+
+    response = table.query(
+        KeyConditionExpression=Key("thread_id").eq(thread_id) & Key("sort_key").begins_with("#"),
+        FilterExpression=Attr("checkpoint_id").eq(checkpoint_id),
+    )
+    return response["Items"][0] if response["Items"] else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoints", type=int, default=120)
+    parser.add_argument("--size-kb", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=30)
+    parser.add_argument("--endpoint-url", help="DynamoDB Local; sem isso usa o moto")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    if args.endpoint_url:
+        backend = contextlib.nullcontext()
+    else:
+        from moto import mock_aws
+        backend = mock_aws()
+
+    with backend:
+        from langgraph.checkpoint.base import empty_checkpoint, create_checkpoint
+
+        from database.checkpoint_payload import CheckpointPayloadCodec
+        from database.dynamo_db_memory import DynamoDBSaver, create_checkpoint_tables, migrate_checkpoint_keys
+
+        table_name, writes_name = f"lookup_bench_{int(time.time())}", f"lookup_bench_writes_{int(time.time())}"
+        create_checkpoint_tables(table_name, writes_name, "us-east-1", args.endpoint_url)
+        saver = DynamoDBSaver(table_name, writes_name, "us-east-1", args.endpoint_url,
+                              payload_codec=CheckpointPayloadCodec(compress_threshold=10**12))
+
+        thread_id = "lookup-demo"
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        ids = []
+        for step in range(args.checkpoints):
+            checkpoint = create_checkpoint(checkpoint, None, step)
+            checkpoint["channel_values"] = {"payload": "x" * (args.size_kb * 1024)}
+            config = saver.put(config, checkpoint, {"step": step}, {})
+            ids.append(checkpoint["id"])
+
+        sizes = [item_size(item) for item in sorted(scan_all(saver.table), key=lambda item: item["sort_key"])]
+        partition = sum(sizes)
+        print(f"{args.checkpoints} checkpoints de ~{sizes[0] / 1024:.0f} KB = {partition / 1e6:.1f} MB na partição\n")
+
+        meter = CapacityMeter(saver.dynamodb.meta.client)
+        rng = random.Random(7)
+        sample = [rng.choice(ids) for _ in range(args.lookups)]
+
+        def report(label, lookup, estimate):
+            meter.reset()
+            found = sum(lookup(checkpoint_id) is not None for checkpoint_id in sample)
+            print(f"{label:>34}: achou {found}/{len(sample)} | {meter.calls / len(sample):.1f} chamadas/busca | "
+                  f"informado {meter.units / len(sample):6.1f} RCU/busca | estimado {estimate:6.1f} RCU/busca")
+
+        to_legacy_keys(saver.table)
+        # A query antiga lê a primeira página (1 MB ou a partição inteira), ache ou não o item
+        position = {checkpoint_id: i for i, checkpoint_id in enumerate(ids)}
+        old_estimate = sum(read_units(min(partition, PAGE_BYTES)) for _ in sample)
+        report("1. formato antigo, query única",
+               lambda checkpoint_id: legacy_get(saver.table, thread_id, checkpoint_id), old_estimate / len(sample))
+
+        def paginated_estimate(checkpoint_id):
+            # Páginas inteiras de 1 MB até a que contém o item
+            read = sum(sizes[:position[checkpoint_id] + 1])
+            return read_units(min(partition, math.ceil(read / PAGE_BYTES) * PAGE_BYTES))
+
+        fallback = sum(paginated_estimate(checkpoint_id) for checkpoint_id in sample) / len(sample)
+        report("2. formato antigo, saver novo",
+               lambda checkpoint_id: saver._find_legacy_item(thread_id, "", checkpoint_id), fallback)
+
+        migrated = migrate_checkpoint_keys(table_name, "us-east-1", args.endpoint_url)
+        direct = sum(read_units(size) for size in sizes) / len(sizes)
+        report(f"3. migrado ({migrated} itens), GetItem",
+               lambda checkpoint_id: saver.table.get_item(Key={"thread_id": thread_id, "sort_key": f"#{checkpoint_id}"}).get("Item"),
+               direct)
+
+        meter.reset()
+        found = sum(saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": checkpoint_id}}) is not None
+                    for checkpoint_id in sample)
+        latest = saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+        print(f"\nget_tuple completo (checkpoint + writes): achou {found}/{len(sample)}, "
+              f"{meter.calls / (len(sample) + 1):.1f} chamadas/busca; último checkpoint correto: "
+              f"{latest.config['configurable']['checkpoint_id'] == ids[-1]}")
+
+
+if __name__ == "__main__":
+    main()
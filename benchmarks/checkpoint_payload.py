@@ -0,0 +1,119 @@
+"""
+Tamanho dos itens e unidades de escrita dos checkpoints com compressão e offload para o S3.
+
+    python benchmarks/checkpoint_payload.py --funds 200 1000 5000
+
+Roda no moto (DynamoDB + S3 em memória). Para cada tamanho de estado (tabela de
+fundos com notas, como no workflow de seleção) grava o mesmo checkpoint três vezes:
+
+  - inline: sem compressão (como antes)
+  - comprimido: binário zstd/zlib no item
+  - offload: acima do limite, o corpo vai para o S3 e o item guarda só o ponteiro
+
+e reporta o tamanho do item, as WCU estimadas (1 WCU por KB escrito), o tempo de
+put/get e se a leitura devolve o mesmo estado e os mesmos metadados. Os metadados
+são os do LangGraph, com os `writes` do nó que carregou o catálogo (a tabela inteira
+de novo), e passam pela mesma codificação do corpo. Também lê um item no formato
+antigo (string sem codificação) gravado diretamente na tabela.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.checkpoint_lookup import item_size  # noqa: E402
+
+
+def fund_state(rng, funds):
+    return {
+        "funds": [
+            {
+                "name": f"Fundo {i} Capital Partners",
+                "thesis": "Investe em empresas de tecnologia B2B em estágio seed e série A na América Latina.",
+                "sectors": rng.sample(["fintech", "saas", "marketplace", "healthtech", "edtech", "logtech"], 3),
+                "ticket_min": rng.randint(1, 20) * 100_000,
+                "ticket_max": rng.randint(20, 200) * 100_000,
+                "score": round(rng.random(), 4),
+                "reason": "Tese alinhada ao setor e ticket compatível com a rodada. " * rng.randint(1, 3),
+            }
+            for i in range(funds)
+        ],
+        "batch_index": funds // 10,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--funds", type=int, nargs="+", default=[200, 1000, 5000])
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+    from moto import mock_aws
+
+    with mock_aws():
+        import boto3
+        from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+        from database.checkpoint_payload import CheckpointPayloadCodec
+        from database.checkpoint_serde import LegacyJsonSerializer
+        from database.dynamo_db_memory import DynamoDBSaver, create_checkpoint_tables
+
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="walter-checkpoints")
+        create_checkpoint_tables("checkpoints", "checkpoint_writes", "us-east-1")
+        codecs = {
+            "inline": CheckpointPayloadCodec(compress_threshold=10**12),
+            "comprimido": CheckpointPayloadCodec(offload_threshold=10**12),
+            "offload": CheckpointPayloadCodec(offload_threshold=16 * 1024, bucket="walter-checkpoints",
+                                              region_name="us-east-1"),
+        }
+        rng = random.Random(3)
+
+        for funds in args.funds:
+            state = fund_state(rng, funds)
+            print(f"{funds} fundos:")
+            for label, codec in codecs.items():
+                saver = DynamoDBSaver("checkpoints", "checkpoint_writes", "us-east-1", payload_codec=codec)
+                config = {"configurable": {"thread_id": f"{label}-{funds}", "checkpoint_ns": ""}}
+                checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+                checkpoint["channel_values"] = state
+                # Como o LangGraph grava: os writes do passo vão nos metadados
+                metadata = {"source": "loop", "step": 1, "writes": {"load_node": state}, "parents": {}}
+
+                start = time.perf_counter()
+                try:
+                    config = saver.put(config, checkpoint, metadata, {})
+                except Exception as e:
+                    print(f"{label:>12}: falhou ({type(e).__name__}: {str(e)[:60]})")
+                    continue
+                put_ms = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                loaded = saver.get_tuple(config)
+                get_ms = (time.perf_counter() - start) * 1000
+                item = saver.table.get_item(Key={"thread_id": config["configurable"]["thread_id"],
+                                                 "sort_key": f"#{config['configurable']['checkpoint_id']}"})["Item"]
+                size = item_size(item)
+                print(f"{label:>12}: item {size / 1024:8.1f} KB | {math.ceil(size / 1024):4d} WCU | "
+                      f"put {put_ms:6.1f} ms | get {get_ms:6.1f} ms | "
+                      f"{'S3 ' if 'checkpoint_s3' in item else ''}ok={loaded.checkpoint['channel_values'] == state} "
+                      f"metadados ok={loaded.metadata == metadata}")
+
+        # Item gravado antes da compressão: string JSON sem atributo de codificação
+        saver = DynamoDBSaver("checkpoints", "checkpoint_writes", "us-east-1")
+        checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+        type_, data = LegacyJsonSerializer().dumps_typed(checkpoint)
+        saver.table.put_item(Item={"thread_id": "legacy", "sort_key": f"#{checkpoint['id']}", "checkpoint_id": checkpoint["id"],
+                                   "type": type_, "checkpoint": data, "metadata": "{}"})
+        legacy = saver.get_tuple({"configurable": {"thread_id": "legacy", "checkpoint_ns": ""}})
+        print(f"\nItem antigo lido: {legacy.checkpoint['id'] == checkpoint['id']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Simula uma queda no meio do workflow com checkpoints e retoma a execução.
+
+    python benchmarks/checkpoint_resume.py --funds 120 --batch-size 10 --crash-after 6
+
+Usa o moto (DynamoDB em memória) por padrão; com --endpoint-url aponta para um
+DynamoDB Local. O LLM é o falso (WALTER_FAKE_LLM) e o catálogo é sintético.
+Verifica que a retomada pontua apenas os lotes que ainda não tinham checkpoint:
+nenhum lote pontuado antes da queda é pontuado de novo, e os lotes das duas
+execuções cobrem todos. Lotes que estavam em andamento na hora da queda (mesma
+onda) podem terminar antes de o processo parar; esses também não se repetem: a
+retomada os repassa do checkpoint, junto com os dos passos concluídos, como eventos
+"batch" com "resumed": True.
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class SimulatedCrash(BaseException):
+    """Interrompe o grafo como uma queda do processo (não é capturada como Exception)."""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--funds", type=int, default=120)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--crash-after", type=int, default=6, help="Derruba a execução após N lotes")
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--endpoint-url", help="DynamoDB Local; sem isso usa o moto")
+    args = parser.parse_args()
+
+    from load_test_api import INPUTS, write_catalog
+
+    catalog = Path(tempfile.mkdtemp()) / "funds.csv"
+    write_catalog(catalog, args.funds)
+    os.environ.update({
+        "WALTER_FAKE_LLM": "1",
+        "WALTER_FAKE_LLM_LATENCY": str(args.latency),
+        "WALTER_FUNDS_CSV": str(catalog),
+        "AWS_ACCESS_KEY_ID": os.getenv("AWS_ACCESS_KEY_ID", "testing"),
+        "AWS_SECRET_ACCESS_KEY": os.getenv("AWS_SECRET_ACCESS_KEY", "testing"),
+        "WALTER_BATCH_PROFILE_PATH": str(catalog.parent / "batch_profile.json"),
+    })
+
+    if args.endpoint_url:
+        backend = contextlib.nullcontext()
+    else:
+        from moto import mock_aws
+        backend = mock_aws()
+
+    with backend:
+        from database.dynamo_db_memory import DynamoDBSaver, create_checkpoint_tables
+        from workflow_graph import run_fund_selection_graph
+
+        create_checkpoint_tables("checkpoints", "checkpoint_writes", "us-east-1", args.endpoint_url)
+        saver = DynamoDBSaver("checkpoints", "checkpoint_writes", "us-east-1", args.endpoint_url)
+        parameters = {"batch_size": args.batch_size, "max_workers": args.workers, "surviving_percentage": 0.5}
+
+        scored = []
+
+        def crash_after(event):
+            if event["type"] == "batch":
+                scored.append(event["batch_index"])
+                if len(scored) >= args.crash_after:
+                    raise SimulatedCrash()
+
+        thread_id = "resume-demo"
+        start = time.perf_counter()
+        try:
+            run_fund_selection_graph(INPUTS, parameters, thread_id=thread_id, checkpointer=saver,
+                                     progress_callback=crash_after)
+        except SimulatedCrash:
+            print(f"Queda simulada após {len(scored)} lotes ({time.perf_counter() - start:.2f}s)")
+
+        rescored, recovered = [], []
+
+        def track(event):
+            if event["type"] == "batch":
+                (recovered if event.get("resumed") else rescored).append(event["batch_index"])
+
+        start = time.perf_counter()
+        result = run_fund_selection_graph(
+            INPUTS, parameters, thread_id=thread_id, checkpointer=saver,
+            progress_callback=track,
+        )
+        print(f"Retomada: {len(rescored)} lotes pontuados, {len(recovered)} recuperados do checkpoint "
+              f"({time.perf_counter() - start:.2f}s), "
+              f"{len(result['fund_names'])} fundos selecionados")
+
+        total_batches = -(-args.funds // args.batch_size)
+        repeated = sorted(set(scored) & set(rescored))
+        print(f"Lotes totais: {total_batches} | antes da queda: {sorted(scored)} | após: {sorted(rescored)} | "
+              f"recuperados: {sorted(recovered)} | pontuados de novo: {repeated}")
+        if len(result["fund_names"]) == 0 or repeated or set(rescored) | set(recovered) != set(range(total_batches)):
+            print("FALHA: a retomada pontuou de novo lotes que já tinham checkpoint")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
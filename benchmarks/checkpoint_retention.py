@@ -0,0 +1,121 @@
+"""
+Chamadas ao DynamoDB por passo do grafo com write-behind e tamanho das partições com retenção.
+
+    python benchmarks/checkpoint_retention.py --steps 200 --rtt 0.005 --keep-last 10
+
+Roda no moto (DynamoDB em memória) com --rtt segundos de atraso por chamada. Simula
+--steps passos do LangGraph numa thread: put_writes de 3 writes no checkpoint atual
+e put do próximo checkpoint (~4 KB de estado). Três configurações:
+
+  - direto: um PutItem por checkpoint e um BatchWriteItem por put_writes (como antes)
+  - write-behind: itens em buffer, gravados em BatchWriteItem de 25 itens
+  - write-behind + keep_last: compactação em segundo plano a cada 10 checkpoints
+
+Reporta as chamadas por operação, o tempo total, quantos itens ficam em cada tabela
+e a leitura estimada (RCU, 0,5 por 4 KB) para percorrer a partição com list(). No
+fim confere que o último checkpoint e seus writes são lidos depois do flush e, com
+keep_last, que retomar de qualquer checkpoint mantido pela compactação (não só do
+último) ainda encontra os 3 writes pendentes dele.
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.checkpoint_lookup import item_size, read_units, scan_all  # noqa: E402
+
+
+def instrument(saver, rtt, calls):
+    """Conta as chamadas de todos os recursos do saver (um por thread) e soma rtt a cada uma."""
+    create = saver._create_resource
+
+    def create_resource():
+        resource = create()
+        events = resource.meta.client.meta.events
+        events.register("before-sign.dynamodb.*", lambda **kwargs: time.sleep(rtt))
+        events.register("after-call.dynamodb.*", lambda model, **kwargs: calls.update([model.name]))
+        return resource
+
+    saver._create_resource = create_resource
+    return saver
+
+
+def run_steps(saver, thread_id, steps):
+    from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+    config = saver.put(config, checkpoint, {"step": 0}, {})
+    for step in range(1, steps + 1):
+        writes = [("scores", {"batch": step, "fund": i, "reason": "ticket compatível " * 5}) for i in range(3)]
+        saver.put_writes(config, writes, f"task-{step}")
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        checkpoint["channel_values"] = {"batch_index": step, "scores": [{"fund": i, "score": i / 100} for i in range(60)]}
+        config = saver.put(config, checkpoint, {"step": step}, {})
+    return config, checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--rtt", type=float, default=0.005)
+    parser.add_argument("--keep-last", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+    from moto import mock_aws
+
+    with mock_aws():
+        from database.dynamo_db_memory import DynamoDBSaver, create_checkpoint_tables, enable_checkpoint_ttl
+
+        configs = {
+            "direto": {},
+            "write-behind": {"write_behind": True},
+            "write-behind + keep_last": {"write_behind": True, "keep_last": args.keep_last, "ttl_days": 30},
+        }
+        for n, (label, options) in enumerate(configs.items()):
+            tables = (f"checkpoints-{n}", f"writes-{n}")
+            create_checkpoint_tables(*tables, "us-east-1")
+            enable_checkpoint_ttl(*tables, "us-east-1")
+            calls = collections.Counter()
+            saver = instrument(DynamoDBSaver(*tables, "us-east-1", **options), args.rtt, calls)
+
+            start = time.perf_counter()
+            config, checkpoint = run_steps(saver, "run", args.steps)
+            saver.put_writes(config, [("scores", {"pending": True})], "task-final")
+            saver.close()
+            elapsed = time.perf_counter() - start
+            step_calls = dict(calls)
+
+            latest = saver.get_tuple({"configurable": {"thread_id": "run", "checkpoint_ns": ""}})
+            ok = latest.checkpoint["id"] == checkpoint["id"] and len(latest.pending_writes) == 1
+            checkpoint_items = scan_all(saver.table)
+            write_items = scan_all(saver.writes_table)
+            list_rcu = read_units(sum(item_size(item) for item in checkpoint_items))
+            print(f"{label}:")
+            print(f"  {sum(step_calls.values())} chamadas em {elapsed:.2f}s ({step_calls})")
+            print(f"  tabelas: {len(checkpoint_items)} checkpoints, {len(write_items)} writes | "
+                  f"list() completo ~{list_rcu:.1f} RCU | "
+                  f"ttl={'expires_at' in checkpoint_items[0]} | último checkpoint e writes ok={ok}")
+
+            if options.get("keep_last"):
+                saver.compact("run")
+                kept = list(saver.list({"configurable": {"thread_id": "run", "checkpoint_ns": ""}}))
+                # Retomar de um checkpoint mantido: o get_tuple do LangGraph com o id dele
+                resumable = [
+                    len(saver.get_tuple(checkpoint_tuple.config).pending_writes) == 3
+                    for checkpoint_tuple in kept[1:]
+                ]
+                print(f"  depois de compact(): {len(kept)} checkpoints mantidos | "
+                      f"retomar dos anteriores ao último com os writes pendentes ok={all(resumable)} "
+                      f"({sum(resumable)}/{len(resumable)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Tempo de encode/decode e tamanho dos formatos de checkpoint (database/checkpoint_serde.py).
+
+    python benchmarks/checkpoint_serde.py --repeat 20
+
+Três estados representativos, no formato de checkpoint do LangGraph:
+  - histórico: 300 mensagens (Human/AI) com textos de 200 a 2000 caracteres
+  - notas: tabela de 5000 fundos com notas e justificativas (como no workflow de seleção)
+  - misto: 50 mensagens + 1000 fundos
+
+Para cada formato registrado (json antigo, orjson.v1, msgpack.v1 se instalado)
+reporta encode e decode em ms e o tamanho bruto e comprimido (como o DynamoDBSaver
+grava acima do limite de compressão). Confere que o decode devolve o mesmo estado.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.checkpoint_payload import fund_state  # noqa: E402
+
+
+def history(rng, messages):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    words = "fundo rodada tese ticket setor empresa investidor mercado receita crescimento".split()
+    return [
+        (HumanMessage if i % 2 == 0 else AIMessage)(
+            " ".join(rng.choice(words) for _ in range(rng.randint(30, 300))), id=f"msg-{i}"
+        )
+        for i in range(messages)
+    ]
+
+
+def checkpoint_with(channel_values):
+    from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+    checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+    checkpoint["channel_values"] = channel_values
+    return checkpoint
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from database.checkpoint_payload import _compress, zstandard
+    from database.checkpoint_serde import SERIALIZERS, VersionedSerializer
+
+    rng = random.Random(11)
+    states = {
+        "histórico": checkpoint_with({"messages": history(rng, 300)}),
+        "notas": checkpoint_with(fund_state(rng, 5000)),
+        "misto": checkpoint_with({"messages": history(rng, 50), **fund_state(rng, 1000)}),
+    }
+    encoding = "zstd" if zstandard is not None else "zlib"
+
+    for label, checkpoint in states.items():
+        print(f"{label}:")
+        baseline = None
+        for tag in SERIALIZERS:
+            serde = VersionedSerializer(tag)
+            encode_ms, (type_, data) = timed(lambda: serde.dumps_typed(checkpoint), args.repeat)
+            decode_ms, loaded = timed(lambda: serde.loads_typed((type_, data)), args.repeat)
+            raw = data if isinstance(data, bytes) else data.encode()
+            compressed = len(_compress(raw, encoding, 3))
+            same = loaded["channel_values"] == checkpoint["channel_values"]
+            baseline = baseline or (encode_ms, decode_ms)
+            print(f"  {tag:>11}: encode {encode_ms:7.2f} ms ({baseline[0] / encode_ms:4.1f}x) | "
+                  f"decode {decode_ms:7.2f} ms ({baseline[1] / decode_ms:4.1f}x) | "
+                  f"{len(raw) / 1024:7.1f} KB ({encoding}: {compressed / 1024:6.1f} KB) | igual={same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Tokens do prompt de extract_company_info antes e depois do compactador do Attio.
+
+Com registros gravados (saídas de get_record_id_from_name salvas em JSON):
+    python benchmarks/compact_tokens.py --records registros/*.json
+
+Pelos record_ids, reproduzindo a cassette gravada:
+    WALTER_CASSETTE_MODE=replay python benchmarks/compact_tokens.py --record-id 00010e3d-74b6-4471-90c3-ba6a637f901f
+
+Sem nada, usa um registro sintético no formato da API do Attio.
+Conta tokens com o tiktoken (o200k_base, do gpt-4o-mini); sem ele, estima len/4.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text)), "tiktoken o200k_base"
+    except Exception:
+        return lambda text: len(text) // 4, "estimativa len/4"
+
+
+def _actor():
+    return {"type": "workspace-member", "id": "b4954f7c-a8a3-4502-b65d-fa26558850f7"}
+
+
+def synthetic_record(lists=6, notes=25):
+    """Registro com a estrutura real: históricos de status, atributos vazios, ids de atores..."""
+    slugs = [list_["api_slug"] for list_ in json.loads((Path(__file__).resolve().parents[1] / "services" / "lists.json").read_text())["data"]]
+    entries = []
+    for i in range(lists):
+        base = {"active_from": "2024-03-01T12:00:00.000000000Z", "created_by_actor": _actor()}
+        entry_values = {
+            "stage": [
+                {**base, "active_until": "2024-06-01T12:00:00.000000000Z", "attribute_type": "status",
+                 "status": {"id": {"status_id": "s1"}, "title": "Lead", "is_archived": False}},
+                {**base, "active_until": None, "attribute_type": "status",
+                 "status": {"id": {"status_id": "s2"}, "title": "Due diligence", "is_archived": False}},
+            ],
+            "owner": [{**base, "active_until": None, "attribute_type": "actor-reference",
+                       "referenced_actor_type": "workspace-member", "referenced_actor_id": "b4954f7c"}],
+            "round_size": [{**base, "active_until": None, "attribute_type": "currency", "currency_value": 10000000,
+                            "currency_code": "USD"}],
+            "round_type": [{**base, "active_until": None, "attribute_type": "select",
+                            "option": {"id": {"option_id": "o1"}, "title": "Series A", "is_archived": False}}],
+            "company_description": [{**base, "active_until": None, "attribute_type": "text",
+                                     "value": "AI agents that sell food for Brazilian restaurants via delivery."}],
+            "next_steps": [], "priority": [], "source": [], "co_investors": [],
+            "company": [{**base, "active_until": None, "attribute_type": "record-reference",
+                         "target_object": "companies", "target_record_id": "00010e3d"}],
+        }
+        entries.append({
+            "list_api_slug": slugs[i % len(slugs)],
+            "entry_id": f"entry-{i}",
+            "name": slugs[i % len(slugs)],
+            "details": {
+                "id": {"workspace_id": "6bfdee64", "list_id": f"list-{i}", "entry_id": f"entry-{i}"},
+                "parent_record_id": "00010e3d", "parent_object": "companies",
+                "created_at": "2024-03-01T12:00:00.000000000Z",
+                "entry_values": entry_values,
+            },
+        })
+    notes_list = [
+        {
+            "id": {"workspace_id": "6bfdee64", "note_id": f"note-{i}"},
+            "parent_object": "companies", "parent_record_id": "00010e3d",
+            "title": f"Call {i}",
+            "content_plaintext": ("Conversamos com o CEO sobre tração, unit economics e a próxima rodada. " * 30),
+            "content_markdown": ("Conversamos com o **CEO** sobre tração, unit economics e a próxima rodada. " * 30),
+            "format": "plaintext", "tags": [], "created_by_actor": _actor(),
+            "created_at": f"2024-{i % 12 + 1:02d}-01T12:00:00.000000000Z",
+        }
+        for i in range(notes)
+    ]
+    return {
+        "record_id": "00010e3d",
+        "reason": "Exact match",
+        "other_columns": {"domains": "brendi.com.br"},
+        "record_entries": entries + [notes_list],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", nargs="*", default=[], help="Arquivos JSON com saídas de get_record_id_from_name")
+    parser.add_argument("--record-id", action="append", default=[], help="record_id de empresa (via list_record_entries)")
+    args = parser.parse_args()
+
+    from services.attio_compactor import compact_company_record, to_prompt_text
+
+    records = []
+    for path in args.records:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        records.append((Path(path).name, data if isinstance(data, dict) else {"record_entries": data}))
+    if args.record_id:
+        from services.find_record import list_record_entries
+        for record_id in args.record_id:
+            records.append((record_id, {"record_id": record_id, "record_entries": list_record_entries(record_id, "companies")}))
+    if not records:
+        records.append(("sintético", synthetic_record()))
+
+    count, method = token_counter()
+    print(f"contagem: {method}")
+    total_before = total_after = 0
+    for name, record in records:
+        # Antes: o app colava o repr do dicionário inteiro no prompt
+        before = count(str(record))
+        after = count(to_prompt_text(compact_company_record(record)))
+        total_before += before
+        total_after += after
+        print(f"{name:>40}: {before:7d} → {after:6d} tokens ({after / before:.1%})")
+    print(f"{'total':>40}: {total_before:7d} → {total_after:6d} tokens ({total_after / total_before:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+CPU e memória de pico da extração de texto das páginas: fluxo antigo x services/html_extract.py.
+
+    python benchmarks/html_extract.py --corpus pasta_com_html/ --repeat 3
+    python benchmarks/html_extract.py --synthetic 40
+
+O corpus é uma pasta de arquivos .html salvos (ex.: "Salvar como" no navegador ou
+curl). Sem --corpus, gera --synthetic páginas no formato comum de sites reais: head
+com muito JavaScript/CSS inline, menus, o texto do conteúdo e um rodapé enorme,
+de 50 KB a ~4 MB.
+
+Para cada página compara:
+  - antigo: documento inteiro, BeautifulSoup + html.parser, corte em 2000 caracteres
+  - novo: documento cortado no limite de bytes do fetch (WALTER_SCRAPER_MAX_BYTES) e
+    extract_page com cada backend instalado (para de ler ao juntar 2000 caracteres)
+
+CPU = time.process_time; memória = pico do tracemalloc (só alocações do Python: a
+memória interna do lexbor/libxml2 não aparece). A coluna "mesmo texto" é a fração
+de páginas em que o texto novo é igual ao antigo desconsiderando espaços (o antigo
+colava nós de texto vizinhos, ex.: "Seção 1Seção 2").
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.scraper_throughput import legacy_extract_text  # noqa: E402
+
+WORDS = ("empresa mercado delivery restaurante pedido cliente receita crescimento plataforma "
+         "vendas canal digital cardápio parceiro investimento operação cidade Brasil").split()
+
+
+def synthetic_page(rng, size):
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+    script = "<script>window.__STATE__=" + "{\"k\":\"" + "x" * 1000 + "\"}," * (size // 3000) + "</script>\n"
+    style = "<style>" + ".c{color:#fff;margin:0}" * (size // 200) + "</style>\n"
+    nav = "<nav>" + "".join(f'<a href="/s{i}">Seção {i}</a>' for i in range(80)) + "</nav>\n"
+    body = "".join(f"<p>{' '.join(sentence() for _ in range(5))}</p>\n" for _ in range(40))
+    footer = "<footer>" + "".join(f"<div><span>{sentence()}</span></div>\n" for _ in range(size // 400)) + "</footer>"
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Página {size}</title>{script}{style}</head>"
+            f"<body>{nav}<main>{body}</main>{footer}</body></html>")
+
+
+def measure(fn, pages, repeat):
+    tracemalloc.start()
+    start = time.process_time()
+    for _ in range(repeat):
+        results = [fn(html) for html in pages]
+    cpu = time.process_time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak, results
+
+
+def same_text(old, new):
+    old_text, new_text = "".join(old["content"].split()), "".join(new["content"].split())
+    size = min(len(old_text), len(new_text))
+    return old_text[:size] == new_text[:size] and old["title"].strip() == new["title"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="Pasta com arquivos .html")
+    parser.add_argument("--synthetic", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    from services.html_extract import _BACKENDS, _is_available, extract_page
+    from services.web_scraper import SCRAPER_MAX_BYTES
+
+    if args.corpus:
+        pages = [p.read_bytes().decode("utf-8", errors="replace") for p in sorted(Path(args.corpus).glob("*.html"))]
+    else:
+        rng = random.Random(42)
+        pages = [synthetic_page(rng, rng.choice([50_000, 300_000, 1_000_000, 4_000_000])) for _ in range(args.synthetic)]
+    total_mb = sum(len(p.encode()) for p in pages) / 1e6
+    print(f"{len(pages)} páginas, {total_mb:.1f} MB; limite de bytes do fetch: {SCRAPER_MAX_BYTES / 1e6:.1f} MB\n")
+
+    capped = [p.encode()[:SCRAPER_MAX_BYTES].decode("utf-8", errors="replace") for p in pages]
+    cpu, peak, baseline = measure(lambda html: legacy_extract_text(html, ""), pages, args.repeat)
+    print(f"{'antigo (bs4)':>22}: CPU {cpu:7.2f}s | pico {peak / 1e6:7.1f} MB")
+
+    for name in _BACKENDS:
+        if not _is_available(name):
+            print(f"{name:>22}: não instalado")
+            continue
+        cpu_new, peak_new, results = measure(lambda html: extract_page(html, "", backend=name), capped, args.repeat)
+        same = sum(same_text(old, new) for old, new in zip(baseline, results)) / len(pages)
+        print(f"{name:>22}: CPU {cpu_new:7.2f}s ({cpu / cpu_new:5.1f}x) | pico {peak_new / 1e6:7.1f} MB "
+              f"| mesmo texto {same:.0%}")
+
+
+if __name__ == "__main__":
+    main()
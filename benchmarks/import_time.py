@@ -0,0 +1,73 @@
+"""
+Resumo do tempo de import (python -X importtime) dos módulos do app.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --modules workflow get_record_info --top 15 --runs 5
+
+Para cada módulo roda um interpretador novo (import frio), soma o tempo
+cumulativo do módulo e lista os pacotes de topo que mais pesaram.
+Para comparar com a versão anterior, rode o script nas duas revisões.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MODULES = ["workflow", "get_record_info", "database.engine", "services.find_record", "utils"]
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    """Retorna (tempo cumulativo do módulo em µs, {pacote de topo: tempo próprio em µs})."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{proc.stderr[-2000:]}")
+
+    total = 0
+    by_package = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        by_package[name.split(".")[0]] += int(self_us)
+        if name == module and len(indent) == 1:
+            total = int(cumulative_us)
+    return total, by_package
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        totals = []
+        packages = defaultdict(list)
+        for _ in range(args.runs):
+            total, by_package = measure(module)
+            totals.append(total)
+            for name, value in by_package.items():
+                packages[name].append(value)
+
+        print(f"==================== {module}")
+        print(f"cumulativo (mediana de {args.runs}): {statistics.median(totals) / 1000:.1f} ms")
+        heaviest = sorted(packages.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+        for name, values in heaviest[:args.top]:
+            print(f"  {name:<30} {statistics.median(values) / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Teste de carga do api.py contra o LLM falso (sem credenciais).
+
+    python benchmarks/load_test_api.py --requests 200 --concurrency 20 --funds 60
+
+Sobe o servidor (uvicorn) em uma thread com WALTER_FAKE_LLM=1 e um catálogo
+sintético em CSV, dispara POST /scores (ou /jobs + polling com --mode jobs, ou
+/scores/stream lido até o evento final com --mode stream) e reporta requests/s e
+percentis de latência. Com --mode stream e --concurrency acima das threads do pool
+padrão do asyncio, mostra se as conexões SSE abertas disputam threads entre si.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+INPUTS = {
+    "company": "Brendi",
+    "description_company": "AI agents that sell food for Brazilian restaurants",
+    "description_person": "Young and energetic CEO",
+    "round": {"size": 10, "Funding": "Series A"},
+    "round_commitment": 2,
+    "leader_or_follower": "both",
+    "industry": "AI, Food Delivery",
+    "fund_closeness": "Irrelevant",
+    "fund_quality": "Any",
+    "observations": "",
+}
+
+
+def write_catalog(path, funds):
+    columns = [
+        "name", "investment_geography", "prefered_industry_enriched", "description", "observations",
+        "vc_quality_perception", "proximity", "investment_range", "leader?",
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i in range(funds):
+            writer.writerow([
+                f"Fund {i}", "Brazil, Latam", "AI, Fintech, Marketplaces", f"Fund number {i}", "",
+                str(i % 5 + 1), str(i % 5), "[USD 5-10mn, < USD 1mn]", "leader, follower",
+            ])
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+async def run_load(base_url, total, concurrency, mode, batch_size):
+    import aiohttp
+
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    body = {"inputs": INPUTS, "parameters": {"batch_size": batch_size, "surviving_percentage": 0.5, "max_workers": 4}}
+
+    async def one(session):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if mode == "scores":
+                    async with session.post(f"{base_url}/scores", json=body) as response:
+                        await response.read()
+                        ok = response.status == 200
+                elif mode == "stream":
+                    async with session.post(f"{base_url}/scores/stream", json=body) as response:
+                        ok = False
+                        async for line in response.content:
+                            if line.startswith(b"event: result"):
+                                ok = True
+                            elif line.startswith(b"event: error"):
+                                break
+                else:
+                    async with session.post(f"{base_url}/jobs", json=body) as response:
+                        job_id = (await response.json())["job_id"]
+                    while True:
+                        async with session.get(f"{base_url}/jobs/{job_id}") as response:
+                            status = (await response.json())["status"]
+                        if status in ("completed", "failed", "cancelled"):
+                            ok = status == "completed"
+                            break
+                        await asyncio.sleep(0.05)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(one(session) for _ in range(total)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--funds", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência simulada por chamada ao LLM (s)")
+    parser.add_argument("--job-workers", type=int, default=16)
+    parser.add_argument("--mode", choices=["scores", "jobs", "stream"], default="scores")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    catalog = Path(tempfile.mkdtemp()) / "funds.csv"
+    write_catalog(catalog, args.funds)
+    os.environ.update({
+        "WALTER_FAKE_LLM": "1",
+        "WALTER_FAKE_LLM_LATENCY": str(args.latency),
+        "WALTER_FUNDS_CSV": str(catalog),
+        "WALTER_JOBS_MAX_WORKERS": str(args.job_workers),
+        "WALTER_BATCH_PROFILE_PATH": str(catalog.parent / "batch_profile.json"),
+    })
+
+    import uvicorn
+    from api import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    latencies, errors, elapsed = asyncio.run(
+        run_load(f"http://127.0.0.1:{args.port}", args.requests, args.concurrency, args.mode, args.batch_size)
+    )
+    server.should_exit = True
+    thread.join(timeout=5)
+
+    print(f"requests: {args.requests} | concorrência: {args.concurrency} | erros: {errors}")
+    print(f"duração: {elapsed:.2f}s | throughput: {len(latencies) / elapsed:.2f} req/s")
+    if latencies:
+        print(
+            f"latência (s): média {statistics.mean(latencies):.3f} | p50 {percentile(latencies, 50):.3f} | "
+            f"p90 {percentile(latencies, 90):.3f} | p99 {percentile(latencies, 99):.3f} | máx {max(latencies):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Latência e chamadas ao LLM da busca de registros, com e sem o ranker determinístico.
+
+Com uma lista de nomes gravada (um por linha) e cassettes gravadas:
+    WALTER_CASSETTE_MODE=record python benchmarks/lookup_fast_path.py --names names.txt
+    WALTER_CASSETTE_MODE=replay python benchmarks/lookup_fast_path.py --names names.txt
+
+Sem credenciais, com um índice de nomes sintético e o LLM falso:
+    python benchmarks/lookup_fast_path.py --synthetic 20000 --latency 0.6
+
+Cada nome passa por get_record_id_candidates_from_name_companies + evaluate_sql_query_results,
+primeiro com o fast path desligado (todo lookup vai ao LLM) e depois ligado.
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+DEFAULT_NAMES = ["Brendi", "Bhub", "Norte", "Nubank", "Creditas", "Loft", "Quinto Andar", "Cora", "Stone", "Pipefy"]
+
+
+def synthetic_rows(names, size):
+    """Catálogo com os nomes buscados, alguns homônimos parecidos e ruído aleatório."""
+    rows = []
+    for i, name in enumerate(names):
+        rows.append({"record_id": f"rec-{i}", "name": name, "domain": f"{name.lower().replace(' ', '')}.com",
+                     "last_interaction": f"2025-0{i % 9 + 1}-01"})
+        # Metade dos nomes tem homônimos (ex.: "Norte Capital"), que exigem o LLM
+        if i % 2:
+            rows.append({"record_id": f"rec-{i}-b", "name": f"{name} Capital", "domain": "",
+                         "last_interaction": "2024-01-01"})
+            rows.append({"record_id": f"rec-{i}-c", "name": name, "domain": "", "last_interaction": "2023-01-01"})
+    for i in range(size):
+        rows.append({"record_id": f"noise-{i}", "name": "".join(random.choices(string.ascii_lowercase, k=9)),
+                     "domain": "", "last_interaction": f"2024-{i % 12 + 1:02d}-01"})
+    return rows
+
+
+def run(names, label):
+    from get_record_info import evaluate_sql_query_results, get_record_id_candidates_from_name_companies
+    from services.candidate_ranker import LOOKUP_STATS
+
+    for key in LOOKUP_STATS:
+        LOOKUP_STATS[key] = 0
+    latencies, choices = [], {}
+    for name in names:
+        start = time.perf_counter()
+        candidates = get_record_id_candidates_from_name_companies(name)
+        choices[name] = evaluate_sql_query_results(candidates, name, "")["record_id"]
+        latencies.append(time.perf_counter() - start)
+
+    print(
+        f"{label:>16}: {len(names)} lookups | chamadas ao LLM {LOOKUP_STATS['llm_calls']} | "
+        f"fast path {LOOKUP_STATS['fast_path']} | média {statistics.mean(latencies) * 1000:.0f} ms | "
+        f"máx {max(latencies) * 1000:.0f} ms | total {sum(latencies):.2f}s"
+    )
+    return choices
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", help="Arquivo com um nome por linha")
+    parser.add_argument("--synthetic", type=int, help="Usa um índice sintético com N registros de ruído e o LLM falso")
+    parser.add_argument("--latency", type=float, default=0.6, help="Latência do LLM falso (s)")
+    args = parser.parse_args()
+
+    names = DEFAULT_NAMES
+    if args.names:
+        names = [line.strip() for line in Path(args.names).read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    if args.synthetic is not None:
+        os.environ.update({
+            "WALTER_FAKE_LLM": "1",
+            "WALTER_FAKE_LLM_LATENCY": str(args.latency),
+            "WALTER_NAME_INDEX_PATH": str(Path(tempfile.mkdtemp()) / "name_index.sqlite"),
+        })
+        from services.name_index import get_name_index
+        get_name_index().load("companies", synthetic_rows(names, args.synthetic))
+
+    from services import candidate_ranker
+
+    candidate_ranker.FAST_PATH_ENABLED = False
+    before = run(names, "somente LLM")
+    candidate_ranker.FAST_PATH_ENABLED = True
+    after = run(names, "com fast path")
+
+    changed = [name for name in names if before[name] != after[name]]
+    print(f"escolhas diferentes entre os modos: {len(changed)} {changed if changed else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Custo do perfil por etapa (services/profiling.py) no workflow de seleção de fundos.
+
+    python benchmarks/profiling_overhead.py --funds 400 --batch-size 10 --runs 3
+
+O LLM é o falso (WALTER_FAKE_LLM) e o catálogo é sintético. Roda o workflow --runs
+vezes com o perfil desligado (o padrão) e ligado, e reporta a mediana do tempo de
+cada modo. Com o perfil ligado, mostra os arquivos gravados (speedscope, folded e
+resumo de alocações) e o tempo e as maiores alocações de cada etapa.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--funds", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    from load_test_api import INPUTS, write_catalog
+
+    workdir = Path(tempfile.mkdtemp())
+    write_catalog(workdir / "funds.csv", args.funds)
+    os.environ.update({
+        "WALTER_FAKE_LLM": "1",
+        "WALTER_FAKE_LLM_LATENCY": str(args.latency),
+        "WALTER_FUNDS_CSV": str(workdir / "funds.csv"),
+        "WALTER_PROFILE_DIR": str(workdir / "profiles"),
+        "WALTER_BATCH_PROFILE_PATH": str(workdir / "batch_profile.json"),
+    })
+
+    from workflow import run_fund_selection_workflow
+
+    parameters = {"batch_size": args.batch_size, "max_workers": args.workers, "surviving_percentage": 0.5}
+    # Aquece imports e o cache do catálogo
+    run_fund_selection_workflow(INPUTS, dict(parameters))
+
+    timings = {}
+    for profile in (False, True):
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = run_fund_selection_workflow(INPUTS, dict(parameters, profile=profile))
+            timings.setdefault(profile, []).append(time.perf_counter() - start)
+
+    off, on = statistics.median(timings[False]), statistics.median(timings[True])
+    print(f"\nperfil desligado: {off:.3f}s | ligado: {on:.3f}s ({(on / off - 1) * 100:+.1f}%)")
+
+    profile = result["profile"]
+    for kind, path in profile["files"].items():
+        print(f"  {kind:>15}: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    for stage in profile["stages"]:
+        top = stage["top"][0] if stage["top"] else None
+        print(f"  {stage['stage']:>10}: {stage['duration']:.3f}s | pico {stage['peak_kb']:8.1f} KiB"
+              + (f" | maior alocação {top['size_kb']:+.1f} KiB em {top['where']}" if top else ""))
+
+
+if __name__ == "__main__":
+    main()
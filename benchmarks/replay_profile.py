@@ -0,0 +1,109 @@
+"""
+Perfil de ponta a ponta do pipeline usando uma cassette gravada.
+
+Grave uma vez com credenciais:
+    WALTER_CASSETTE_MODE=record python benchmarks/replay_profile.py
+
+Depois reproduza offline (sem credenciais ou rede):
+    WALTER_CASSETTE_MODE=replay WALTER_CASSETTE_LATENCY=zero python benchmarks/replay_profile.py --baseline baseline.json
+
+Com --baseline, o resultado é comparado com um snapshot anterior (regressão);
+com --write-baseline, o snapshot é (re)escrito.
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+DEFAULT_INPUTS = {
+    "company": "Brendi",
+    "description_company": "Brendi is a company that creates AI agents to sell food in Brazilian restaurants via delivery. They are going to be the next ifood",
+    "description_person": "Daniel is the CEO of Brendi. he studied at ITA, is very young and energetic",
+    "round": {"size": 10, "Funding": "Series A"},
+    "round_commitment": "2M USD",
+    "leader_or_follower": "leader",
+    "industry": "AI Solutions, Food Delivery, Restaurant Management, AI Agents, Embedded Finance",
+    "fund_closeness": "Distant",
+    "observations": "The deal is cold. We want bad funds for it",
+    "fund_quality": "Any",
+}
+
+DEFAULT_PARAMETERS = {"batch_size": 10, "surviving_percentage": 1, "use_docs": False, "max_workers": 4}
+
+
+def profile(label, fn, top):
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    result = fn()
+    profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+    print(f"==================== {label}: {elapsed:.3f}s")
+    print(stream.getvalue())
+    return result, elapsed
+
+
+def snapshot(lookup_result, workflow_result):
+    return {
+        "record_id": lookup_result["record_id"],
+        "fund_names": workflow_result["fund_names"],
+        "scores": {f.fund_name: round(f.score, 3) for f in workflow_result["top_funds"]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--company", default="Brendi")
+    parser.add_argument("--inputs", help="JSON com os inputs do workflow")
+    parser.add_argument("--top", type=int, default=25, help="Número de funções exibidas por perfil")
+    parser.add_argument("--baseline", help="Snapshot para checagem de regressão")
+    parser.add_argument("--write-baseline", action="store_true")
+    args = parser.parse_args()
+
+    print(f"Modo da cassette: {os.getenv('WALTER_CASSETTE_MODE', 'off')}")
+
+    from get_record_info import get_record_id_from_name
+    from workflow import run_fund_selection_workflow
+
+    inputs = DEFAULT_INPUTS
+    if args.inputs:
+        with open(args.inputs, "r", encoding="utf-8") as f:
+            inputs = json.load(f)
+
+    lookup_result, lookup_time = profile(
+        "get_record_id_from_name", lambda: get_record_id_from_name(args.company, "companies"), args.top
+    )
+    workflow_result, workflow_time = profile(
+        "run_fund_selection_workflow",
+        lambda: run_fund_selection_workflow(inputs, dict(DEFAULT_PARAMETERS)),
+        args.top,
+    )
+
+    print(f"Lookup: {lookup_time:.3f}s | Workflow: {workflow_time:.3f}s")
+
+    current = snapshot(lookup_result, workflow_result)
+    if args.baseline and args.write_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"Baseline salvo em {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            expected = json.load(f)
+        if current != expected:
+            print("REGRESSÃO: resultado difere do baseline")
+            sys.exit(1)
+        print("Resultado idêntico ao baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Requisições de rede do WebScraper com e sem o cache em disco (services/scrape_cache.py).
+
+    python benchmarks/scrape_cache.py --hosts 4 --results 6 --latency 0.1
+
+Usa os servidores locais de benchmarks/scraper_throughput.py (páginas com ETag) e
+repete o mesmo "enriquecimento" (uma busca da empresa e uma do mercado) quatro vezes:
+
+  1. cache vazio: busca + páginas pela rede
+  2. cache quente: nenhuma requisição
+  3. páginas vencidas (page_ttl=0): só GETs condicionais, respondidos com 304
+  4. uma URL que falha: a segunda tentativa sai do cache negativo
+
+e uma rodada com limite de tamanho pequeno para mostrar a remoção por LRU.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.scraper_throughput import LocalSites  # noqa: E402
+
+
+async def enrichment(scraper, results):
+    return await asyncio.gather(
+        scraper.search_and_scrape("Brendi Brasil", max_results=results),
+        scraper.search_and_scrape("mercado de  delivery   Brasil", max_results=results),
+    )
+
+
+async def measure(label, scraper, sites, results):
+    sites.reset()
+    start = time.perf_counter()
+    pages = await enrichment(scraper, results)
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for result in pages for page in result if "content" in page)
+    requests = sites.requests
+    print(f"{label:>26}: {elapsed * 1000:7.1f} ms | {ok} páginas | buscas: {requests['search']} "
+          f"| GETs de página: {requests['page']} (304: {requests['not_modified']})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--results", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=8830)
+    args = parser.parse_args()
+
+    sites = LocalSites(args.hosts, args.port, args.latency, args.results)
+    sites.start()
+    search_url = f"http://127.0.0.1:{args.port}/html/"
+    os.environ["WALTER_SEARCH_URL"] = search_url
+
+    from services.scrape_cache import ScrapeCache
+    from services.web_scraper import WebScraper
+
+    async def main_async():
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ScrapeCache(path=os.path.join(tmp, "scrape.sqlite"))
+            scraper = WebScraper(per_host_delay=0.02, search_url=search_url, cache=cache)
+
+            await measure("1. cache vazio", scraper, sites, args.results)
+            await measure("2. cache quente", scraper, sites, args.results)
+
+            cache.page_ttl = 0
+            await measure("3. revalidação (304)", scraper, sites, args.results)
+            cache.page_ttl = 3600
+
+            broken = f"http://127.0.0.1:{args.port}/fail"
+            for attempt in (1, 2):
+                sites.reset()
+                result = await scraper.fetch_page(broken)
+                print(f"{'4. URL com erro #' + str(attempt):>26}: {result.get('error')} | "
+                      f"GETs: {sites.requests['failed']}")
+
+            small = ScrapeCache(path=os.path.join(tmp, "small.sqlite"), max_bytes=5000)
+            small_scraper = WebScraper(per_host_delay=0.02, search_url=search_url, cache=small)
+            await enrichment(small_scraper, args.results)
+            stats = small.stats()
+            print(f"{'5. limite de 5 KB':>26}: {stats['pages']} páginas e {stats['searches']} buscas no cache, "
+                  f"{stats['evictions']} removidas")
+
+            print("\nEstatísticas:", cache.stats())
+            await scraper.close_session()
+            await small_scraper.close_session()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
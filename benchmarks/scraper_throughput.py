@@ -0,0 +1,176 @@
+"""
+Páginas/s do WebScraper contra servidores HTTP locais.
+
+    python benchmarks/scraper_throughput.py --hosts 8 --queries 4 --results 20 --latency 0.1
+
+Sobe --hosts servidores (um por porta, cada porta conta como um host) com páginas
+HTML de ~30 KB e latência --latency, mais uma página de busca no formato do
+DuckDuckGo HTML. Roda --queries buscas em paralelo com o fluxo antigo (sessão nova
+por busca, sleeps em série) e com o scraper compartilhado, e reporta páginas/s e a
+maior concorrência observada em um mesmo host.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+PARAGRAPH = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8 + "</p>\n"
+
+
+class LocalSites:
+    def __init__(self, hosts, base_port, latency, results):
+        self.ports = [base_port + i for i in range(hosts)]
+        self.latency = latency
+        self.results = results
+        self.in_flight = {port: 0 for port in self.ports}
+        self.max_in_flight = {port: 0 for port in self.ports}
+        self.requests = {"search": 0, "page": 0, "not_modified": 0, "failed": 0}
+
+    def reset(self):
+        self.max_in_flight = {port: 0 for port in self.ports}
+        self.requests = {"search": 0, "page": 0, "not_modified": 0, "failed": 0}
+
+    async def search(self, request):
+        from aiohttp import web
+        self.requests["search"] += 1
+        links = "".join(
+            f'<a class="result__url" href="http://127.0.0.1:{self.ports[i % len(self.ports)]}/page/{i}?q={request.query.get("q", "")}">r{i}</a>\n'
+            for i in range(self.results)
+        )
+        return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+
+    async def page(self, request):
+        from aiohttp import web
+        port = request.url.port
+        self.requests["page"] += 1
+        etag = f'"page-{request.match_info["n"]}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.requests["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        self.in_flight[port] += 1
+        self.max_in_flight[port] = max(self.max_in_flight[port], self.in_flight[port])
+        try:
+            await asyncio.sleep(self.latency)
+            body = f"<html><head><title>Page {request.match_info['n']}</title><style>p{{}}</style></head><body>{PARAGRAPH * 60}</body></html>"
+            return web.Response(text=body, content_type="text/html", headers={"ETag": etag})
+        finally:
+            self.in_flight[port] -= 1
+
+    async def fail(self, request):
+        from aiohttp import web
+        self.requests["failed"] += 1
+        return web.Response(status=503)
+
+    def start(self):
+        from aiohttp import web
+
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            app = web.Application()
+            app.router.add_get("/html/", self.search)
+            app.router.add_get("/page/{n}", self.page)
+            app.router.add_get("/fail", self.fail)
+            runner = web.AppRunner(app)
+            loop.run_until_complete(runner.setup())
+            for port in self.ports:
+                loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+
+
+def legacy_extract_text(html, url):
+    """Extração anterior do WebScraper: BeautifulSoup + html.parser no documento inteiro."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    # Remove scripts e styles
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Extrai o texto principal
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+
+    return {
+        'url': url,
+        'title': soup.title.string if soup.title else '',
+        'content': text[:2000]
+    }
+
+
+async def legacy_search(search_url, query, max_results):
+    """Fluxo anterior: sessão nova por busca, sleep aleatório em série antes de cada página, parse no event loop."""
+    import aiohttp
+    from services.web_scraper import _result_urls
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(search_url, params={"q": query}) as response:
+            urls = _result_urls(await response.text(), max_results)
+
+        async def fetch(url):
+            async with session.get(url, timeout=10) as response:
+                return legacy_extract_text(await response.text(), url)
+
+        tasks = []
+        for url in urls:
+            await asyncio.sleep(random.uniform(0.1, 0.3))
+            tasks.append(fetch(url))
+        return await asyncio.gather(*tasks)
+
+
+async def run(label, search, queries, sites):
+    sites.reset()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(search(f"query {i}") for i in range(queries)))
+    elapsed = time.perf_counter() - start
+    pages = sum(1 for result in results for page in result if "content" in page)
+    print(f"{label:>22}: {pages} páginas em {elapsed:.2f}s = {pages / elapsed:.1f} páginas/s | "
+          f"máx. simultâneas por host: {max(sites.max_in_flight.values())}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=4)
+    parser.add_argument("--results", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--per-host-limit", type=int, default=2)
+    parser.add_argument("--per-host-delay", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8810)
+    args = parser.parse_args()
+
+    sites = LocalSites(args.hosts, args.port, args.latency, args.results)
+    sites.start()
+    search_url = f"http://127.0.0.1:{args.port}/html/"
+    os.environ["WALTER_SEARCH_URL"] = search_url
+
+    from services.web_scraper import WebScraper
+
+    async def main_async():
+        await run("antigo", lambda q: legacy_search(search_url, q, args.results), args.queries, sites)
+        scraper = WebScraper(per_host_limit=args.per_host_limit, per_host_delay=args.per_host_delay,
+                             search_url=search_url, use_cache=False)
+        await run("scraper compartilhado", lambda q: scraper.search_and_scrape(q, args.results), args.queries, sites)
+        # Segunda rodada: conexões e DNS já aquecidos
+        await run("(sessão aquecida)", lambda q: scraper.search_and_scrape(q, args.results), args.queries, sites)
+        await scraper.close_session()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
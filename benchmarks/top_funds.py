@@ -0,0 +1,74 @@
+"""
+Seleção dos melhores fundos (ScoreTable.top_k / select_top_funds) contra o sorted() antigo.
+
+    python benchmarks/top_funds.py --tables 2000 --funds 5000
+
+As notas do LLM são inteiras e repetem muito, então há empates no corte da fração
+sobrevivente. Para --tables tabelas aleatórias (1 a 60 fundos, notas de 0 a 10, em
+escala 0-100 depois da normalização) confere que os fundos escolhidos e a ordem são
+os do sorted(key=score, reverse=True)[:k] estável de antes. Também roda o caso de
+17 fundos com 30% sobrevivendo (6 vagas) em que quatro fundos empatam nas 3 últimas
+vagas: ficam f1, f7 e f13, que vêm antes no catálogo, e não f15.
+
+Por fim mede o tempo de top_fraction(0.3) com --funds fundos contra o sorted() sobre
+a lista de FundScore.
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def sorted_top(records, percentage):
+    """Como select_top_funds fazia antes da ScoreTable."""
+    k = math.ceil(percentage * len(records))
+    return [r["fund_name"] for r in sorted(records, key=lambda r: r["score"], reverse=True)[:k]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--funds", type=int, default=5000)
+    args = parser.parse_args()
+
+    from score_table import ScoreTable
+    from workflow import normalize_scores, select_top_funds
+
+    # Empate na fronteira: 3 fundos acima de 7 e quatro com 7 (f1, f7, f13, f15) para as 3 últimas vagas
+    scores = [8, 7, 5, 1, 0, 5, 5, 7, 2, 8, 4, 0, 1, 7, 2, 7, 10]
+    records = [{"fund_name": f"f{i}", "score": score, "reason": ""} for i, score in enumerate(scores)]
+    chosen = select_top_funds(normalize_scores(records), 0.3).names.tolist()
+    print(f"17 fundos, 30%: {chosen} | f13 escolhido: {'f13' in chosen and 'f15' not in chosen} | "
+          f"igual ao sorted(): {chosen == sorted_top(records, 0.3)}")
+
+    rng = random.Random(11)
+    mismatches = 0
+    for _ in range(args.tables):
+        records = [{"fund_name": f"f{i}", "score": rng.randint(0, 10), "reason": ""} for i in range(rng.randint(1, 60))]
+        percentage = rng.choice([0.1, 0.3, 0.5, 0.7, 1.0])
+        normalized = normalize_scores(records)
+        if select_top_funds(normalized, percentage).names.tolist() != sorted_top(normalized.to_records(), percentage):
+            mismatches += 1
+    print(f"{args.tables} tabelas com empates: {mismatches} diferenças do sorted()")
+
+    from workflow import FundScore
+
+    fund_scores = [FundScore(fund_name=f"Fundo {i}", score=rng.randint(0, 10), reason="ticket compatível") for i in range(args.funds)]
+    table = ScoreTable.from_fund_scores(fund_scores)
+    start = time.perf_counter()
+    for _ in range(100):
+        table.top_fraction(0.3)
+    table_ms = (time.perf_counter() - start) * 10
+    start = time.perf_counter()
+    for _ in range(100):
+        sorted(fund_scores, key=lambda f: f.score, reverse=True)[:math.ceil(0.3 * len(fund_scores))]
+    sorted_ms = (time.perf_counter() - start) * 10
+    print(f"{args.funds} fundos, 30%: top_fraction {table_ms:.3f} ms | sorted() {sorted_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import logging
+import os
+import zlib
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Storage encoding for large checkpoint payloads (checkpoint bodies, metadata and pending writes).
+#
+# Payloads below COMPRESS_THRESHOLD bytes are stored inline as strings, exactly like
+# items written before this module existed. Larger payloads are compressed (zstd if
+# the zstandard package is installed, zlib otherwise) and stored as a DynamoDB
+# binary attribute. If the compressed payload is still above OFFLOAD_THRESHOLD bytes
+# and a bucket is configured, it goes to S3 and the item keeps only a pointer.
+#
+# Payloads may be text (JSON formats) or bytes (msgpack); small bytes payloads are
+# stored as an uncompressed binary attribute. decode returns the payload as stored
+# (str) or as bytes once it went through compression; the serializers accept both.
+#
+# For a field "checkpoint" the item holds one of:
+#   checkpoint                                   plain string or binary (legacy / small)
+#   checkpoint (binary) + checkpoint_encoding    compressed inline
+#   checkpoint_s3 + checkpoint_encoding          compressed in S3 ("s3://bucket/key")
+
+COMPRESS_THRESHOLD = int(os.getenv("WALTER_CHECKPOINT_COMPRESS_THRESHOLD", "4096"))
+# DynamoDB items are capped at 400 KB including keys and metadata
+OFFLOAD_THRESHOLD = int(os.getenv("WALTER_CHECKPOINT_OFFLOAD_THRESHOLD", str(256 * 1024)))
+CHECKPOINT_BUCKET = os.getenv("WALTER_CHECKPOINT_BUCKET")
+CHECKPOINT_S3_PREFIX = os.getenv("WALTER_CHECKPOINT_S3_PREFIX", "checkpoints/")
+CHECKPOINT_S3_ENDPOINT_URL = os.getenv("WALTER_CHECKPOINT_S3_ENDPOINT_URL")
+COMPRESSION_LEVEL = int(os.getenv("WALTER_CHECKPOINT_COMPRESSION_LEVEL", "3"))
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def _decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Checkpoint payload is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == 'zlib':
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown checkpoint payload encoding: {encoding}")
+
+
+class CheckpointPayloadCodec:
+    """Encodes payload strings into item attributes and decodes them back (including legacy items)."""
+
+    def __init__(
+        self,
+        compress_threshold: int = COMPRESS_THRESHOLD,
+        offload_threshold: int = OFFLOAD_THRESHOLD,
+        bucket: Optional[str] = CHECKPOINT_BUCKET,
+        prefix: str = CHECKPOINT_S3_PREFIX,
+        region_name: Optional[str] = None,
+        endpoint_url: Optional[str] = CHECKPOINT_S3_ENDPOINT_URL,
+        encoding: Optional[str] = None,
+        level: int = COMPRESSION_LEVEL,
+    ) -> None:
+        self.compress_threshold = compress_threshold
+        self.offload_threshold = offload_threshold
+        self.bucket = bucket
+        self.prefix = prefix
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        self.encoding = encoding or ('zstd' if zstandard is not None else 'zlib')
+        self.level = level
+        self._s3 = None
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            import boto3
+            self._s3 = boto3.client('s3', region_name=self.region_name, endpoint_url=self.endpoint_url)
+        return self._s3
+
+    def encode(self, field: str, data: Union[str, bytes], object_key: str) -> Dict[str, Any]:
+        """
+        Item attributes for `data` stored under `field`.
+
+        Args:
+            field: Attribute name ("checkpoint", "metadata", "value")
+            data: Serialized payload
+            object_key: S3 key (below the prefix) used if the payload is offloaded
+        """
+        raw = data if isinstance(data, bytes) else data.encode('utf-8')
+        if len(raw) < self.compress_threshold:
+            return {field: data}
+
+        compressed = _compress(raw, self.encoding, self.level)
+        if len(compressed) <= self.offload_threshold:
+            return {field: compressed, f'{field}_encoding': self.encoding}
+        if not self.bucket:
+            logger.warning(
+                f"Checkpoint {field} is {len(compressed)} bytes compressed and no WALTER_CHECKPOINT_BUCKET is set; "
+                "storing inline (DynamoDB rejects items over 400 KB)"
+            )
+            return {field: compressed, f'{field}_encoding': self.encoding}
+
+        key = f'{self.prefix}{object_key}'
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=compressed)
+        return {f'{field}_s3': f's3://{self.bucket}/{key}', f'{field}_encoding': self.encoding}
+
+    def decode(self, item: Dict[str, Any], field: str) -> Union[str, bytes]:
+        encoding = item.get(f'{field}_encoding')
+        if encoding is None:
+            # boto3 returns binary attributes wrapped in boto3.dynamodb.types.Binary
+            return getattr(item[field], 'value', item[field])
+
+        pointer = item.get(f'{field}_s3')
+        if pointer:
+            bucket, _, key = pointer[len('s3://'):].partition('/')
+            data = self.s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+        else:
+            data = getattr(item[field], 'value', item[field])
+        return _decompress(bytes(data), encoding)
+
+    def delete(self, item: Dict[str, Any], field: str) -> None:
+        """Remove the S3 object behind an offloaded field (no-op for inline payloads)."""
+        pointer = item.get(f'{field}_s3')
+        if pointer:
+            bucket, _, key = pointer[len('s3://'):].partition('/')
+            self.s3.delete_object(Bucket=bucket, Key=key)
@@ -0,0 +1,181 @@
+import json
+import os
+from typing import Any, Dict, Tuple, Union
+
+import langchain_core.messages as langchain_messages
+from langchain_core.messages import BaseMessage
+from langgraph.types import Send
+
+# Serializers for checkpoint bodies and pending writes.
+#
+# The serializer tag returned by dumps_typed is stored in the item's `type` attribute
+# and selects the decoder on read, so items written with any registered format keep
+# loading after the default changes:
+#
+#   json        stdlib json with a default/object_hook pair (the original format)
+#   orjson.v1   orjson text; payloads that contain "__type__" decode through the json object_hook
+#   msgpack.v1  msgpack binary; BaseMessage as extension type 1, Send as extension type 2
+#
+# All formats round-trip LangChain messages as {"__type__": <class name>, "data": <model_dump>}
+# (or the msgpack equivalent) and rebuild them with model_construct. LangGraph Send
+# packets (pending tasks of a fan-out) are stored as {"__type__": "Send", "data": {node, arg}}.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CHECKPOINT_SERDE = os.getenv("WALTER_CHECKPOINT_SERDE", "orjson.v1" if orjson is not None else "json")
+
+_MESSAGE_EXT_TYPE = 1
+_SEND_EXT_TYPE = 2
+
+
+def _message_class(type_name: str):
+    cls = getattr(langchain_messages, type_name, None)
+    if cls and isinstance(cls, type) and issubclass(cls, BaseMessage):
+        return cls
+    raise ValueError(f'Unknown type: {type_name}')
+
+
+def _encode_message(o: Any) -> Dict[str, Any]:
+    if isinstance(o, BaseMessage):
+        return {
+            '__type__': o.__class__.__name__,
+            'data': o.model_dump(),
+        }
+    if isinstance(o, Send):
+        return {'__type__': 'Send', 'data': {'node': o.node, 'arg': o.arg}}
+    raise TypeError(f'Object of type {o.__class__.__name__} is not JSON serializable')
+
+
+def _decode_message(dct: Dict[str, Any]) -> Any:
+    if '__type__' in dct:
+        if dct['__type__'] == 'Send':
+            return Send(dct['data']['node'], dct['data']['arg'])
+        return _message_class(dct['__type__']).model_construct(**dct['data'])
+    return dct
+
+
+class LegacyJsonSerializer:
+    """The original format: json.dumps with a default hook, json.loads with an object_hook on every dict."""
+
+    type_tag = 'json'
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, default=_encode_message)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data, object_hook=_decode_message)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, str]:
+        return self.type_tag, self.dumps(obj)
+
+    def loads_typed(self, data: Tuple[str, Union[str, bytes]]) -> Any:
+        return self.loads(data[1])
+
+
+class OrjsonSerializer:
+    type_tag = 'orjson.v1'
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise RuntimeError("The orjson package is required for the orjson.v1 checkpoint format")
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, str]:
+        return self.type_tag, orjson.dumps(obj, default=_encode_message, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads_typed(self, data: Tuple[str, Union[str, bytes]]) -> Any:
+        payload = data[1]
+        marker = b'"__type__"' if isinstance(payload, (bytes, bytearray)) else '"__type__"'
+        if marker in payload:
+            # Messages inside: the C json parser with an object_hook beats orjson + a Python walk
+            return LegacyJsonSerializer().loads_typed(data)
+        # Most payloads (scores, fund tables) have no messages and decode entirely in orjson
+        return orjson.loads(payload)
+
+
+class MsgpackSerializer:
+    type_tag = 'msgpack.v1'
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise RuntimeError("The msgpack package is required for the msgpack.v1 checkpoint format")
+
+    @staticmethod
+    def _default(o: Any) -> Any:
+        if isinstance(o, BaseMessage):
+            body = msgpack.packb([o.__class__.__name__, o.model_dump()], default=MsgpackSerializer._default)
+            return msgpack.ExtType(_MESSAGE_EXT_TYPE, body)
+        if isinstance(o, Send):
+            return msgpack.ExtType(_SEND_EXT_TYPE, msgpack.packb([o.node, o.arg], default=MsgpackSerializer._default))
+        raise TypeError(f'Object of type {o.__class__.__name__} is not msgpack serializable')
+
+    @staticmethod
+    def _ext_hook(code: int, body: bytes) -> Any:
+        if code == _SEND_EXT_TYPE:
+            return Send(*msgpack.unpackb(body, ext_hook=MsgpackSerializer._ext_hook, strict_map_key=False))
+        if code != _MESSAGE_EXT_TYPE:
+            return msgpack.ExtType(code, body)
+        type_name, data = msgpack.unpackb(body, ext_hook=MsgpackSerializer._ext_hook, strict_map_key=False)
+        return _message_class(type_name).model_construct(**data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.type_tag, msgpack.packb(obj, default=self._default)
+
+    def loads_typed(self, data: Tuple[str, Union[str, bytes]]) -> Any:
+        return msgpack.unpackb(bytes(data[1]), ext_hook=self._ext_hook, strict_map_key=False)
+
+
+SERIALIZERS: Dict[str, Any] = {'json': LegacyJsonSerializer}
+if orjson is not None:
+    SERIALIZERS['orjson.v1'] = OrjsonSerializer
+if msgpack is not None:
+    SERIALIZERS['msgpack.v1'] = MsgpackSerializer
+
+
+def register_serializer(serializer_cls) -> None:
+    """Make a serializer class (with type_tag, dumps_typed and loads_typed) available for reads and writes."""
+    SERIALIZERS[serializer_cls.type_tag] = serializer_cls
+
+
+class VersionedSerializer:
+    """
+    LangGraph serializer that writes with one format and reads any registered format.
+
+    dumps/loads (used for the metadata attribute) always produce plain JSON text so
+    metadata stays readable and filterable regardless of the payload format.
+    """
+
+    def __init__(self, type_tag: str = CHECKPOINT_SERDE) -> None:
+        if type_tag not in SERIALIZERS:
+            raise ValueError(f"Unknown checkpoint serializer '{type_tag}' (available: {', '.join(SERIALIZERS)})")
+        self.type_tag = type_tag
+        self._instances: Dict[str, Any] = {}
+
+    def _get(self, type_tag: str):
+        serializer = self._instances.get(type_tag)
+        if serializer is None:
+            if type_tag not in SERIALIZERS:
+                raise ValueError(f"Unknown checkpoint serializer '{type_tag}'")
+            serializer = self._instances[type_tag] = SERIALIZERS[type_tag]()
+        return serializer
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, Union[str, bytes]]:
+        return self._get(self.type_tag).dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[str, Union[str, bytes]]) -> Any:
+        return self._get(data[0]).loads_typed(data)
+
+    def dumps(self, obj: Any) -> str:
+        text_format = 'orjson.v1' if 'orjson.v1' in SERIALIZERS else 'json'
+        return self._get(text_format).dumps_typed(obj)[1]
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        text_format = 'orjson.v1' if 'orjson.v1' in SERIALIZERS else 'json'
+        return self._get(text_format).loads_typed((text_format, data))
@@ -1,9 +1,9 @@
 import os
-from langchain_community.utilities import SQLDatabase
+import threading
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-import boto3
-from sqlalchemy import inspect
+
+# SQLAlchemy, PyAthena, LangChain e boto3 são importados dentro das funções:
+# importar este módulo não deve custar nada para quem não consulta o Athena.
 
 # Load environment variables from .env
 load_dotenv()
@@ -18,8 +18,38 @@ CONNECTION_STRING = (
     f"&work_group=primary"
 )
 
+# Reaproveitamento de resultados do próprio Athena (workgroups com engine v3); 0 desativa
+ATHENA_RESULT_REUSE_MINUTES = int(os.getenv("ATHENA_RESULT_REUSE_MINUTES", "60"))
+
 _db_instance = None
 _engine_instance = None
+_lock = threading.Lock()
+
+def get_engine():
+    """
+    Retorna o engine do SQLAlchemy conectado ao Athena, criando-o no primeiro uso
+    """
+    global _engine_instance
+    
+    if _engine_instance is None:
+        with _lock:
+            if _engine_instance is None:
+                from sqlalchemy import create_engine
+                
+                connect_args = {
+                    'catalog': 'AwsDataCatalog'
+                }
+                if ATHENA_RESULT_REUSE_MINUTES > 0:
+                    connect_args['result_reuse_enable'] = True
+                    connect_args['result_reuse_minutes'] = ATHENA_RESULT_REUSE_MINUTES
+                
+                # Criar engine do SQLAlchemy apenas se não existir
+                _engine_instance = create_engine(
+                    CONNECTION_STRING,
+                    echo=True,
+                    connect_args=connect_args
+                )
+    return _engine_instance
 
 def create_db():
     """
@@ -29,27 +59,54 @@ def create_db():
     Returns:
         SQLDatabase: Banco de dados configurado e engine para o Langchain
     """
-    global _db_instance, _engine_instance
+    global _db_instance
     
-    if _db_instance is None or _engine_instance is None:
-        # Criar engine do SQLAlchemy apenas se não existir
-        _engine_instance = create_engine(
-            CONNECTION_STRING,
-            echo=True,
-            connect_args={
-                'catalog': 'AwsDataCatalog'
-            }
-        )
-        
-        # Criar conexão do SQLDatabase apenas se não existir
-        _db_instance = SQLDatabase(_engine_instance)
+    if _db_instance is None:
+        engine = get_engine()
+        with _lock:
+            if _db_instance is None:
+                from langchain_community.utilities import SQLDatabase
+                
+                # Criar conexão do SQLDatabase apenas se não existir
+                # (reflete o schema no Athena, por isso só acontece no primeiro uso)
+                _db_instance = SQLDatabase(engine)
 
     return _db_instance, _engine_instance
 
+def _json_safe(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+def run_query(query, parameters=None):
+    """
+    Executa uma query no Athena direto pelo engine, sem o SQLDatabase
+    
+    Returns:
+        Lista de dicionários (coluna -> valor), com valores serializáveis em JSON
+    """
+    from sqlalchemy import text
+    
+    with get_engine().connect() as conn:
+        result = conn.execute(text(query), parameters or {})
+        return [
+            {key: _json_safe(value) for key, value in row.items()}
+            for row in result.mappings()
+        ]
+
 def get_tables_schema_glue(engine, glue_db):
     """
     Retorna a descrição e as colunas, garantindo que arrays e JSON sejam corretamente identificados.
     """
+    import boto3
+    from sqlalchemy import inspect
+    
     glue_client = boto3.client('glue', region_name=AWS_REGION)
     inspector = inspect(engine)
 
@@ -100,6 +157,8 @@ def create_db_sqlalchemy():
     Cria e retorna um banco de dados conectado ao SQLAlchemy, 
     reutilizando conexões existentes
     """
+    from sqlalchemy import create_engine
+    
     return create_engine(CONNECTION_STRING)
     
 
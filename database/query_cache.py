@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cache persistente dos resultados de queries do Athena.
+#
+# A chave é o SQL normalizado mais os parâmetros da query. Cada tabela pode ter
+# seu próprio TTL; passado o TTL, a entrada ainda é servida durante uma janela
+# stale-while-revalidate enquanto uma thread em segundo plano a atualiza. O
+# armazenamento é um arquivo SQLite pequeno, limitado pelo número de entradas
+# (as usadas há mais tempo saem primeiro).
+
+DEFAULT_CACHE_PATH = os.getenv("WALTER_QUERY_CACHE_PATH", ".cache/athena_queries.sqlite")
+DEFAULT_TTL_SECONDS = float(os.getenv("WALTER_QUERY_CACHE_TTL", "3600"))
+DEFAULT_STALE_SECONDS = float(os.getenv("WALTER_QUERY_CACHE_STALE", "86400"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("WALTER_QUERY_CACHE_MAX_ENTRIES", "5000"))
+
+# Os snapshots do Attio são atualizados poucas vezes por dia; as buscas toleram esse atraso
+TABLE_TTLS = {
+    "nekt_trusted.attio_records_companies": 6 * 3600,
+    "nekt_trusted.attio_records_people": 6 * 3600,
+}
+
+_TABLE_RE = re.compile(r"\b(?:from|join)\s+([\w\.\"]+)", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """Colapsa os espaços para que diferenças de formatação não mudem a chave do cache."""
+    return " ".join(query.split())
+
+
+def query_tables(query: str):
+    return [name.replace('"', '').lower() for name in _TABLE_RE.findall(query)]
+
+
+class QueryCache:
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        default_ttl: float = DEFAULT_TTL_SECONDS,
+        stale_seconds: float = DEFAULT_STALE_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        table_ttls: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.table_ttls = dict(TABLE_TTLS if table_ttls is None else table_ttls)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.metrics = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "evictions": 0}
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_results (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    tables TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_query_results_accessed ON query_results (accessed_at)")
+
+    def key(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        payload = json.dumps([normalize_sql(query), parameters or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, query: str) -> float:
+        ttls = [self.table_ttls[t] for t in query_tables(query) if t in self.table_ttls]
+        return min(ttls) if ttls else self.default_ttl
+
+    def _count(self, metric: str) -> None:
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def get_or_run(self, query: str, parameters: Optional[Dict[str, Any]], run: Callable[[], Any]) -> Any:
+        """
+        Devolve o resultado em cache de (query, parameters), rodando `run()` se não houver.
+        Entradas vencidas são devolvidas na hora e atualizadas em segundo plano.
+        """
+        key = self.key(query, parameters)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT result, stored_at FROM query_results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE query_results SET accessed_at = ? WHERE key = ?", (now, key))
+
+        if row is not None:
+            result, stored_at = json.loads(row[0]), row[1]
+            age = now - stored_at
+            ttl = self.ttl_for(query)
+            if age <= ttl:
+                self._count("hits")
+                return result
+            if age <= ttl + self.stale_seconds:
+                self._count("stale_hits")
+                self._refresh_in_background(key, query, run)
+                return result
+
+        self._count("misses")
+        result = run()
+        self._store(key, query, result)
+        return result
+
+    def _refresh_in_background(self, key: str, query: str, run: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, query, run())
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_errors")
+                logger.warning(f"Falha ao atualizar em segundo plano a query {normalize_sql(query)[:80]}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="query-cache-refresh", daemon=True).start()
+
+    def _store(self, key: str, query: str, result: Any) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO query_results (key, query, tables, result, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_sql(query), ",".join(query_tables(query)), json.dumps(result, default=str), now, now),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM query_results").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM query_results WHERE key IN (SELECT key FROM query_results ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+                with self._lock:
+                    self.metrics["evictions"] += excess
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Remove todas as entradas, ou só as que leem de `table`."""
+        with self._connect() as conn:
+            if table is None:
+                conn.execute("DELETE FROM query_results")
+            else:
+                conn.execute(
+                    "DELETE FROM query_results WHERE ',' || tables || ',' LIKE ?",
+                    (f"%,{table.lower()},%",),
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.metrics)
+        lookups = metrics["hits"] + metrics["stale_hits"] + metrics["misses"]
+        metrics["hit_rate"] = (metrics["hits"] + metrics["stale_hits"]) / lookups if lookups else 0.0
+        with self._connect() as conn:
+            (metrics["entries"],) = conn.execute("SELECT COUNT(*) FROM query_results").fetchone()
+        return metrics
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    """Instância compartilhada do cache no processo."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryCache()
+    return _cache
@@ -1,13 +1,41 @@
-from langchain.tools import tool
 from typing import Literal
-from langchain_openai import ChatOpenAI
-from langchain.output_parsers.structured import StructuredOutputParser
 from typing import TypedDict
+import os
 import time
-from database.engine import create_db
+from database.engine import create_db, run_query as run_athena_query
+from database.query_cache import get_query_cache
 from services.find_record import list_record_entries
-from services.web_scraper import get_search_results
-db, engine = create_db()
+from services import cassette
+from services.candidate_ranker import count, fast_path, project_candidates
+from services.name_index import search_candidates
+
+# O banco (SQLDatabase + engine do Athena) é criado no primeiro uso, não no import:
+# criar o SQLDatabase reflete o schema no Athena e custa alguns segundos.
+def __getattr__(name):
+    if name == "db":
+        return create_db()[0]
+    if name == "engine":
+        return create_db()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def run_query(query: str, parameters: dict | None = None):
+    """
+    Executa uma query no Athena passando pelo cache de resultados e pela cassette (record/replay).
+
+    Com a cassette ligada o cache fica de fora: um acerto do cache não seria gravado
+    (record) nem conferido contra a cassette (replay).
+
+    Returns:
+        Lista de linhas (dicionários coluna -> valor)
+    """
+    key = {"query": " ".join(query.split()), "parameters": parameters}
+
+    def run():
+        return cassette.call("athena", key, lambda: run_athena_query(query, parameters))
+
+    if cassette.get_mode() != "off":
+        return run()
+    return get_query_cache().get_or_run(query, parameters, run)
 
 def get_record_id_from_name(name: str, object: Literal["companies", "people"], additional_info: str = ""):
     """
@@ -72,6 +100,11 @@ def get_record_id_candidates_from_name_companies(name: str, limit: int = 50):
     """
     Get the record id of a company from its name.
     """
+    # Índice local primeiro; o Athena só é consultado se o índice não tiver candidatos
+    candidates = search_candidates("companies", name, limit)
+    if candidates:
+        return candidates
+
     # Usando LOWER() em ambos os lados para busca case-insensitive
     query = """
         SELECT * 
@@ -82,8 +115,9 @@ def get_record_id_candidates_from_name_companies(name: str, limit: int = 50):
         LIMIT :limit
     """
     
-    result = db.run(query, parameters={
-        "search_pattern": f"%{name.strip()}%",
+    # O nome é normalizado para que variações de caixa/espaços usem a mesma entrada do cache
+    result = run_query(query, parameters={
+        "search_pattern": f"%{name.strip().lower()}%",
         "limit": limit
     })
     return result
@@ -92,12 +126,24 @@ def get_record_id_candidates_from_name_people(name: str, limit: int = 50):
     """
     Get the record id of a person from its name.
     """
-    query = f"SELECT * FROM nekt_trusted.attio_records_people WHERE name LIKE '%{name}%' LIMIT {limit}"
+    candidates = search_candidates("people", name, limit)
+    if candidates:
+        return candidates
+
+    query = """
+        SELECT * 
+        FROM nekt_trusted.attio_records_people 
+        WHERE LOWER(name) LIKE LOWER(:search_pattern)
+        LIMIT :limit
+    """
     
-    result = db.run(query)
+    result = run_query(query, parameters={
+        "search_pattern": f"%{name.strip().lower()}%",
+        "limit": limit
+    })
     return result
 
-def evaluate_sql_query_results(sql_query_results: list[str], name: str, additional_info: str):
+def evaluate_sql_query_results(sql_query_results: list[dict], name: str, additional_info: str):
     """
     Evaluate the sql query results and return the best match.
     """
@@ -115,8 +161,25 @@ def evaluate_sql_query_results(sql_query_results: list[str], name: str, addition
         reason: str
         other_columns: dict[str, str]
 
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    llm = llm.with_structured_output(llmResponse)
+    count("lookups")
+    # Casos óbvios (candidato único, nome exato, líder com folga) não precisam do LLM,
+    # a menos que a informação adicional precise ser conferida
+    decision = fast_path(sql_query_results, name, additional_info)
+    if decision is not None:
+        count("fast_path")
+        return llmResponse(**decision)
+
+    # Casos ambíguos: só os candidatos mais prováveis e as colunas relevantes
+    sql_query_results = project_candidates(sql_query_results, name)
+
+    count("llm_calls")
+    if os.getenv("WALTER_FAKE_LLM"):
+        from services.fake_llm import FakeChatModel
+        llm = FakeChatModel(model_name="fake-gpt-4o-mini")
+    else:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    llm = cassette.wrap_llm(llm.with_structured_output(llmResponse), "evaluate_sql_query_results")
 
     prompt = f"""
     You are a helpful assistant that evaluates the sql query results and returns the best match according to the name
@@ -126,7 +189,7 @@ def evaluate_sql_query_results(sql_query_results: list[str], name: str, addition
     {sql_query_results}
 
     The name you are looking for is: {name}
-    The information that appears first in the sql query results is the most recent interaction. Use that to weight the results.
+    The results are sorted by similarity to the name; use the last_interaction column (most recent first) to weight the results.
     {"The additional information is: {additional_info}" if additional_info else ""}
     """
     
@@ -142,26 +205,28 @@ def create_query_name(name: str, additional_info: str):
     """
     Create a query name from a name and additional information.
     """
+    from langchain_openai import ChatOpenAI
     llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
     prompt = f"""
     You are a helpful assistant that creates a query name from a name and additional information.
     The name is: {name}
     The additional information is: {additional_info}
     """
-    response = llm.invoke(prompt)
+    response = cassette.wrap_llm(llm, "create_query_name").invoke(prompt)
     return response
 
 def create_query_market(name: str, additional_info: str):
     """
     Create a query market from a name and additional information.
     """
+    from langchain_openai import ChatOpenAI
     llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
     prompt = f"""
     You are a helpful assistant that queries the market of a company based on the name and additional information.
     The name is: {name}
     The additional information is: {additional_info}
     """
-    response = llm.invoke(prompt)
+    response = cassette.wrap_llm(llm, "create_query_market").invoke(prompt)
     return response
 
 
@@ -0,0 +1,122 @@
+import json
+import math
+import sys
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+# Tabela colunar de pontuações usada no caminho quente do workflow.
+# Em vez de uma lista de FundScore (um objeto pydantic por fundo), guardamos:
+#   - names:   nomes internados (sys.intern) em um array de objetos
+#   - scores:  array float64 contíguo
+#   - reasons: lista de textos, só convertida em FundScore quando necessário
+# A conversão para pydantic acontece apenas na fronteira com a UI/LLM.
+class ScoreTable:
+    __slots__ = ("names", "scores", "_reasons", "_order")
+
+    def __init__(self, names=None, scores=None, reasons=None):
+        self.names = np.asarray(names if names is not None else [], dtype=object)
+        self.scores = np.asarray(scores if scores is not None else [], dtype=np.float64)
+        self._reasons = list(reasons) if reasons is not None else [""] * len(self.names)
+        # Índices para as razões quando a tabela é uma fatia de outra (evita copiar os textos)
+        self._order = None
+
+    @classmethod
+    def from_fund_scores(cls, fund_scores: Iterable) -> "ScoreTable":
+        """Cria a tabela a partir de objetos com fund_name/score/reason (FundScore ou dicts)."""
+        names, scores, reasons = [], [], []
+        for fund in fund_scores:
+            if isinstance(fund, dict):
+                names.append(sys.intern(str(fund["fund_name"])))
+                scores.append(fund["score"])
+                reasons.append(fund.get("reason", ""))
+            else:
+                names.append(sys.intern(fund.fund_name))
+                scores.append(fund.score)
+                reasons.append(fund.reason)
+        return cls(names, scores, reasons)
+
+    @classmethod
+    def coerce(cls, fund_scores) -> "ScoreTable":
+        """Aceita uma ScoreTable ou uma lista de FundScore."""
+        if isinstance(fund_scores, ScoreTable):
+            return fund_scores
+        return cls.from_fund_scores(fund_scores or [])
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def _take(self, idx: np.ndarray) -> "ScoreTable":
+        table = ScoreTable.__new__(ScoreTable)
+        table.names = self.names[idx]
+        table.scores = self.scores[idx]
+        table._reasons = self._reasons
+        table._order = self._order[idx] if self._order is not None else np.asarray(idx)
+        return table
+
+    def reason(self, i: int) -> str:
+        if self._order is not None:
+            return self._reasons[int(self._order[i])]
+        return self._reasons[i]
+
+    @property
+    def reasons(self) -> List[str]:
+        return [self.reason(i) for i in range(len(self))]
+
+    def normalize(self) -> "ScoreTable":
+        """Escala as pontuações para 0-100 (50 para todos se forem iguais)."""
+        table = self._take(np.arange(len(self)))
+        if len(self) == 0:
+            return table
+        min_score = self.scores.min()
+        spread = self.scores.max() - min_score
+        if spread > 0:  # evitar divisão por zero
+            table.scores = (self.scores - min_score) * (100.0 / spread)
+        else:
+            # Caso todas as pontuações sejam iguais
+            table.scores = np.full(len(self), 50.0)
+        return table
+
+    def top_k(self, k: int) -> "ScoreTable":
+        """Os k melhores em ordem decrescente; empates mantêm a ordem original, como o sorted() anterior."""
+        k = max(0, min(k, len(self)))
+        # argsort estável da tabela inteira: o argpartition escolhia arbitrariamente entre
+        # fundos empatados na fronteira do corte (a ordenação só do prefixo não corrige isso)
+        return self._take(np.argsort(-self.scores, kind="stable")[:k])
+
+    def top_fraction(self, percentage: float) -> "ScoreTable":
+        return self.top_k(math.ceil(percentage * len(self)))
+
+    def filter_min_score(self, min_score: float) -> "ScoreTable":
+        return self._take(np.flatnonzero(self.scores >= min_score))
+
+    def to_records(self) -> List[dict]:
+        return [
+            {"fund_name": name, "score": float(score), "reason": self.reason(i)}
+            for i, (name, score) in enumerate(zip(self.names, self.scores))
+        ]
+
+    def to_fund_scores(self, model=None) -> list:
+        """Materializa objetos pydantic (fronteira com UI/LLM)."""
+        if model is None:
+            from utils import FundScore as model
+        return [
+            model.model_construct(fund_name=name, score=float(score), reason=self.reason(i))
+            for i, (name, score) in enumerate(zip(self.names, self.scores))
+        ]
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({"fund_name": self.names, "score": self.scores, "reason": self.reasons})
+
+    def to_json(self, filename: Optional[str] = None, indent: Optional[int] = 4) -> str:
+        data = json.dumps(self.to_records(), ensure_ascii=False, indent=indent)
+        if filename:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(data)
+        return data
+
+    def to_parquet(self, filename: str) -> None:
+        # Requer pyarrow ou fastparquet instalados
+        self.to_dataframe().to_parquet(filename, index=False)
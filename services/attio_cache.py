@@ -0,0 +1,302 @@
+import copy
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cache por registro da saída de find_record.list_record_entries (entradas, detalhes e notas).
+#
+# Cada registro (object + record_id) fica em um LRU em memória apoiado por um SQLite
+# em disco. Até ATTIO_CACHE_TTL_SECONDS após a última validação a resposta sai direto
+# do cache. Depois disso, antes de baixar tudo de novo, o cache revalida com uma
+# chamada barata: a primeira página de /entries (e de /notes, para empresas) com
+# If-None-Match/If-Modified-Since quando o Attio devolve ETag/Last-Modified, ou
+# comparando o hash da página. Se nada mudou, só a data de validação é atualizada.
+# Passado ATTIO_CACHE_MAX_AGE_SECONDS (mudanças nos valores de uma entrada não
+# aparecem na listagem), o registro é sempre baixado de novo.
+#
+# Invalidação explícita: RecordEntriesCache.invalidate() e o webhook do Attio em api.py.
+
+ATTIO_CACHE_ENABLED = os.getenv("WALTER_ATTIO_CACHE", "1") != "0"
+ATTIO_CACHE_PATH = os.getenv("WALTER_ATTIO_CACHE_PATH", ".cache/attio_records.sqlite")
+ATTIO_CACHE_TTL_SECONDS = float(os.getenv("WALTER_ATTIO_CACHE_TTL", "900"))
+ATTIO_CACHE_MAX_AGE_SECONDS = float(os.getenv("WALTER_ATTIO_CACHE_MAX_AGE", "86400"))
+ATTIO_CACHE_MEMORY_ENTRIES = int(os.getenv("WALTER_ATTIO_CACHE_MEMORY_ENTRIES", "256"))
+ATTIO_CACHE_DISK_ENTRIES = int(os.getenv("WALTER_ATTIO_CACHE_DISK_ENTRIES", "5000"))
+# Segredo do webhook do Attio (header Attio-Signature); sem ele o webhook fica desligado
+ATTIO_WEBHOOK_SECRET = os.getenv("WALTER_ATTIO_WEBHOOK_SECRET")
+
+
+def _validator_requests(record_id: str, object: str):
+    """(nome, caminho, params) das chamadas baratas que indicam se o registro mudou."""
+    from services.attio_client import PAGE_SIZE
+
+    page = {"limit": PAGE_SIZE, "offset": 0}
+    requests = [("entries", f"/v2/objects/{object}/records/{record_id}/entries", page)]
+    if object == "companies":
+        requests.append(("notes", "/v2/notes", {"parent_object": object, "parent_record_id": record_id, **page}))
+    return requests
+
+
+def probe_validators(record_id: str, object: str, previous: Optional[Dict] = None):
+    """
+    Consulta os validadores atuais do registro.
+
+    Returns:
+        (validadores, mudou): mudou é False só se todas as chamadas indicarem que nada mudou
+    """
+    from services.attio_client import get_attio_client
+
+    client = get_attio_client()
+    previous = previous or {}
+    validators, changed = {}, not previous
+    for name, path, params in _validator_requests(record_id, object):
+        prev = previous.get(name) or {}
+        headers = {}
+        if prev.get("etag"):
+            headers["If-None-Match"] = prev["etag"]
+        if prev.get("last_modified"):
+            headers["If-Modified-Since"] = prev["last_modified"]
+
+        response = client.get(path, params, headers=headers or None)
+        if response.status_code == 304:
+            validators[name] = prev
+            continue
+        if not response.ok:
+            raise RuntimeError(f"Attio {path}: status {response.status_code}")
+        validators[name] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "digest": hashlib.sha256(response.text.encode("utf-8")).hexdigest(),
+        }
+        if validators[name]["digest"] != prev.get("digest"):
+            changed = True
+    return validators, changed
+
+
+class RecordEntriesCache:
+    def __init__(
+        self,
+        path: str = ATTIO_CACHE_PATH,
+        ttl: float = ATTIO_CACHE_TTL_SECONDS,
+        max_age: float = ATTIO_CACHE_MAX_AGE_SECONDS,
+        memory_entries: int = ATTIO_CACHE_MEMORY_ENTRIES,
+        disk_entries: int = ATTIO_CACHE_DISK_ENTRIES,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_age = max_age
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "revalidated": 0, "refetches": 0, "misses": 0, "invalidations": 0}
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS record_entries (
+                    key TEXT PRIMARY KEY,
+                    object TEXT NOT NULL,
+                    record_id TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    validators TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    validated_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_record_entries_accessed ON record_entries (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_record_entries_record ON record_entries (record_id)")
+
+    @staticmethod
+    def key(record_id: str, object: str) -> str:
+        return f"{object}:{record_id}"
+
+    def _count(self, metric: str):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    # ---------- Leitura / escrita ----------
+
+    def _remember(self, key: str, entry: Dict):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, validators, stored_at, validated_at FROM record_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE record_entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        entry = {
+            "value": json.loads(row[0]),
+            "validators": json.loads(row[1]),
+            "stored_at": row[2],
+            "validated_at": row[3],
+        }
+        self._remember(key, entry)
+        return entry
+
+    def put(self, record_id: str, object: str, value: Any, validators: Optional[Dict] = None, stored_at: Optional[float] = None):
+        now = time.time()
+        key = self.key(record_id, object)
+        entry = {"value": value, "validators": validators or {}, "stored_at": stored_at or now, "validated_at": now}
+        self._remember(key, entry)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO record_entries "
+                "(key, object, record_id, value, validators, stored_at, validated_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, object, record_id, json.dumps(value, default=str), json.dumps(entry["validators"]),
+                 entry["stored_at"], now, now),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM record_entries").fetchone()
+            if count > self.disk_entries:
+                conn.execute(
+                    "DELETE FROM record_entries WHERE key IN (SELECT key FROM record_entries ORDER BY accessed_at LIMIT ?)",
+                    (count - self.disk_entries,),
+                )
+
+    def get(self, record_id: str, object: str) -> Optional[Any]:
+        """Valor ainda dentro do TTL (sem nenhuma chamada ao Attio) ou None."""
+        entry = self._lookup(self.key(record_id, object))
+        if entry is None or time.time() - entry["validated_at"] > self.ttl:
+            return None
+        self._count("hits")
+        return copy.deepcopy(entry["value"])
+
+    def get_or_fetch(self, record_id: str, object: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Retorna o valor do cache, revalidando-o se o TTL passou; baixa tudo com `fetch()`
+        quando não há entrada, quando o Attio indica mudança ou após o max_age.
+        """
+        from services.attio_client import get_attio_client
+
+        key = self.key(record_id, object)
+        entry = self._lookup(key)
+        now = time.time()
+
+        if entry is not None:
+            if now - entry["validated_at"] <= self.ttl:
+                self._count("hits")
+                return copy.deepcopy(entry["value"])
+            if now - entry["stored_at"] <= self.max_age:
+                try:
+                    validators, changed = probe_validators(record_id, object, entry["validators"])
+                except Exception as e:
+                    logger.warning(f"Falha ao revalidar {key}: {e}")
+                    validators, changed = entry["validators"], True
+                if not changed:
+                    self._count("revalidated")
+                    self.put(record_id, object, entry["value"], validators, stored_at=entry["stored_at"])
+                    return copy.deepcopy(entry["value"])
+            self._count("refetches")
+        else:
+            self._count("misses")
+
+        # Validadores lidos antes (ou junto) do conteúdo: uma mudança no meio só causa um refetch extra
+        validators_future = get_attio_client().submit(probe_validators, record_id, object)
+        value = fetch()
+        try:
+            validators = validators_future.result()[0]
+        except Exception as e:
+            logger.warning(f"Falha ao ler validadores de {key}: {e}")
+            validators = {}
+        self.put(record_id, object, value, validators)
+        return copy.deepcopy(value)
+
+    # ---------- Invalidação ----------
+
+    def invalidate(self, record_id: Optional[str] = None, object: Optional[str] = None):
+        """Remove um registro (em qualquer objeto se `object` for None), um objeto inteiro ou tudo."""
+        self._count("invalidations")
+        with self._lock:
+            for key in list(self._memory):
+                key_object, key_record = key.split(":", 1)
+                if (record_id is None or key_record == record_id) and (object is None or key_object == object):
+                    del self._memory[key]
+        clauses, params = [], []
+        if record_id is not None:
+            clauses.append("record_id = ?")
+            params.append(record_id)
+        if object is not None:
+            clauses.append("object = ?")
+            params.append(object)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM record_entries{where}", params)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.metrics)
+            metrics["memory_entries"] = len(self._memory)
+        with self._connect() as conn:
+            (metrics["disk_entries"],) = conn.execute("SELECT COUNT(*) FROM record_entries").fetchone()
+        return metrics
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Confere o HMAC-SHA256 do corpo enviado pelo Attio (sempre False sem segredo configurado)."""
+    if not ATTIO_WEBHOOK_SECRET:
+        return False
+    expected = hmac.new(ATTIO_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return bool(signature) and hmac.compare_digest(expected, signature)
+
+
+def record_ids_from_webhook(payload: Dict) -> List[str]:
+    """record_ids afetados pelos eventos de um webhook do Attio (registros, entradas de lista e notas)."""
+    record_ids = set()
+    for event in payload.get("events", []):
+        ids = event.get("id") or {}
+        for record_id in (ids.get("record_id"), event.get("parent_record_id"), ids.get("parent_record_id")):
+            if record_id:
+                record_ids.add(record_id)
+    return sorted(record_ids)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_record_entries_cache() -> RecordEntriesCache:
+    """Instância compartilhada pelo processo."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RecordEntriesCache()
+    return _cache
@@ -0,0 +1,211 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from services import cassette
+from services.cassette import CassetteResponse
+
+# Cliente da API do Attio com sessão HTTP reaproveitada.
+#
+# AttioClient usa um requests.Session com pool de conexões keep-alive (e retry em
+# 429/5xx), compartilhado pelo processo; AsyncAttioClient faz o mesmo com aiohttp.
+# Os dois limitam quantas requisições ficam em voo ao mesmo tempo
+# (WALTER_ATTIO_MAX_CONCURRENCY) e paginam /entries e /notes com limit/offset.
+# Todas as chamadas passam pela cassette (record/replay).
+
+ATTIO_BASE_URL = os.getenv("ATTIO_BASE_URL", "https://api.attio.com").rstrip("/")
+ATTIO_MAX_CONCURRENCY = int(os.getenv("WALTER_ATTIO_MAX_CONCURRENCY", "8"))
+ATTIO_TIMEOUT_SECONDS = float(os.getenv("WALTER_ATTIO_TIMEOUT", "30"))
+# Limite máximo de itens por página aceito pelo endpoint de notas
+PAGE_SIZE = 50
+
+
+def _headers(api_key: Optional[str]) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key or os.getenv('ATTIO_API_KEY')}",
+        "Content-Type": "application/json",
+    }
+
+
+def _entry_path(list_slug: str, entry_id: str) -> str:
+    return f"/v2/lists/{list_slug}/entries/{entry_id}"
+
+
+def _notes_params(object: str, record_id: str) -> Dict[str, str]:
+    return {"parent_object": object, "parent_record_id": record_id}
+
+
+class AttioClient:
+    """Cliente síncrono; é thread-safe e pode ser compartilhado (ver get_attio_client)."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = ATTIO_BASE_URL,
+        max_concurrency: int = ATTIO_MAX_CONCURRENCY,
+        timeout: float = ATTIO_TIMEOUT_SECONDS,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(_headers(api_key))
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="attio")
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None):
+        """
+        GET em um caminho da API (ex.: /v2/notes). O header de autorização não entra na chave
+        da cassette; headers condicionais (If-None-Match...) entram, pois mudam a resposta.
+        """
+        url = f"{self.base_url}{path}"
+        key = {"url": url, "params": params, **({"headers": headers} if headers else {})}
+        return cassette.call(
+            "attio", key, lambda: self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        )
+
+    def get_paginated(self, path: str, params: Optional[Dict[str, Any]] = None, page_size: int = PAGE_SIZE) -> List[Dict]:
+        """Todas as páginas de um endpoint de listagem (campo "data"), seguindo limit/offset."""
+        items, offset = [], 0
+        while True:
+            response = self.get(path, {**(params or {}), "limit": page_size, "offset": offset})
+            if not response.ok:
+                raise RuntimeError(f"Attio {path}: status {response.status_code}: {response.text[:200]}")
+            page = response.json()["data"]
+            items.extend(page)
+            if len(page) < page_size:
+                return items
+            offset += page_size
+
+    def record_entries(self, object: str, record_id: str) -> List[Dict]:
+        return self.get_paginated(f"/v2/objects/{object}/records/{record_id}/entries")
+
+    def entry(self, list_slug: str, entry_id: str) -> Dict:
+        response = self.get(_entry_path(list_slug, entry_id))
+        if response.status_code == 200:
+            return response.json()["data"]
+        return {"error": f"Status code: {response.status_code}", "message": response.text}
+
+    def notes(self, object: str, record_id: str) -> List[Dict]:
+        return self.get_paginated("/v2/notes", _notes_params(object, record_id))
+
+    def submit(self, fn, *args) -> concurrent.futures.Future:
+        """Agenda uma chamada no pool do cliente (no máximo max_concurrency em paralelo)."""
+        return self._executor.submit(fn, *args)
+
+    def entries_details(self, entries: List[Dict]) -> List[Dict]:
+        """Detalhes de várias entradas em paralelo, na mesma ordem de `entries`."""
+        futures = [self.submit(self.entry, e["list_api_slug"], e["entry_id"]) for e in entries]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"error": str(e)})
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+class AsyncAttioClient:
+    """
+    Cliente assíncrono (aiohttp). A sessão pertence ao event loop em que foi criada:
+
+        async with AsyncAttioClient() as client:
+            entries = await client.record_entries("companies", record_id)
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = ATTIO_BASE_URL,
+        max_concurrency: int = ATTIO_MAX_CONCURRENCY,
+        timeout: float = ATTIO_TIMEOUT_SECONDS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(
+            headers=_headers(self.api_key),
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    async def _fetch(self, url: str, params: Optional[Dict[str, Any]]) -> CassetteResponse:
+        async with self._semaphore:
+            async with self.session.get(url, params=params) as response:
+                text = await response.text()
+                return CassetteResponse(response.status, text, dict(response.headers), str(response.url))
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> CassetteResponse:
+        url = f"{self.base_url}{path}"
+        key = {"url": url, "params": params}
+        return await cassette.acall("attio", key, lambda: self._fetch(url, params))
+
+    async def get_paginated(self, path: str, params: Optional[Dict[str, Any]] = None, page_size: int = PAGE_SIZE) -> List[Dict]:
+        items, offset = [], 0
+        while True:
+            response = await self.get(path, {**(params or {}), "limit": page_size, "offset": offset})
+            if not response.ok:
+                raise RuntimeError(f"Attio {path}: status {response.status_code}: {response.text[:200]}")
+            page = response.json()["data"]
+            items.extend(page)
+            if len(page) < page_size:
+                return items
+            offset += page_size
+
+    async def record_entries(self, object: str, record_id: str) -> List[Dict]:
+        return await self.get_paginated(f"/v2/objects/{object}/records/{record_id}/entries")
+
+    async def entry(self, list_slug: str, entry_id: str) -> Dict:
+        try:
+            response = await self.get(_entry_path(list_slug, entry_id))
+        except Exception as e:
+            return {"error": str(e)}
+        if response.status_code == 200:
+            return response.json()["data"]
+        return {"error": f"Status code: {response.status_code}", "message": response.text}
+
+    async def notes(self, object: str, record_id: str) -> List[Dict]:
+        return await self.get_paginated("/v2/notes", _notes_params(object, record_id))
+
+    async def entries_details(self, entries: List[Dict]) -> List[Dict]:
+        return await asyncio.gather(*(self.entry(e["list_api_slug"], e["entry_id"]) for e in entries))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_attio_client() -> AttioClient:
+    """Cliente síncrono compartilhado pelo processo (mantém as conexões abertas entre buscas)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AttioClient()
+    return _client
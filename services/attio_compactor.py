@@ -0,0 +1,153 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Compacta a saída de find_record.list_record_entries antes de mandá-la a um LLM.
+#
+# As entradas do Attio vêm com ids de atores, timestamps, históricos de status e
+# atributos vazios. Aqui cada entrada vira {título legível do atributo: valor} só
+# com valores preenchidos e ativos, textos repetidos entre listas aparecem uma vez
+# e as notas são limitadas às mais recentes, com tamanho máximo por nota e no total.
+
+MAX_NOTES = 10
+NOTE_MAX_CHARS = 1500
+NOTES_MAX_CHARS = 8000
+VALUE_MAX_CHARS = 1000
+# Valores a partir deste tamanho que se repetem entre listas aparecem só uma vez
+DEDUPE_MIN_CHARS = 40
+
+# Campos de identificação que não ajudam o LLM
+_SKIP_ATTRIBUTE_TYPES = {"actor-reference", "record-reference"}
+
+
+def _humanize(slug: str) -> str:
+    return slug.replace("_", " ").replace("-", " ").strip().capitalize()
+
+
+def attribute_value(value: Dict[str, Any]) -> Optional[str]:
+    """Texto legível de um valor de atributo do Attio (None se vazio ou só ids)."""
+    attribute_type = value.get("attribute_type")
+    if attribute_type in _SKIP_ATTRIBUTE_TYPES:
+        return None
+    if attribute_type == "currency" or "currency_value" in value:
+        amount = value.get("currency_value")
+        return None if amount is None else f"{amount} {value.get('currency_code') or ''}".strip()
+    if attribute_type == "status" or isinstance(value.get("status"), dict):
+        return (value.get("status") or {}).get("title")
+    if attribute_type == "select" or isinstance(value.get("option"), dict):
+        return (value.get("option") or {}).get("title")
+    if attribute_type == "location" or "locality" in value:
+        parts = [value.get(k) for k in ("line_1", "locality", "region", "country_code")]
+        return ", ".join(p for p in parts if p) or None
+    if attribute_type == "interaction" or "interacted_at" in value:
+        when = (value.get("interacted_at") or "")[:10]
+        return f"{value.get('interaction_type') or 'interaction'} em {when}" if when else None
+    for key in ("value", "full_name", "domain", "email_address", "original_phone_number", "phone_number", "title"):
+        if value.get(key) not in (None, "", []):
+            result = value[key]
+            # Datas/timestamps: o dia basta
+            if attribute_type == "timestamp" and isinstance(result, str):
+                result = result[:10]
+            return str(result)
+    return None
+
+
+def compact_entry_values(entry_values: Dict[str, List[Dict]], list_slug: Optional[str] = None) -> Dict[str, Any]:
+    """{título do atributo: valor ou lista de valores} só com valores ativos e preenchidos."""
+    titles = _attribute_titles(list_slug)
+    compacted = {}
+    for slug, values in (entry_values or {}).items():
+        texts = []
+        for value in values or []:
+            # Históricos (ex.: status anteriores) têm active_until preenchido
+            if not isinstance(value, dict) or value.get("active_until"):
+                continue
+            text = attribute_value(value)
+            if text and text not in texts:
+                texts.append(text[:VALUE_MAX_CHARS])
+        if texts:
+            compacted[titles.get(slug) or _humanize(slug)] = texts[0] if len(texts) == 1 else texts
+    return compacted
+
+
+def _attribute_titles(list_slug: Optional[str]) -> Dict[str, str]:
+    if not list_slug:
+        return {}
+    from services.attio_metadata import get_attio_metadata
+
+    try:
+        attributes = get_attio_metadata().attributes("lists", list_slug)
+    except Exception:
+        return {}
+    return {slug: attribute.get("title") for slug, attribute in attributes.items() if attribute.get("title")}
+
+
+def compact_notes(notes: List[Dict], max_notes: int = MAX_NOTES, note_max_chars: int = NOTE_MAX_CHARS,
+                  total_max_chars: int = NOTES_MAX_CHARS) -> List[Dict[str, str]]:
+    """Notas mais recentes primeiro, sem duplicatas, truncadas por nota e no total."""
+    ordered = sorted(
+        (n for n in notes if isinstance(n, dict)),
+        key=lambda n: n.get("created_at") or "",
+        reverse=True,
+    )
+    compacted, seen, total = [], set(), 0
+    for note in ordered:
+        content = " ".join((note.get("content_plaintext") or note.get("content_markdown") or "").split())
+        title = (note.get("title") or "").strip()
+        if not content and not title:
+            continue
+        fingerprint = (title, content)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+
+        content = content[:min(note_max_chars, total_max_chars - total)]
+        total += len(content)
+        compacted.append({"date": (note.get("created_at") or "")[:10], "title": title, "content": content})
+        if len(compacted) >= max_notes or total >= total_max_chars:
+            break
+    return compacted
+
+
+def compact_record_entries(record_entries: List[Any]) -> Dict[str, Any]:
+    """
+    Versão compacta de list_record_entries: {"lists": [{"list", "values"}], "notes": [...]}.
+    Textos longos que se repetem em várias listas aparecem só na primeira.
+    """
+    lists, notes, seen = [], [], set()
+    for item in record_entries or []:
+        if isinstance(item, list):
+            # As notas vêm como o último item (lista) para empresas
+            notes.extend(item)
+            continue
+        if not isinstance(item, dict) or "list_api_slug" not in item:
+            continue
+
+        details = item.get("details") or {}
+        values = compact_entry_values(details.get("entry_values") or {}, item.get("list_api_slug"))
+        unique = {}
+        for title, value in values.items():
+            text = json.dumps(value, ensure_ascii=False, sort_keys=True)
+            # Valores curtos (status, etapa...) dizem algo sobre cada lista; textos longos repetidos não
+            if len(text) >= DEDUPE_MIN_CHARS:
+                if (title, text) in seen:
+                    continue
+                seen.add((title, text))
+            unique[title] = value
+        lists.append({"list": item.get("name") or item.get("list_api_slug"), "values": unique})
+
+    return {"lists": lists, "notes": compact_notes(notes)}
+
+
+def compact_company_record(company_record: Dict[str, Any]) -> Dict[str, Any]:
+    """Saída de get_record_id_from_name com record_entries compactado."""
+    if not isinstance(company_record, dict):
+        return company_record
+    compacted = {k: v for k, v in company_record.items() if k != "record_entries"}
+    if "record_entries" in company_record:
+        compacted["record_entries"] = compact_record_entries(company_record["record_entries"])
+    return compacted
+
+
+def to_prompt_text(data: Any) -> str:
+    """JSON enxuto (sem espaços extras) para colar no prompt."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Metadados do workspace do Attio (listas e definições de atributos) em memória.
+#
+# As listas são carregadas uma vez em dicionários por slug e por id e atualizadas
+# pela API (/v2/lists) a cada ATTIO_METADATA_TTL_SECONDS, em segundo plano depois
+# da primeira carga. Cada atualização bem-sucedida é salva em disco; sem acesso à
+# API, vale o último snapshot salvo ou, por fim, o services/lists.json versionado.
+# Os atributos de cada lista/objeto são buscados na primeira vez que são pedidos.
+
+ATTIO_METADATA_TTL_SECONDS = float(os.getenv("WALTER_ATTIO_METADATA_TTL", "3600"))
+ATTIO_METADATA_SNAPSHOT = Path(os.getenv("WALTER_ATTIO_METADATA_SNAPSHOT", ".cache/attio_metadata.json"))
+BUNDLED_LISTS_JSON = Path(__file__).parent / "lists.json"
+# Intervalo mínimo entre tentativas quando a API falha ou um slug não é encontrado
+REFRESH_RETRY_SECONDS = 300
+
+
+class AttioMetadata:
+    def __init__(self, ttl: float = ATTIO_METADATA_TTL_SECONDS, snapshot_path: Path = ATTIO_METADATA_SNAPSHOT):
+        self.ttl = ttl
+        self.snapshot_path = Path(snapshot_path)
+        self.lists_by_slug: Dict[str, Dict] = {}
+        self.lists_by_id: Dict[str, Dict] = {}
+        # (target, identifier) -> {"by_slug": {...}, "by_id": {...}, "loaded_at": ...}
+        self._attributes: Dict[tuple, Dict] = {}
+        self._loaded_at = None
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    # ---------- Listas ----------
+
+    def _index_lists(self, lists):
+        self.lists_by_slug = {list_["api_slug"]: list_ for list_ in lists}
+        self.lists_by_id = {list_["id"]["list_id"]: list_ for list_ in lists if isinstance(list_.get("id"), dict)}
+
+    def _load_snapshot(self):
+        for path in (self.snapshot_path, BUNDLED_LISTS_JSON):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._index_lists(snapshot["data"])
+            logger.info(f"Metadados do Attio carregados do snapshot {path}")
+            return
+
+    def refresh(self) -> bool:
+        """Recarrega as listas pela API. Retorna False (mantendo os dados atuais) se a API falhar."""
+        from services.attio_client import get_attio_client
+
+        self._last_attempt = time.time()
+        if not os.getenv("ATTIO_API_KEY"):
+            return False
+        try:
+            response = get_attio_client().get("/v2/lists")
+            if not response.ok:
+                raise RuntimeError(f"status {response.status_code}")
+            lists = response.json()["data"]
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar as listas do Attio: {e}")
+            return False
+
+        with self._lock:
+            self._index_lists(lists)
+            self._loaded_at = time.time()
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"data": lists}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar o snapshot dos metadados do Attio: {e}")
+        return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="attio-metadata-refresh", daemon=True).start()
+
+    def _ensure_lists(self):
+        if not self.lists_by_slug:
+            with self._lock:
+                if not self.lists_by_slug:
+                    self._load_snapshot()
+            # Primeira carga: tenta a API já, para não começar de um snapshot velho
+            if self._loaded_at is None:
+                self.refresh()
+            return
+        expired = self._loaded_at is None or time.time() - self._loaded_at > self.ttl
+        if expired and time.time() - self._last_attempt > REFRESH_RETRY_SECONDS:
+            self._refresh_in_background()
+
+    def get_list(self, slug_or_id: str) -> Optional[Dict]:
+        """Lista pelo api_slug ou pelo list_id. Um slug desconhecido força uma atualização (lista nova)."""
+        self._ensure_lists()
+        found = self.lists_by_slug.get(slug_or_id) or self.lists_by_id.get(slug_or_id)
+        if found is None and time.time() - self._last_attempt > REFRESH_RETRY_SECONDS:
+            self.refresh()
+            found = self.lists_by_slug.get(slug_or_id) or self.lists_by_id.get(slug_or_id)
+        return found
+
+    def list_name(self, slug_or_id: str) -> str:
+        found = self.get_list(slug_or_id)
+        if found is None:
+            raise ValueError(f"List slug {slug_or_id} not found")
+        return found["name"]
+
+    # ---------- Atributos ----------
+
+    def attributes(self, target: str, identifier: str) -> Dict[str, Dict]:
+        """
+        Definições de atributos de uma lista ou objeto, por api_slug.
+
+        Args:
+            target: "lists" ou "objects"
+            identifier: slug/id da lista ou do objeto (ex.: "companies")
+        """
+        key = (target, identifier)
+        cached = self._attributes.get(key)
+        if cached is not None and time.time() - cached["loaded_at"] <= self.ttl:
+            return cached["by_slug"]
+
+        from services.attio_client import get_attio_client
+
+        try:
+            if not os.getenv("ATTIO_API_KEY"):
+                raise RuntimeError("ATTIO_API_KEY não configurada")
+            response = get_attio_client().get(f"/v2/{target}/{identifier}/attributes")
+            if not response.ok:
+                raise RuntimeError(f"status {response.status_code}")
+            attributes = response.json()["data"]
+        except Exception as e:
+            logger.info(f"Atributos de {target}/{identifier} indisponíveis: {e}")
+            # Mantém a versão anterior (se houver) e só tenta de novo depois do intervalo de retry
+            by_slug = cached["by_slug"] if cached else {}
+            by_id = cached["by_id"] if cached else {}
+            self._attributes[key] = {
+                "by_slug": by_slug, "by_id": by_id,
+                "loaded_at": time.time() - self.ttl + REFRESH_RETRY_SECONDS,
+            }
+            return by_slug
+
+        by_slug = {a["api_slug"]: a for a in attributes}
+        by_id = {a["id"]["attribute_id"]: a for a in attributes if isinstance(a.get("id"), dict)}
+        self._attributes[key] = {"by_slug": by_slug, "by_id": by_id, "loaded_at": time.time()}
+        return by_slug
+
+    def attribute_title(self, target: str, identifier: str, slug_or_id: str) -> str:
+        """Título legível do atributo; sem definição conhecida, o próprio slug."""
+        by_slug = self.attributes(target, identifier)
+        attribute = by_slug.get(slug_or_id) or self._attributes[(target, identifier)]["by_id"].get(slug_or_id)
+        return attribute.get("title", slug_or_id) if attribute else slug_or_id
+
+
+_metadata = None
+_metadata_lock = threading.Lock()
+
+
+def get_attio_metadata() -> AttioMetadata:
+    """Instância compartilhada pelo processo."""
+    global _metadata
+    if _metadata is None:
+        with _metadata_lock:
+            if _metadata is None:
+                _metadata = AttioMetadata()
+    return _metadata
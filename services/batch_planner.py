@@ -0,0 +1,252 @@
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Escolha automática de batch_size e max_workers para a pontuação dos fundos.
+#
+# Latência de um lote por modelo: t(bs) = a + b·bs (custo fixo da chamada + tempo por
+# fundo), ajustada por mínimos quadrados sobre os lotes de execuções anteriores.
+# Cada execução registrada multiplica o peso das antigas por BATCH_PROFILE_DECAY, então
+# o perfil acompanha mudanças de latência do provedor. Um prior (pontos com peso
+# BATCH_PRIOR_WEIGHT nas pontas da faixa) segura a inclinação enquanto os lotes
+# observados têm quase todos o mesmo tamanho. O perfil fica em BATCH_PROFILE_PATH.
+#
+# O workflow pontua o primeiro lote sozinho e o resto em ondas de max_workers lotes:
+#   tempo ≈ t(bs) · (1 + ceil((lotes - 1) / workers))
+#   custo ≈ lotes · (tokens fixos do prompt + tokens por fundo · bs) · preço de entrada
+#           + fundos · BATCH_OUTPUT_TOKENS_PER_FUND · preço de saída
+# Lotes maiores pagam menos vezes o prompt fixo; lotes menores e mais workers terminam antes.
+
+BATCH_PROFILE_PATH = os.getenv("WALTER_BATCH_PROFILE_PATH", ".cache/batch_profile.json")
+BATCH_PROFILE_DECAY = float(os.getenv("WALTER_BATCH_PROFILE_DECAY", "0.8"))
+BATCH_PRIOR_WEIGHT = float(os.getenv("WALTER_BATCH_PRIOR_WEIGHT", "0.5"))
+BATCH_TARGET_SECONDS = float(os.getenv("WALTER_BATCH_TARGET_SECONDS", "120"))
+BATCH_MAX_SIZE = int(os.getenv("WALTER_BATCH_MAX_SIZE", "50"))
+BATCH_MAX_WORKERS = int(os.getenv("WALTER_BATCH_MAX_WORKERS", "16"))
+BATCH_OUTPUT_TOKENS_PER_FUND = int(os.getenv("WALTER_BATCH_OUTPUT_TOKENS_PER_FUND", "200"))
+
+# Prior para modelos sem histórico: segundos por chamada e por fundo
+DEFAULT_LATENCY = (4.0, 0.8)
+
+# USD por milhão de tokens (entrada, saída), pelo trecho do nome do modelo;
+# WALTER_BATCH_PRICES (JSON no mesmo formato) acrescenta ou substitui preços
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "o3-mini": (1.10, 4.40),
+    "gpt-4o-mini": (0.15, 0.60),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-3-haiku": (0.25, 1.25),
+}
+MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("WALTER_BATCH_PRICES", "{}")).items()})
+
+
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    for name, price in MODEL_PRICES.items():
+        if name in model:
+            return price
+    return None
+
+
+class LatencyFit:
+    """Mínimos quadrados ponderados de segundos por lote contra o tamanho do lote (somas acumuladas)."""
+
+    def __init__(self, sums: Optional[Dict[str, float]] = None):
+        self.sums = {"w": 0.0, "x": 0.0, "y": 0.0, "xx": 0.0, "xy": 0.0, **(sums or {})}
+
+    def decay(self, factor: float):
+        for key in self.sums:
+            self.sums[key] *= factor
+
+    def add(self, batch_size: int, seconds: float, weight: float = 1.0):
+        s = self.sums
+        s["w"] += weight
+        s["x"] += weight * batch_size
+        s["y"] += weight * seconds
+        s["xx"] += weight * batch_size * batch_size
+        s["xy"] += weight * batch_size * seconds
+
+    def coefficients(self, prior: Tuple[float, float] = DEFAULT_LATENCY, prior_weight: float = BATCH_PRIOR_WEIGHT) -> Tuple[float, float]:
+        """
+        (a, b) de t(bs) = a + b·bs, com o prior somado como dois pontos nas pontas da faixa.
+
+        Com observações, o prior é reescalado para passar pela média delas: só a forma
+        (razão a/b) vem do prior, e um modelo muito mais rápido ou lento que o prior não
+        tem a inclinação puxada por ele enquanto os lotes têm quase o mesmo tamanho.
+        """
+        a0, b0 = prior
+        fit = LatencyFit(dict(self.sums))
+        if self.sums["w"] > 0:
+            scale = (self.sums["y"] / self.sums["w"]) / (a0 + b0 * self.sums["x"] / self.sums["w"])
+            a0, b0 = a0 * scale, b0 * scale
+        for x in (1, BATCH_MAX_SIZE):
+            fit.add(x, a0 + b0 * x, prior_weight)
+        s = fit.sums
+        variance = s["w"] * s["xx"] - s["x"] ** 2
+        b = (s["w"] * s["xy"] - s["x"] * s["y"]) / variance
+        a = (s["y"] - b * s["x"]) / s["w"]
+        return max(a, 0.0), max(b, 0.0)
+
+
+@dataclass
+class BatchPlan:
+    batch_size: int
+    max_workers: int
+    batches: int
+    predicted_seconds: float
+    predicted_cost: Optional[float]
+    model: str
+    reason: str
+    actual_seconds: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class BatchPlanner:
+    """Perfis de latência por modelo (persistidos em JSON) e escolha do plano de lotes."""
+
+    def __init__(self, path: str = BATCH_PROFILE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._profiles, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def latency(self, model: str) -> Tuple[float, float]:
+        """(a, b) atuais do modelo: segundos por chamada e por fundo."""
+        with self._lock:
+            sums = self._profiles.get(model, {}).get("sums")
+        return LatencyFit(sums).coefficients()
+
+    def profile(self, model: str) -> Dict[str, Any]:
+        with self._lock:
+            stored = dict(self._profiles.get(model, {}))
+        a, b = LatencyFit(stored.get("sums")).coefficients()
+        return {"model": model, "a": round(a, 3), "b": round(b, 3),
+                "runs": stored.get("runs", 0), "updated_at": stored.get("updated_at")}
+
+    def profiles(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            models = list(self._profiles)
+        return [self.profile(model) for model in models]
+
+    def record(self, model: str, batches: Sequence[Tuple[int, float]]):
+        """Soma os lotes (tamanho, segundos) de uma execução ao perfil do modelo e grava o arquivo."""
+        if not batches:
+            return
+        with self._lock:
+            stored = self._profiles.setdefault(model, {"runs": 0})
+            fit = LatencyFit(stored.get("sums"))
+            fit.decay(BATCH_PROFILE_DECAY)
+            for batch_size, seconds in batches:
+                fit.add(batch_size, seconds)
+            stored.update(sums=fit.sums, runs=stored["runs"] + 1, updated_at=time.time())
+            try:
+                self._save()
+            except OSError as e:
+                print(f"Erro ao gravar o perfil de lotes: {e}")
+
+    def predict(self, model: str, funds: int, batch_size: int, max_workers: int,
+                prompt_tokens: int = 0, tokens_per_fund: int = 0) -> Tuple[float, Optional[float]]:
+        """(segundos, custo em USD ou None) previstos para pontuar `funds` fundos."""
+        a, b = self.latency(model)
+        return self._estimate(model, (a, b), funds, batch_size, max_workers, prompt_tokens, tokens_per_fund)
+
+    @staticmethod
+    def _estimate(model, latency, funds, batch_size, max_workers, prompt_tokens, tokens_per_fund):
+        a, b = latency
+        batches = math.ceil(funds / batch_size)
+        waves = 1 + math.ceil((batches - 1) / max_workers) if batches else 0
+        seconds = waves * (a + b * min(batch_size, funds))
+        price = model_price(model)
+        if price is None:
+            return seconds, None
+        input_tokens = batches * prompt_tokens + funds * tokens_per_fund
+        cost = (input_tokens * price[0] + funds * BATCH_OUTPUT_TOKENS_PER_FUND * price[1]) / 1_000_000
+        return seconds, cost
+
+    def plan(
+        self,
+        funds: int,
+        model: str,
+        target_seconds: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        prompt_tokens: int = 0,
+        tokens_per_fund: int = 0,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_workers: int = BATCH_MAX_WORKERS,
+    ) -> BatchPlan:
+        """
+        Escolhe batch_size e max_workers para pontuar `funds` fundos.
+
+        Entre os planos que cabem no prazo (target_seconds) e no orçamento (max_cost),
+        fica o mais barato e, no empate, o de menos workers (menos pressão no limite de
+        requisições). Sem target_seconds, o prazo é BATCH_TARGET_SECONDS. Se nenhum
+        plano cabe, fica o mais rápido dentro do orçamento ou, sem isso, o mais barato.
+        Sem preço conhecido para o modelo, "mais barato" vira "menos chamadas".
+        """
+        latency = self.latency(model)
+        target = target_seconds or BATCH_TARGET_SECONDS
+        candidates = []
+        for batch_size in range(1, max(1, min(max_batch_size, funds)) + 1):
+            batches = math.ceil(funds / batch_size)
+            # Mais workers do que lotes em paralelo não muda nada
+            for workers in range(1, max(1, min(max_workers, batches - 1)) + 1):
+                seconds, cost = self._estimate(model, latency, funds, batch_size, workers, prompt_tokens, tokens_per_fund)
+                candidates.append((batch_size, workers, batches, seconds, cost))
+
+        def price(c):
+            return c[4] if c[4] is not None else c[2]
+
+        affordable = [c for c in candidates if max_cost is None or c[4] is None or c[4] <= max_cost]
+        on_time = [c for c in affordable if c[3] <= target]
+        if on_time:
+            choice = min(on_time, key=lambda c: (price(c), c[1], c[3]))
+            reason = f"mais barato dentro de {target:.0f}s"
+        elif affordable:
+            choice = min(affordable, key=lambda c: (c[3], price(c), c[1]))
+            reason = f"nenhum plano cabe em {target:.0f}s: o mais rápido" + (" dentro do orçamento" if max_cost else "")
+        else:
+            choice = min(candidates, key=lambda c: (price(c), c[3]))
+            reason = f"nenhum plano cabe no orçamento de US$ {max_cost:.2f}: o mais barato"
+
+        batch_size, workers, batches, seconds, cost = choice
+        return BatchPlan(
+            batch_size=batch_size,
+            max_workers=workers,
+            batches=batches,
+            predicted_seconds=round(seconds, 1),
+            predicted_cost=round(cost, 4) if cost is not None else None,
+            model=model,
+            reason=reason,
+        )
+
+
+_planner = None
+_planner_lock = threading.Lock()
+
+
+def get_batch_planner() -> BatchPlanner:
+    """Instância compartilhada (o perfil é gravado em BATCH_PROFILE_PATH)."""
+    global _planner
+    if _planner is None:
+        with _planner_lock:
+            if _planner is None:
+                _planner = BatchPlanner()
+    return _planner
@@ -0,0 +1,136 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from services.name_index import normalize_name
+
+# Ranker determinístico dos candidatos de uma busca por nome.
+#
+# Antes de pedir ao LLM para escolher entre os candidatos, pontua cada um por
+# nome exato, distância de edição normalizada e recência da última interação.
+# Quando a escolha é óbvia (um único candidato parecido, um único nome exato ou
+# um líder com folga), a resposta sai direto daqui; só os casos ambíguos vão ao
+# LLM, e com um conjunto reduzido de colunas. Buscas com informação adicional
+# (setor, cargo, cidade...) sempre vão ao LLM: o ranker só olha o nome.
+
+FAST_PATH_ENABLED = os.getenv("WALTER_LOOKUP_FAST_PATH", "1") != "0"
+
+# Similaridade mínima para aceitar um candidato único
+SINGLE_CANDIDATE_MIN_SIMILARITY = 0.6
+# Similaridade mínima e folga sobre o segundo colocado para aceitar o líder
+LEADER_MIN_SIMILARITY = 0.9
+LEADER_MIN_MARGIN = 0.25
+# Peso da recência (0-1 entre os candidatos) no score final
+RECENCY_WEIGHT = 0.1
+
+# Colunas enviadas ao LLM nos casos ambíguos
+PROJECTED_COLUMNS = [
+    "record_id", "name", "domain", "domains", "description", "categories",
+    "primary_location", "job_title", "company", "email_addresses", "last_interaction",
+]
+MAX_LLM_CANDIDATES = 15
+
+LOOKUP_STATS = {"lookups": 0, "fast_path": 0, "llm_calls": 0}
+_stats_lock = threading.Lock()
+
+
+def count(metric: str):
+    with _stats_lock:
+        LOOKUP_STATS[metric] += 1
+
+
+def lookup_stats() -> Dict[str, float]:
+    with _stats_lock:
+        stats = dict(LOOKUP_STATS)
+    stats["fast_path_rate"] = stats["fast_path"] / stats["lookups"] if stats["lookups"] else 0.0
+    return stats
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Distância de Levenshtein (duas linhas da matriz de programação dinâmica)."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def name_similarity(query: str, name: str) -> float:
+    """1 - distância de edição normalizada entre os nomes normalizados."""
+    query, name = normalize_name(query), normalize_name(name)
+    if not query or not name:
+        return 0.0
+    return 1 - edit_distance(query, name) / max(len(query), len(name))
+
+
+def last_interaction(candidate: Dict) -> str:
+    """Data da última interação como texto ISO (aceita a struct do Athena ou o texto do índice)."""
+    value = candidate.get("last_interaction")
+    if isinstance(value, dict):
+        value = value.get("interacted_at")
+    return str(value) if value else ""
+
+
+def rank_candidates(candidates: List[Dict], name: str) -> List[Dict]:
+    """
+    Candidatos ordenados pelo score do ranker, cada um com "similarity" e "rank_score".
+    """
+    dates = sorted({last_interaction(c) for c in candidates if last_interaction(c)})
+    recency = {date: (i + 1) / len(dates) for i, date in enumerate(dates)}
+    query = normalize_name(name)
+
+    ranked = []
+    for candidate in candidates:
+        similarity = name_similarity(query, candidate.get("name") or "")
+        exact = normalize_name(candidate.get("name")) == query
+        score = similarity + (1.0 if exact else 0.0) + RECENCY_WEIGHT * recency.get(last_interaction(candidate), 0.0)
+        ranked.append({**candidate, "similarity": round(similarity, 4), "rank_score": round(score, 4)})
+    ranked.sort(key=lambda c: c["rank_score"], reverse=True)
+    return ranked
+
+
+def _other_columns(candidate: Dict) -> Dict[str, str]:
+    skip = {"record_id", "name", "similarity", "rank_score", "match_score"}
+    return {k: str(v) for k, v in candidate.items() if k not in skip and v not in (None, "", [], {})}
+
+
+def fast_path(candidates: List[Dict], name: str, additional_info: str = "") -> Optional[Dict]:
+    """
+    Decide sem LLM quando a escolha é clara. Retorna um dicionário no formato da
+    resposta do LLM (record_id, reason, other_columns) ou None se for ambíguo ou se
+    houver additional_info, que pode desempatar a favor de outro candidato.
+    """
+    if not FAST_PATH_ENABLED or not candidates or additional_info.strip():
+        return None
+
+    ranked = rank_candidates(candidates, name)
+    top = ranked[0]
+    query = normalize_name(name)
+    exact_matches = [c for c in ranked if normalize_name(c.get("name")) == query]
+
+    if len(ranked) == 1 and top["similarity"] >= SINGLE_CANDIDATE_MIN_SIMILARITY:
+        reason = f"Único candidato encontrado para '{name}' (similaridade {top['similarity']:.2f})"
+    elif len(exact_matches) == 1:
+        top = exact_matches[0]
+        reason = f"Único candidato com o nome exato '{name}'"
+    elif top["similarity"] >= LEADER_MIN_SIMILARITY and top["rank_score"] - ranked[1]["rank_score"] >= LEADER_MIN_MARGIN:
+        reason = f"Candidato mais parecido com '{name}' com folga sobre os demais (similaridade {top['similarity']:.2f})"
+    else:
+        return None
+
+    return {"record_id": top["record_id"], "reason": reason, "other_columns": _other_columns(top)}
+
+
+def project_candidates(candidates: List[Dict], name: str, limit: int = MAX_LLM_CANDIDATES) -> List[Dict]:
+    """Candidatos mais prováveis com apenas as colunas úteis para o LLM desambiguar."""
+    projected = []
+    for candidate in rank_candidates(candidates, name)[:limit]:
+        row = {k: candidate[k] for k in PROJECTED_COLUMNS if candidate.get(k) not in (None, "", [], {})}
+        if "last_interaction" in row:
+            row["last_interaction"] = last_interaction(candidate)
+        projected.append(row)
+    return projected
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Camada de gravação/reprodução ("cassette") para chamadas externas.
+#
+# WALTER_CASSETTE_MODE:    off (padrão) | record | replay
+# WALTER_CASSETTE_DIR:     diretório da cassette (padrão: .cassettes)
+# WALTER_CASSETTE_LATENCY: original (padrão) | zero — latência usada no replay
+#
+# Cada interação é guardada em <dir>/<kind>/<sha256>.json, onde o hash é
+# calculado sobre o tipo da chamada e a sua chave canônica (prompt, query SQL,
+# URL + params...). Assim o mesmo request sempre cai no mesmo arquivo.
+
+MODES = ("off", "record", "replay")
+
+_lock = threading.Lock()
+
+
+class CassetteMiss(LookupError):
+    """Interação não encontrada na cassette durante o replay."""
+
+
+class CassetteResponse:
+    """Resposta HTTP reconstruída a partir da cassette (interface mínima de requests.Response)."""
+
+    def __init__(self, status_code: int, text: str, headers: Optional[Dict[str, str]] = None, url: str = ""):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.url = url
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def get_mode() -> str:
+    mode = os.getenv("WALTER_CASSETTE_MODE", "off").lower()
+    if mode not in MODES:
+        raise ValueError(f"WALTER_CASSETTE_MODE inválido: {mode}")
+    return mode
+
+
+def get_cassette_dir() -> Path:
+    return Path(os.getenv("WALTER_CASSETTE_DIR", ".cassettes"))
+
+
+def replay_latency() -> str:
+    return os.getenv("WALTER_CASSETTE_LATENCY", "original").lower()
+
+
+def cassette_key(kind: str, key: Any) -> str:
+    """Hash de conteúdo da chamada: sha256 do tipo + chave serializada de forma canônica."""
+    payload = json.dumps({"kind": kind, "key": key}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode(obj: Any) -> Any:
+    """Converte respostas (pydantic, mensagens do LangChain, respostas HTTP) para JSON."""
+    from pydantic import BaseModel
+    from langchain_core.messages import BaseMessage
+
+    if isinstance(obj, BaseMessage):
+        from langchain_core.load import dumpd
+        return {"__cassette__": "message", "data": dumpd(obj)}
+    if isinstance(obj, BaseModel):
+        cls = obj.__class__
+        return {
+            "__cassette__": "pydantic",
+            "cls": f"{cls.__module__}:{cls.__qualname__}",
+            "data": obj.model_dump(mode="json"),
+        }
+    if isinstance(obj, CassetteResponse) or hasattr(obj, "status_code") and hasattr(obj, "text"):
+        return {
+            "__cassette__": "http",
+            "status_code": obj.status_code,
+            "text": obj.text,
+            "headers": {k: v for k, v in dict(obj.headers).items() if k.lower() in ("content-type", "etag", "last-modified")},
+            "url": str(getattr(obj, "url", "")),
+        }
+    if isinstance(obj, dict):
+        return {k: _encode(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_encode(v) for v in obj]
+    return obj
+
+
+def _decode(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        tag = obj.get("__cassette__")
+        if tag == "message":
+            from langchain_core.load import load
+            return load(obj["data"])
+        if tag == "pydantic":
+            module_name, qualname = obj["cls"].split(":")
+            try:
+                cls = importlib.import_module(module_name)
+                for part in qualname.split("."):
+                    cls = getattr(cls, part)
+            except (ImportError, AttributeError):
+                # Modelos definidos dentro de funções não são importáveis; basta o acesso por atributo
+                return SimpleNamespace(**obj["data"])
+            return cls.model_validate(obj["data"])
+        if tag == "http":
+            return CassetteResponse(obj["status_code"], obj["text"], obj.get("headers"), obj.get("url", ""))
+        return {k: _decode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v) for v in obj]
+    return obj
+
+
+def _path_for(kind: str, digest: str) -> Path:
+    return get_cassette_dir() / kind / f"{digest}.json"
+
+
+def _load(kind: str, key: Any) -> Tuple[Any, float]:
+    """Lê uma interação gravada e retorna (resposta, latência original)."""
+    digest = cassette_key(kind, key)
+    path = _path_for(kind, digest)
+    if not path.exists():
+        raise CassetteMiss(f"Interação {kind}/{digest} não encontrada em {get_cassette_dir()}")
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    elapsed = entry.get("elapsed", 0) if replay_latency() == "original" else 0
+    return _decode(entry["response"]), elapsed
+
+
+def _record(kind: str, key: Any, result: Any, elapsed: float) -> None:
+    path = _path_for(kind, cassette_key(kind, key))
+    entry = {
+        "kind": kind,
+        "key": key,
+        "elapsed": elapsed,
+        "recorded_at": time.time(),
+        "response": _encode(result),
+    }
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+
+def call(kind: str, key: Any, fn: Callable[[], Any]) -> Any:
+    """
+    Executa `fn` passando pela cassette.
+
+    Args:
+        kind: Tipo da interação (llm, athena, attio, sheets...)
+        key: Chave que identifica a chamada (precisa ser serializável em JSON)
+        fn: Função que faz a chamada real
+
+    Returns:
+        O resultado de `fn` (modo off/record) ou o resultado gravado (modo replay)
+    """
+    mode = get_mode()
+    if mode == "off":
+        return fn()
+    if mode == "replay":
+        result, elapsed = _load(kind, key)
+        time.sleep(elapsed)
+        return result
+
+    start = time.perf_counter()
+    result = fn()
+    _record(kind, key, result, time.perf_counter() - start)
+    return result
+
+
+async def acall(kind: str, key: Any, fn: Callable[[], Any]) -> Any:
+    """Versão assíncrona de `call`: `fn` retorna um awaitable."""
+    mode = get_mode()
+    if mode == "off":
+        return await fn()
+    if mode == "replay":
+        result, elapsed = _load(kind, key)
+        await asyncio.sleep(elapsed)
+        return result
+
+    start = time.perf_counter()
+    result = await fn()
+    _record(kind, key, result, time.perf_counter() - start)
+    return result
+
+
+class CassetteRunnable:
+    """
+    Envolve um LLM/chain do LangChain para que `invoke` passe pela cassette.
+    O nome identifica o modelo/uso e entra na chave junto com a entrada.
+    """
+
+    def __init__(self, runnable, name: str):
+        self.runnable = runnable
+        self.name = name
+
+    def invoke(self, input, *args, **kwargs):
+        key = {"name": self.name, "input": _prompt_key(input)}
+        return call("llm", key, lambda: self.runnable.invoke(input, *args, **kwargs))
+
+    async def ainvoke(self, input, *args, **kwargs):
+        key = {"name": self.name, "input": _prompt_key(input)}
+        return await acall("llm", key, lambda: self.runnable.ainvoke(input, *args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.runnable, name)
+
+
+def _prompt_key(input: Any) -> Any:
+    """Forma canônica da entrada de um LLM (string, mensagens ou variáveis do prompt)."""
+    if isinstance(input, str):
+        return input
+    if hasattr(input, "to_string"):
+        return input.to_string()
+    if isinstance(input, dict):
+        return {k: _prompt_key(v) for k, v in input.items()}
+    if isinstance(input, (list, tuple)):
+        return [_prompt_key(v) for v in input]
+    if hasattr(input, "content"):
+        return {"type": getattr(input, "type", ""), "content": input.content}
+    return str(input)
+
+
+def wrap_llm(runnable, name: str):
+    """
+    Retorna o runnable envolto pela cassette (ou o próprio runnable se o modo for off).
+    O resultado continua sendo um Runnable, então pode ser composto com `prompt | ...`.
+    """
+    if get_mode() == "off":
+        return runnable
+    from langchain_core.runnables import RunnableLambda
+
+    wrapped = CassetteRunnable(runnable, name)
+    return RunnableLambda(wrapped.invoke, afunc=wrapped.ainvoke, name=f"cassette:{name}")
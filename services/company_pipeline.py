@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+from services import cassette
+from services.profiling import NULL_RUN, profile_run
+
+# Pipeline assíncrono do "Buscar informações" do app.
+#
+#   lookup (Athena/Attio) ──────────→ extract ─────────────┐
+#   queries (LLM) ─┬─→ busca empresa ─┐                     ├─→ resultado
+#                  └─→ busca mercado ─┴─→ summary (LLM) ───┘
+#
+# A busca do registro roda junto com a geração das queries e as duas buscas na
+# web rodam em paralelo entre si; a extração começa assim que o registro chega e o
+# resumo assim que as duas buscas terminam. Tudo em um único event loop, com o
+# tempo de cada etapa (início/fim relativos ao começo do pipeline) no resultado.
+
+
+class Query(BaseModel):
+    query_name: str
+    query_market: str
+
+
+class StageTimer:
+    """Guarda início e fim de cada etapa em segundos desde a criação (e as marca no perfil, se houver)."""
+
+    def __init__(self, profiler=NULL_RUN):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.profiler = profiler
+
+    async def run(self, name: str, awaitable: Awaitable, on_stage: Optional[Callable] = None):
+        started = time.perf_counter() - self.start
+        try:
+            with self.profiler.stage(name):
+                return await awaitable
+        finally:
+            ended = time.perf_counter() - self.start
+            self.stages[name] = {"start": round(started, 3), "end": round(ended, 3), "duration": round(ended - started, 3)}
+            if on_stage is not None:
+                on_stage(name, self.stages[name])
+
+    def summary(self) -> Dict[str, Any]:
+        return {"stages": self.stages, "total": round(time.perf_counter() - self.start, 3)}
+
+
+def _llm(temperature: float):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model="gpt-4o-mini", temperature=temperature)
+
+
+async def generate_queries(company_name: str, industry: str = "") -> Query:
+    """Queries de busca sobre a empresa e sobre o mercado."""
+    market = industry or f"em que {company_name} atua"
+    query_prompt = f"""
+    Crie duas queries de busca diferentes para obter informações sobre:
+    1. Uma query que me dá informações sobre {company_name}
+    2. Uma query que me dá estatísticas quantitativas sobre o mercado {market}
+
+    Retorne apenas as duas queries, uma por linha, sem numeração ou texto adicional.
+    """
+    # Temperatura 0: a mesma empresa gera as mesmas queries e as buscas saem do cache do scraper
+    llm = cassette.wrap_llm(_llm(0).with_structured_output(Query), "enrich_queries")
+    return await llm.ainvoke(query_prompt)
+
+
+async def summarize_search_results(company_results, market_results):
+    consolidation_prompt = f"""
+    Analise as informações coletadas e crie um resumo estruturado.
+
+    Informações da empresa:
+    {json.dumps(company_results, indent=2)}
+
+    Informações do mercado:
+    {json.dumps(market_results, indent=2)}
+
+    Formate o resumo em tópicos separados para Empresa e Mercado.
+    """
+    return await cassette.wrap_llm(_llm(0.2), "enrich_summary").ainvoke(consolidation_prompt)
+
+
+async def enrich_company_information(company_name: str, industry: str = "", timer: Optional[StageTimer] = None,
+                                     on_stage: Optional[Callable] = None) -> dict:
+    """Queries, as duas buscas na web em paralelo e o resumo consolidado."""
+    from services.web_scraper import get_search_results
+
+    timer = timer or StageTimer()
+    queries = await timer.run("queries", generate_queries(company_name, industry), on_stage)
+    company_results, market_results = await asyncio.gather(
+        timer.run("search_company", get_search_results(queries.query_name, max_results=2), on_stage),
+        timer.run("search_market", get_search_results(queries.query_market, max_results=4), on_stage),
+    )
+    summary = await timer.run("summary", summarize_search_results(company_results, market_results), on_stage)
+    return {
+        "company_info": company_results,
+        "market_info": market_results,
+        "summary": summary,
+    }
+
+
+async def run_company_pipeline(
+    company_name: str,
+    extract: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    enrich: bool = False,
+    industry_hint: str = "",
+    on_stage: Optional[Callable[[str, Dict[str, float]], None]] = None,
+    profile: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Busca o registro da empresa, extrai os dados do formulário e (opcionalmente) enriquece com a web.
+
+    Args:
+        company_name: Nome buscado
+        extract: Corrotina que recebe a saída de get_record_id_from_name e retorna os dados extraídos
+        enrich: Se True, faz as buscas na web em paralelo com a busca do registro
+        industry_hint: Setor já conhecido (ex.: do formulário), usado na query de mercado
+        on_stage: Chamado com (etapa, tempos) ao fim de cada etapa
+        profile: Liga o perfil por etapa (services/profiling.py); None segue WALTER_PROFILE
+
+    Returns:
+        {"company_record", "company_info", "enriched" (ou None), "timings", "profile" (ou None)}
+    """
+    from get_record_info import get_record_id_from_name
+
+    profiler = profile_run("lookup", profile)
+    timer = StageTimer(profiler)
+
+    async def lookup_and_extract():
+        record = await timer.run(
+            "lookup", asyncio.to_thread(get_record_id_from_name, company_name, "companies"), on_stage
+        )
+        info = await timer.run("extract", extract(record), on_stage)
+        return record, info
+
+    async def enrichment():
+        # Uma falha no enriquecimento não derruba os dados do registro
+        try:
+            return await enrich_company_information(company_name, industry_hint, timer, on_stage)
+        except Exception as e:
+            return {"error": str(e)}
+
+    with profiler:
+        if enrich:
+            (company_record, company_info), enriched = await asyncio.gather(lookup_and_extract(), enrichment())
+        else:
+            (company_record, company_info), enriched = await lookup_and_extract(), None
+
+    return {
+        "company_record": company_record,
+        "company_info": company_info,
+        "enriched": enriched,
+        "timings": timer.summary(),
+        "profile": profiler.summary(),
+    }
@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+
+# LLM falso e determinístico para testes de carga e perfis locais.
+# Ativado com WALTER_FAKE_LLM=1 (ver workflow.get_llm); a latência simulada
+# de cada chamada vem de WALTER_FAKE_LLM_LATENCY (segundos, padrão 0.2).
+
+FAKE_LLM_LATENCY = float(os.getenv("WALTER_FAKE_LLM_LATENCY", "0.2"))
+
+# Linhas do DataFrame.to_string() começam pelo índice da linha
+_ROW_RE = re.compile(r"^\s*(\d+)\s+\S")
+# record_id dos candidatos listados no prompt de evaluate_sql_query_results
+_RECORD_ID_RE = re.compile(r"['\"]record_id['\"]:\s*['\"]([^'\"]+)['\"]")
+
+
+def _prompt_text(input) -> str:
+    if isinstance(input, str):
+        return input
+    if hasattr(input, "to_string"):
+        return input.to_string()
+    return str(input)
+
+
+def _fund_rows(text: str):
+    """Índices das linhas da tabela de fundos presente no prompt."""
+    table = text.split("Here is the table of funds:", 1)[-1].split("Here is the user inputs:", 1)[0]
+    return [m.group(1) for m in map(_ROW_RE.match, table.splitlines()[2:]) if m]
+
+
+def _score_for(key: str) -> float:
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return float(digest[0] % 34) - 4  # mesma faixa do critério real (-4 a 29)
+
+
+class FakeChatModel:
+    """Imita a interface usada do ChatOpenAI/ChatBedrock: invoke, ainvoke e with_structured_output."""
+
+    def __init__(self, model_name: str = "fake", latency: float = FAKE_LLM_LATENCY):
+        self.model_name = model_name
+        self.latency = latency
+
+    def _respond(self, input, schema=None):
+        text = _prompt_text(input)
+        if schema is not None and getattr(schema, "__name__", "") == "FundScoreList":
+            from workflow import FundScore
+            scores = [
+                FundScore(fund_name=f"Fund {row}", score=_score_for(f"{row}:{text[-200:]}"), reason="Fake score")
+                for row in _fund_rows(text)
+            ]
+            return schema(scores=scores)
+        if schema is not None and "record_id" in getattr(schema, "__annotations__", {}):
+            # Escolhe o primeiro candidato (o mais bem ranqueado)
+            match = _RECORD_ID_RE.search(text)
+            return {"record_id": match.group(1) if match else "", "reason": "Fake choice", "other_columns": {}}
+        from langchain_core.messages import AIMessage
+        return AIMessage(content=f"[fake:{self.model_name}] {text[:80]}")
+
+    def invoke(self, input, *args, **kwargs):
+        time.sleep(self.latency)
+        return self._respond(input)
+
+    async def ainvoke(self, input, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._respond(input)
+
+    def with_structured_output(self, schema, **kwargs):
+        from langchain_core.runnables import RunnableLambda
+
+        def invoke(input):
+            time.sleep(self.latency)
+            return self._respond(input, schema)
+
+        async def ainvoke(input):
+            await asyncio.sleep(self.latency)
+            return self._respond(input, schema)
+
+        return RunnableLambda(invoke, afunc=ainvoke, name=f"fake:{self.model_name}")
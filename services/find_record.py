@@ -1,108 +1,138 @@
-import requests
 import os
-import json
-from pathlib import Path
 from collections import defaultdict
+from services.attio_cache import ATTIO_CACHE_ENABLED, get_record_entries_cache
+from services.attio_client import AsyncAttioClient, get_attio_client
+from services.attio_metadata import get_attio_metadata
 
 def get_list_name_from_slug(list_slug:str):
-    lists_json = json.load(open(Path(__file__).parent / "lists.json"))
-    for list in lists_json["data"]:
-        if list["api_slug"] == list_slug:
-            return list["name"]
-    raise ValueError(f"List slug {list_slug} not found")
+    """Nome da lista pelo slug (metadados do Attio em memória, ver services/attio_metadata.py)."""
+    return get_attio_metadata().list_name(list_slug)
 
 ATTIO_API_KEY = os.getenv("ATTIO_API_KEY")
-PATH_TO_LISTS_JSON = Path("./lists.json")
+
+def _latest_entries(entries: list):
+    """
+    Agrupa as entradas por lista e mantém só a mais recente de cada uma.
+    """
+    entries_by_list = defaultdict(list)
+
+    for entry in entries:
+        # Manter o campo created_at para ordenação
+        entries_by_list[entry["list_api_slug"]].append(entry)
+
+    latest_entries = []
+
+    for list_slug, list_entries in entries_by_list.items():
+        # Ordenar entradas por data de criação (mais recente primeiro)
+        if list_entries and "created_at" in list_entries[0]:
+            list_entries.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+
+        latest_entry = list_entries[0]
+        latest_entry["name"] = get_list_name_from_slug(list_slug)
+
+        # Remover campos desnecessários
+        latest_entry.pop("created_at", None)
+        latest_entry.pop("list_id", None)
+
+        latest_entries.append(latest_entry)
+
+    return latest_entries
+
+def _attach_details(latest_entries: list, details: list):
+    for entry, entry_details in zip(latest_entries, details):
+        # Mesclar os detalhes com a informação básica da entrada
+        if isinstance(entry_details, dict) and "error" in entry_details and len(entry_details) == 1:
+            entry["details_error"] = entry_details["error"]
+        else:
+            entry["details"] = entry_details
 
 def list_record_entries(record_id: str, object: str):
-    url = f"https://api.attio.com/v2/objects/{object}/records/{record_id}/entries"
+    """
+    Entradas mais recentes do registro em cada lista, com os detalhes de cada entrada
+    e (para empresas) as notas. Passa pelo cache por registro (services/attio_cache.py).
+    """
+    if not ATTIO_CACHE_ENABLED:
+        return _fetch_record_entries(record_id, object)
+    return get_record_entries_cache().get_or_fetch(
+        record_id, object, lambda: _fetch_record_entries(record_id, object)
+    )
+
+def _fetch_record_entries(record_id: str, object: str):
+    """Busca no Attio; as notas e os detalhes das entradas são buscados em paralelo."""
+    client = get_attio_client()
 
-    headers = {
-        "Authorization": f"Bearer {ATTIO_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    # As notas não dependem das entradas: começam junto com a listagem
+    notes_future = client.submit(get_notes, record_id) if object == "companies" else None
 
     try:
-        response = requests.get(url, headers=headers).json()["data"]
+        response = client.record_entries(object, record_id)
     except Exception as e:
         raise RuntimeError(f"Erro ao buscar entradas do registro: {e}")
 
-    # Agrupar entradas por lista
-    entries_by_list = defaultdict(list)
-    
-    for entry in response:
-        # Manter o campo created_at para ordenação
-        entries_by_list[entry["list_api_slug"]].append(entry)
-    
-    # Obter apenas as entradas mais recentes de cada lista
-    latest_entries = []
-    
-    for list_slug, entries in entries_by_list.items():
-        # Ordenar entradas por data de criação (mais recente primeiro)
-        if entries and "created_at" in entries[0]:
-            entries.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        
-        # Obter apenas a entrada mais recente
-        if entries:
-            latest_entry = entries[0]
-            latest_entry["name"] = get_list_name_from_slug(list_slug)
-            
-            # Remover campos desnecessários
-            latest_entry.pop("created_at", None)
-            latest_entry.pop("list_id", None)
-            
-            # Buscar detalhes adicionais para a entrada
-            try:
-                entry_details = get_entry_details(list_slug, latest_entry["entry_id"])
-                # Mesclar os detalhes com a informação básica da entrada
-                latest_entry["details"] = entry_details
-            except Exception as e:
-                latest_entry["details_error"] = str(e)
-            
-            latest_entries.append(latest_entry)
-
-    if object == "companies":
-        notes = get_notes(record_id)
-        latest_entries.append(notes)
-    
+    latest_entries = _latest_entries(response)
+    _attach_details(latest_entries, client.entries_details(latest_entries))
+
+    if notes_future is not None:
+        latest_entries.append(notes_future.result())
+
+    return latest_entries
+
+async def alist_record_entries(record_id: str, object: str, client: AsyncAttioClient | None = None):
+    """
+    Versão assíncrona de list_record_entries (mesmo formato de saída).
+    Sem `client`, abre uma sessão aiohttp só para esta busca.
+
+    Usa o cache por registro apenas dentro do TTL; a revalidação condicional
+    fica com a versão síncrona.
+    """
+    import asyncio
+
+    if ATTIO_CACHE_ENABLED:
+        cached = get_record_entries_cache().get(record_id, object)
+        if cached is not None:
+            return cached
+
+    if client is None:
+        async with AsyncAttioClient() as client:
+            return await alist_record_entries(record_id, object, client)
+
+    async def notes():
+        try:
+            return await client.notes("companies", record_id)
+        except Exception as e:
+            return {"error": str(e)}
+
+    notes_task = asyncio.create_task(notes()) if object == "companies" else None
+
+    try:
+        response = await client.record_entries(object, record_id)
+    except Exception as e:
+        if notes_task is not None:
+            notes_task.cancel()
+        raise RuntimeError(f"Erro ao buscar entradas do registro: {e}")
+
+    latest_entries = _latest_entries(response)
+    _attach_details(latest_entries, await client.entries_details(latest_entries))
+
+    if notes_task is not None:
+        latest_entries.append(await notes_task)
+
+    if ATTIO_CACHE_ENABLED:
+        get_record_entries_cache().put(record_id, object, latest_entries)
     return latest_entries
 
 def get_entry_details(list_slug: str, entry_id: str):
     """
     Busca informações detalhadas sobre uma entrada específica em uma lista
     """
-    url = f"https://api.attio.com/v2/lists/{list_slug}/entries/{entry_id}"
-    
-    headers = {
-        "Authorization": f"Bearer {ATTIO_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            return {"error": f"Status code: {response.status_code}", "message": response.text}
+        return get_attio_client().entry(list_slug, entry_id)
     except Exception as e:
         return {"error": str(e)}
-    
-def get_notes(record_id: str):
-    url = f"https://api.attio.com/v2/notes"
-
-    headers = {
-        "Authorization": f"Bearer {ATTIO_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    params = {
-        "parent_object": "companies",
-        "parent_record_id": record_id
-    }
 
+def get_notes(record_id: str):
     try:
-        response = requests.get(url, headers=headers, params=params)
-        return response.json()["data"]
+        return get_attio_client().notes("companies", record_id)
     except Exception as e:
         return {"error": str(e)}
 
@@ -0,0 +1,158 @@
+import os
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Extração de título + texto de páginas HTML para o WebScraper.
+#
+# O fluxo antigo (BeautifulSoup + html.parser) montava a árvore inteira, percorria
+# todos os nós de texto e só depois cortava em 2000 caracteres. Aqui os nós de
+# texto são lidos em ordem e a leitura para assim que há texto suficiente.
+# Backends, do mais rápido ao mais lento (o primeiro instalado é usado):
+#   - selectolax (lexbor, C)
+#   - lxml
+#   - html.parser da biblioteca padrão, alimentado em blocos (para no meio do documento)
+
+HTML_BACKEND = os.getenv("WALTER_HTML_BACKEND", "auto")
+CONTENT_MAX_CHARS = 2000
+# Tags cujo texto não é conteúdo
+SKIP_TAGS = ("script", "style", "noscript", "template")
+_FEED_CHUNK = 16 * 1024
+
+
+def _collect(texts: Iterable[str], max_chars: int) -> str:
+    """Junta os nós de texto com espaços normalizados até max_chars (para de consumir ao atingir)."""
+    words: List[str] = []
+    length = 0
+    for text in texts:
+        for word in text.split():
+            words.append(word)
+            length += len(word) + 1
+        if length > max_chars:
+            break
+    return " ".join(words)[:max_chars]
+
+
+def _clean_title(title: Optional[str]) -> str:
+    return " ".join(title.split()) if title else ""
+
+
+# ---------- selectolax ----------
+
+def _extract_selectolax(html: str, max_chars: int) -> Tuple[str, str]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(list(SKIP_TAGS))
+    title = tree.css_first("title")
+    root = tree.root
+    texts = (node.text_content for node in root.traverse(include_text=True) if node.tag == "-text") if root else ()
+    return _clean_title(title.text() if title else None), _collect(texts, max_chars)
+
+
+# ---------- lxml ----------
+
+def _extract_lxml(html: str, max_chars: int) -> Tuple[str, str]:
+    from lxml import html as lxml_html
+
+    document = lxml_html.document_fromstring(html)
+    for element in list(document.iter(*SKIP_TAGS)):
+        element.drop_tree()
+    # itertext é um gerador: o percurso para junto com _collect
+    return _clean_title(document.findtext(".//title")), _collect(document.itertext(), max_chars)
+
+
+# ---------- html.parser ----------
+
+class _Enough(Exception):
+    pass
+
+
+class _TextParser(HTMLParser):
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.words: List[str] = []
+        self.length = 0
+        self.skip_depth = 0
+        self.title: Optional[List[str]] = None
+        self.in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == "title" and self.title is None:
+            self.title, self.in_title = [], True
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag == "title":
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.in_title:
+            self.title.append(data)
+        for word in data.split():
+            self.words.append(word)
+            self.length += len(word) + 1
+        if self.length > self.max_chars:
+            raise _Enough
+
+
+def _extract_html_parser(html: str, max_chars: int) -> Tuple[str, str]:
+    parser = _TextParser(max_chars)
+    try:
+        for start in range(0, len(html), _FEED_CHUNK):
+            parser.feed(html[start:start + _FEED_CHUNK])
+        parser.close()
+    except _Enough:
+        pass
+    return _clean_title("".join(parser.title or [])), " ".join(parser.words)[:max_chars]
+
+
+_BACKENDS: Dict[str, Tuple[str, Callable[[str, int], Tuple[str, str]]]] = {
+    "selectolax": ("selectolax.lexbor", _extract_selectolax),
+    "lxml": ("lxml.html", _extract_lxml),
+    "html.parser": ("html.parser", _extract_html_parser),
+}
+_available: Dict[str, bool] = {}
+
+
+def _is_available(name: str) -> bool:
+    if name not in _available:
+        try:
+            __import__(_BACKENDS[name][0])
+            _available[name] = True
+        except ImportError:
+            _available[name] = False
+    return _available[name]
+
+
+def backend_name(preferred: str = HTML_BACKEND) -> str:
+    """Backend que será usado: o pedido (se instalado) ou o primeiro disponível."""
+    if preferred in _BACKENDS and _is_available(preferred):
+        return preferred
+    return next(name for name in _BACKENDS if _is_available(name))
+
+
+def extract_page(html: str, url: str, max_chars: int = CONTENT_MAX_CHARS, backend: Optional[str] = None) -> Dict:
+    """
+    {"url", "title", "content"} com até max_chars de texto visível.
+
+    Args:
+        html: Documento (pode estar truncado pelo limite de bytes do fetch)
+        url: URL de origem, copiada para o resultado
+        max_chars: Tamanho máximo do texto
+        backend: "selectolax", "lxml" ou "html.parser" (padrão: WALTER_HTML_BACKEND ou o mais rápido instalado)
+    """
+    name = backend_name(backend or HTML_BACKEND)
+    try:
+        title, content = _BACKENDS[name][1](html, max_chars)
+    except Exception:
+        # Documentos vazios ou muito quebrados: o parser da biblioteca padrão aceita qualquer coisa
+        if name == "html.parser":
+            raise
+        title, content = _extract_html_parser(html, max_chars)
+    return {"url": url, "title": title, "content": content}
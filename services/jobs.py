@@ -0,0 +1,300 @@
+import asyncio
+import copy
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Runner de jobs em segundo plano para o workflow de seleção de fundos.
+#
+# O Streamlit re-executa o script a cada interação; se o workflow roda dentro do
+# script, a UI congela e um refresh mata (ou repete) a execução. Aqui cada execução
+# vira um job em um pool de threads do processo, com progresso por lote e
+# resultados parciais, consultáveis (ou "reanexáveis") pelo id do job.
+#
+# Com WALTER_JOBS_CHECKPOINTS=1 o job roda o grafo de workflow_graph.py com o id do job
+# como thread_id dos checkpoints (DynamoDB): se o processo cair, submeter de novo com o
+# mesmo job_id retoma a execução sem pontuar outra vez os lotes que já tinham checkpoint.
+
+JOBS_MAX_WORKERS = int(os.getenv("WALTER_JOBS_MAX_WORKERS", "4"))
+# Jobs finalizados ficam disponíveis por este tempo (segundos) antes de serem descartados
+JOBS_RETENTION_SECONDS = int(os.getenv("WALTER_JOBS_RETENTION_SECONDS", str(6 * 3600)))
+JOBS_CHECKPOINTS = os.getenv("WALTER_JOBS_CHECKPOINTS", "0") == "1"
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+
+@dataclass
+class Job:
+    id: str
+    owner: Optional[str] = None
+    status: str = QUEUED
+    stage: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    batches_done: int = 0
+    total_batches: int = 0
+    total_funds: int = 0
+    partial_results: List[Dict[str, Any]] = field(default_factory=list)
+    # Lotes/workers da pontuação e o tempo previsto (services/batch_planner.py)
+    plan: Optional[Dict[str, Any]] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def progress(self) -> float:
+        """Fração concluída (0-1), baseada nos lotes pontuados."""
+        if self.status == COMPLETED:
+            return 1.0
+        if not self.total_batches:
+            return 0.0
+        return self.batches_done / self.total_batches
+
+    def to_dict(self, include_partial: bool = True) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "owner": self.owner,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "batches_done": self.batches_done,
+            "total_batches": self.total_batches,
+            "total_funds": self.total_funds,
+            "progress": self.progress,
+            "plan": self.plan,
+            "error": self.error,
+        }
+        if include_partial:
+            data["partial_results"] = list(self.partial_results)
+        return data
+
+
+def _snapshot(job: Job) -> Job:
+    # Cópia com listas próprias: o worker continua adicionando resultados ao original
+    return replace(job, partial_results=list(job.partial_results), events=list(job.events))
+
+
+def _score_to_dict(score) -> Dict[str, Any]:
+    if isinstance(score, dict):
+        return dict(score)
+    return {"fund_name": score.fund_name, "score": score.score, "reason": score.reason}
+
+
+class JobManager:
+    """
+    Mantém os jobs do processo e o pool de threads que os executa.
+    Os objetos Job só são alterados sob o lock; leitores recebem cópias.
+    """
+
+    def __init__(self, max_workers: int = JOBS_MAX_WORKERS, runner: Optional[Callable] = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="walter-job")
+        self._jobs: Dict[str, Job] = {}
+        self._futures = {}
+        self._cond = threading.Condition()
+        # Assinantes asyncio (event loop, evento) por job, acordados a cada evento novo
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._runner = runner
+
+    def _run_workflow(self, job_id, inputs, parameters, progress_callback):
+        if self._runner is not None:
+            return self._runner(inputs, parameters, progress_callback=progress_callback)
+        if JOBS_CHECKPOINTS:
+            from workflow_graph import run_fund_selection_graph
+            return run_fund_selection_graph(inputs, parameters, thread_id=job_id, progress_callback=progress_callback)
+        from workflow import run_fund_selection_workflow
+        return run_fund_selection_workflow(inputs, parameters, progress_callback=progress_callback)
+
+    def submit(self, inputs: Dict[str, Any], parameters: Dict[str, Any], owner: Optional[str] = None,
+               job_id: Optional[str] = None) -> str:
+        """
+        Enfileira uma execução do workflow e retorna o id do job.
+
+        Args:
+            inputs: Dados da empresa
+            parameters: Parâmetros de geração (copiados; o job não altera o dicionário do chamador)
+            owner: Identificador opcional de quem submeteu (sessão/usuário)
+            job_id: Id de um job interrompido (queda do processo) para retomá-lo do último
+                checkpoint; só tem efeito com WALTER_JOBS_CHECKPOINTS=1
+        """
+        self._cleanup()
+        job = Job(id=job_id or uuid.uuid4().hex, owner=owner)
+        with self._cond:
+            current = self._jobs.get(job.id)
+            if current is not None and not current.finished:
+                raise ValueError(f"O job {job.id} ainda está em andamento")
+            self._jobs[job.id] = job
+        self._futures[job.id] = self._executor.submit(
+            self._execute, job.id, copy.deepcopy(inputs), copy.deepcopy(parameters)
+        )
+        return job.id
+
+    def _execute(self, job_id: str, inputs, parameters):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = self._run_workflow(job_id, inputs, parameters, lambda event: self._on_progress(job_id, event))
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time(),
+                         event={"type": "status", "status": FAILED, "error": str(e)})
+            return
+        self._update(job_id, status=COMPLETED, result=result, finished_at=time.time(),
+                     event={"type": "status", "status": COMPLETED})
+
+    def _on_progress(self, job_id: str, event: Dict[str, Any]):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if event.get("type") == "stage":
+                job.stage = event["stage"]
+                if "total_funds" in event:
+                    job.total_funds = event["total_funds"]
+                job.events.append(dict(event))
+            elif event.get("type") == "plan":
+                job.plan = {k: v for k, v in event.items() if k != "type"}
+                job.events.append(dict(event))
+            elif event.get("type") == "batch":
+                scores = [_score_to_dict(s) for s in event.get("scores", [])]
+                job.batches_done += 1
+                job.total_batches = event.get("total_batches", job.total_batches)
+                job.partial_results.extend(scores)
+                job.events.append({
+                    "type": "batch",
+                    "batch_index": event.get("batch_index"),
+                    "batches_done": job.batches_done,
+                    "total_batches": job.total_batches,
+                    "scores": scores,
+                    "resumed": event.get("resumed", False),
+                })
+            self._notify(job_id)
+
+    def _update(self, job_id: str, event: Optional[Dict[str, Any]] = None, **changes):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for key, value in changes.items():
+                setattr(job, key, value)
+            if event is not None:
+                job.events.append(event)
+            self._notify(job_id)
+
+    def _notify(self, job_id: str):
+        # Chamado sob o lock: acorda as threads em events_since e os event loops em aevents_since
+        self._cond.notify_all()
+        for loop, event in self._waiters.get(job_id, ()):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # event loop já fechado
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retorna uma cópia do estado atual do job (ou None se não existir)."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return _snapshot(job) if job is not None else None
+
+    def list(self, owner: Optional[str] = None) -> List[Job]:
+        with self._cond:
+            jobs = [_snapshot(j) for j in self._jobs.values() if owner is None or j.owner == owner]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def future(self, job_id: str):
+        """Future do job (concurrent.futures), útil para aguardar com asyncio.wrap_future."""
+        return self._futures.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela um job que ainda está na fila. Jobs em execução não podem ser interrompidos."""
+        future = self._futures.get(job_id)
+        if future is None or not future.cancel():
+            return False
+        self._update(job_id, status=CANCELLED, finished_at=time.time(),
+                     event={"type": "status", "status": CANCELLED})
+        return True
+
+    def events_since(self, job_id: str, cursor: int = 0, timeout: Optional[float] = None):
+        """
+        Retorna (eventos a partir de `cursor`, novo cursor, job finalizado?).
+        Com `timeout`, bloqueia até surgir um evento novo ou o tempo acabar.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if timeout is not None and len(job.events) <= cursor and not job.finished:
+                self._cond.wait_for(lambda: len(job.events) > cursor or job.finished, timeout=timeout)
+            events = job.events[cursor:]
+            return events, cursor + len(events), job.finished
+
+    async def aevents_since(self, job_id: str, cursor: int = 0, timeout: Optional[float] = None):
+        """
+        Versão asyncio de events_since: a espera fica no event loop, sem ocupar uma
+        thread por conexão (o worker do job acorda o loop com call_soon_threadsafe).
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            if job_id not in self._jobs:
+                raise KeyError(job_id)
+            # Registrado antes da primeira leitura: um evento entre a leitura e a espera não se perde
+            self._waiters.setdefault(job_id, []).append(waiter)
+        try:
+            events, new_cursor, finished = self.events_since(job_id, cursor)
+            if events or finished or timeout == 0:
+                return events, new_cursor, finished
+            try:
+                await asyncio.wait_for(waiter[1].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.events_since(job_id, cursor)
+        finally:
+            with self._cond:
+                waiters = self._waiters.get(job_id, [])
+                waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+
+    def _cleanup(self):
+        limit = time.time() - JOBS_RETENTION_SECONDS
+        with self._cond:
+            expired = [j.id for j in self._jobs.values() if j.finished and (j.finished_at or 0) < limit]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+                self._futures.pop(job_id, None)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Instância compartilhada pelo processo (sobrevive aos reruns do Streamlit)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
+
+
+def submit_job(inputs: Dict[str, Any], parameters: Dict[str, Any], owner: Optional[str] = None,
+               job_id: Optional[str] = None) -> str:
+    return get_job_manager().submit(inputs, parameters, owner=owner, job_id=job_id)
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    return get_job_manager().get(job_id)
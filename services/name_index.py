@@ -0,0 +1,261 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services import cassette
+
+logger = logging.getLogger(__name__)
+
+# Índice local de nomes (empresas e pessoas) para responder buscas sem ir ao Athena.
+#
+# Guarda record_id, nome, domínio e última interação de cada registro em um SQLite
+# com FTS5 (tokenizer trigram). Buscas retornam candidatos ranqueados por
+# similaridade de trigramas, prefixo e recência em milissegundos. O Athena só é
+# usado para atualizar o índice (a cada NAME_INDEX_REFRESH_SECONDS) e como fallback.
+
+NAME_INDEX_PATH = os.getenv("WALTER_NAME_INDEX_PATH", ".cache/name_index.sqlite")
+NAME_INDEX_REFRESH_SECONDS = float(os.getenv("WALTER_NAME_INDEX_REFRESH_SECONDS", str(6 * 3600)))
+REFRESH_RETRY_SECONDS = 300
+NAME_INDEX_ENABLED = os.getenv("WALTER_NAME_INDEX", "1") != "0"
+
+# Query de atualização de cada objeto; as colunas precisam se chamar
+# record_id, name, domain e last_interaction
+REFRESH_QUERIES = {
+    "companies": """
+        SELECT
+            record_id,
+            name,
+            CAST(domains AS VARCHAR) AS domain,
+            CAST("last_interaction"."interacted_at" AS VARCHAR) AS last_interaction
+        FROM nekt_trusted.attio_records_companies
+    """,
+    "people": """
+        SELECT
+            record_id,
+            name,
+            CAST(email_addresses AS VARCHAR) AS domain,
+            CAST("last_interaction"."interacted_at" AS VARCHAR) AS last_interaction
+        FROM nekt_trusted.attio_records_people
+    """,
+}
+
+
+def normalize_name(text: Optional[str]) -> str:
+    """Minúsculas, sem acentos e com espaços simples."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(query: str, name: str) -> float:
+    """Similaridade de Jaccard entre os trigramas dos dois textos (0-1)."""
+    a, b = trigrams(query), trigrams(name)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NameIndex:
+    def __init__(self, path: str = NAME_INDEX_PATH, refresh_seconds: float = NAME_INDEX_REFRESH_SECONDS):
+        self.path = Path(path)
+        self.refresh_seconds = refresh_seconds
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+        # Momento da última falha de atualização síncrona, por objeto
+        self._failed_at = {}
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS index_meta (object TEXT PRIMARY KEY, refreshed_at REAL, size INTEGER)")
+            for object in REFRESH_QUERIES:
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS records_{object} (
+                        rowid INTEGER PRIMARY KEY,
+                        record_id TEXT NOT NULL,
+                        name TEXT,
+                        name_norm TEXT,
+                        domain TEXT,
+                        last_interaction TEXT
+                    )
+                """)
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{object}_name_norm ON records_{object} (name_norm)")
+                conn.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS fts_{object} USING fts5(
+                        name_norm, domain, content='records_{object}', content_rowid='rowid', tokenize='trigram'
+                    )
+                """)
+
+    def refreshed_at(self, object: str) -> Optional[float]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT refreshed_at FROM index_meta WHERE object = ?", (object,)).fetchone()
+        return row["refreshed_at"] if row else None
+
+    def refresh(self, object: str) -> int:
+        """Recarrega o índice do objeto a partir do Athena. Retorna o número de registros."""
+        from database.engine import run_query
+
+        query = REFRESH_QUERIES[object]
+        start = time.perf_counter()
+        rows = cassette.call("athena", {"query": " ".join(query.split()), "parameters": None}, lambda: run_query(query))
+        size = self.load(object, rows)
+        logger.info(f"Índice de {object} atualizado: {size} registros em {time.perf_counter() - start:.1f}s")
+        return size
+
+    def load(self, object: str, rows: List[Dict]) -> int:
+        """Substitui o conteúdo do índice do objeto pelas linhas (record_id, name, domain, last_interaction)."""
+        records = [
+            (r["record_id"], r.get("name"), normalize_name(r.get("name")), normalize_name(r.get("domain")), r.get("last_interaction"))
+            for r in rows if r.get("record_id")
+        ]
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM records_{object}")
+            conn.executemany(
+                f"INSERT INTO records_{object} (record_id, name, name_norm, domain, last_interaction) VALUES (?, ?, ?, ?, ?)",
+                records,
+            )
+            conn.execute(f"INSERT INTO fts_{object}(fts_{object}) VALUES ('rebuild')")
+            conn.execute(
+                "INSERT OR REPLACE INTO index_meta (object, refreshed_at, size) VALUES (?, ?, ?)",
+                (object, time.time(), len(records)),
+            )
+        return len(records)
+
+    def _refresh_in_background(self, object: str):
+        with self._refresh_lock:
+            if object in self._refreshing:
+                return
+            self._refreshing.add(object)
+
+        def run():
+            try:
+                self.refresh(object)
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar o índice de {object}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(object)
+
+        threading.Thread(target=run, name=f"name-index-refresh-{object}", daemon=True).start()
+
+    def ensure_fresh(self, object: str) -> bool:
+        """
+        Garante um índice utilizável: vazio → atualiza agora; velho → atualiza em segundo plano.
+        Retorna False se não houver índice disponível (o chamador deve usar o Athena).
+        """
+        refreshed_at = self.refreshed_at(object)
+        if refreshed_at is None:
+            # Sem Athena (ex.: sem credenciais), não tenta de novo a cada busca
+            if time.time() - self._failed_at.get(object, 0) < REFRESH_RETRY_SECONDS:
+                return False
+            try:
+                self.refresh(object)
+            except Exception as e:
+                self._failed_at[object] = time.time()
+                logger.warning(f"Índice de {object} indisponível: {e}")
+                return False
+        elif time.time() - refreshed_at > self.refresh_seconds:
+            self._refresh_in_background(object)
+        return True
+
+    def search(self, object: str, name: str, limit: int = 50) -> List[Dict]:
+        """
+        Candidatos ranqueados para o nome: similaridade de trigramas, bônus para
+        nome exato/prefixo e desempate pela interação mais recente.
+        """
+        query = normalize_name(name)
+        if not query:
+            return []
+
+        with self._connect() as conn:
+            if len(query) < 3:
+                # Trigramas não cobrem termos curtos: busca por prefixo no índice B-tree
+                rows = conn.execute(
+                    f"SELECT * FROM records_{object} WHERE name_norm >= ? AND name_norm < ? LIMIT ?",
+                    (query, query + "￿", limit * 4),
+                ).fetchall()
+            else:
+                # OR dos trigramas da busca: tolera erros de digitação (o ranking é refeito abaixo)
+                terms = " OR ".join('"' + t.replace('"', '""') + '"' for t in sorted(trigrams(query)) if t.strip())
+                rows = conn.execute(
+                    f"""
+                    SELECT r.* FROM fts_{object} f
+                    JOIN records_{object} r ON r.rowid = f.rowid
+                    WHERE fts_{object} MATCH ?
+                    ORDER BY f.rank
+                    LIMIT ?
+                    """,
+                    (terms, limit * 4),
+                ).fetchall()
+
+        candidates = []
+        for row in rows:
+            name_norm = row["name_norm"] or ""
+            score = similarity(query, name_norm)
+            if name_norm == query:
+                score += 1.0
+            elif name_norm.startswith(query):
+                score += 0.3
+            elif query in name_norm or query in (row["domain"] or ""):
+                score += 0.15
+            candidates.append({
+                "record_id": row["record_id"],
+                "name": row["name"],
+                "domain": row["domain"],
+                "last_interaction": row["last_interaction"],
+                "match_score": round(score, 4),
+            })
+
+        candidates.sort(key=lambda c: (c["match_score"], c["last_interaction"] or ""), reverse=True)
+        return candidates[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_name_index() -> NameIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NameIndex()
+    return _index
+
+
+def search_candidates(object: str, name: str, limit: int = 50) -> Optional[List[Dict]]:
+    """
+    Busca no índice local. Retorna None quando o índice está desativado ou
+    indisponível, para que o chamador caia no Athena.
+    """
+    if not NAME_INDEX_ENABLED:
+        return None
+    index = get_name_index()
+    if not index.ensure_fresh(object):
+        return None
+    return index.search(object, name, limit)
@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Perfil opcional das execuções (workflow de seleção de fundos e busca da empresa).
+#
+# Ligado com WALTER_PROFILE=1 ou com o toggle "profile" dos parâmetros do app. Em cada run:
+#   - uma thread amostra as pilhas das threads do run a cada WALTER_PROFILE_INTERVAL
+#     segundos (tempo de parede: esperas de HTTP aparecem paradas em socket/ssl/select)
+#   - o tracemalloc tira um snapshot no início e no fim de cada etapa
+# e grava em WALTER_PROFILE_DIR:
+#   <run>.speedscope.json   uma aba por thread, com a etapa como raiz (https://www.speedscope.app)
+#   <run>.folded            pilhas no formato do flamegraph.pl / inferno
+#   <run>.alloc.txt         tempo, pico de memória e top-N linhas que mais alocaram por etapa
+#
+# As threads do run são a que abriu o run e todas as criadas depois (pools de lotes,
+# asyncio.to_thread). Etapas simultâneas (buscas em paralelo) dividem as amostras,
+# rotuladas "a+b", e o diff de alocações de uma inclui o das outras.
+# Desligado, profile_run devolve um run nulo cujas etapas são nullcontext.
+
+PROFILE_ENABLED = os.getenv("WALTER_PROFILE", "0") == "1"
+PROFILE_DIR = os.getenv("WALTER_PROFILE_DIR", ".profiles")
+PROFILE_INTERVAL = float(os.getenv("WALTER_PROFILE_INTERVAL", "0.005"))
+PROFILE_TOP = int(os.getenv("WALTER_PROFILE_TOP", "15"))
+
+# O tracemalloc é global: fica ligado enquanto houver algum run aberto
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started_here = False
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_started_here
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_started_here = True
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_started_here
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_started_here:
+            tracemalloc.stop()
+            _tracemalloc_started_here = False
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*"),
+    ))
+
+
+class _NullRun:
+    """Run desligado: nada é amostrado nem gravado."""
+
+    enabled = False
+    files: Dict[str, str] = {}
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_RUN = _NullRun()
+
+
+class ProfileRun:
+    """Amostrador de pilhas + snapshots do tracemalloc por etapa de um run (use com `with`)."""
+
+    enabled = True
+
+    def __init__(self, label: str, directory: str = PROFILE_DIR, interval: float = PROFILE_INTERVAL, top: int = PROFILE_TOP):
+        self.label = label
+        self.directory = Path(directory)
+        self.interval = interval
+        self.top = top
+        self.run_id = f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.files: Dict[str, str] = {}
+        self.stages: List[Dict[str, Any]] = []
+
+        self._lock = threading.Lock()
+        self._active: List[str] = []
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        # thread -> lista de (etapa, pilha da raiz para a folha, peso em segundos)
+        self._samples: Dict[str, List[Tuple[str, Tuple[int, ...], float]]] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._ignored_threads = set()
+        # Snapshot do fim da última etapa: vira o início da próxima quando as etapas são sequenciais
+        self._last_snapshot = None
+        self._start = 0.0
+        self._end = 0.0
+
+    def __enter__(self):
+        owner = threading.get_ident()
+        self._ignored_threads = {t.ident for t in threading.enumerate() if t.ident != owner}
+        _start_tracemalloc()
+        self._start = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name="walter-profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._sampler.join()
+        self._end = time.perf_counter()
+        _stop_tracemalloc()
+        try:
+            self._write()
+        except OSError as e:
+            print(f"Erro ao gravar o perfil {self.run_id}: {e}")
+        return False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Marca uma etapa: rotula as amostras e mede tempo e alocações entre a entrada e a saída."""
+        with self._lock:
+            sequential = not self._active
+            self._active.append(name)
+        before = self._last_snapshot if sequential and self._last_snapshot is not None else _snapshot()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            after = _snapshot()
+            diff = after.compare_to(before, "lineno")
+            with self._lock:
+                self._active.remove(name)
+                self._last_snapshot = after if not self._active else None
+                self.stages.append({
+                    "stage": name,
+                    "duration": round(duration, 3),
+                    "peak_kb": round(peak / 1024, 1),
+                    "allocated_kb": round(sum(stat.size_diff for stat in diff) / 1024, 1),
+                    "top": [
+                        {
+                            "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                            "size_kb": round(stat.size_diff / 1024, 1),
+                            "blocks": stat.count_diff,
+                        }
+                        for stat in diff[:self.top]
+                    ],
+                })
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(own, now - last)
+            last = now
+
+    def _sample(self, own: int, weight: float):
+        with self._lock:
+            label = "+".join(self._active) or "(fora de etapa)"
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or ident in self._ignored_threads:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                key = (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+                index = self._frames.get(key)
+                if index is None:
+                    index = self._frames[key] = len(self._frames)
+                stack.append(index)
+                frame = frame.f_back
+            stack.reverse()
+            self._samples.setdefault(names.get(ident, str(ident)), []).append((label, tuple(stack), weight))
+
+    def _write(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / self.run_id
+        frames = sorted(self._frames, key=self._frames.get)
+        stage_frames: Dict[str, int] = {}
+
+        profiles = []
+        folded = Counter()
+        for thread_name, samples in self._samples.items():
+            stacks, weights = [], []
+            for label, stack, weight in samples:
+                root = stage_frames.setdefault(label, len(frames) + len(stage_frames))
+                stacks.append([root, *stack])
+                weights.append(weight)
+                names = [f"{frames[i][0]} ({os.path.basename(frames[i][1])}:{frames[i][2]})" for i in stack]
+                folded[";".join([thread_name, f"[{label}]", *names])] += 1
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self._end - self._start, 6),
+                "samples": stacks,
+                "weights": weights,
+            })
+
+        shared_frames = [{"name": name, "file": filename, "line": line} for name, filename, line in frames]
+        shared_frames += [{"name": f"[{label}]"} for label in sorted(stage_frames, key=stage_frames.get)]
+        speedscope = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.run_id,
+            "exporter": "walter-intro-maker",
+            "shared": {"frames": shared_frames},
+            "profiles": profiles,
+        }
+        with open(f"{base}.speedscope.json", "w", encoding="utf-8") as f:
+            json.dump(speedscope, f)
+        with open(f"{base}.folded", "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in folded.items())
+        with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+            f.write(self._report())
+
+        self.files = {kind: f"{base}.{kind}" for kind in ("speedscope.json", "folded", "alloc.txt")}
+        print(f"Perfil de {self.label} gravado em {base}.*")
+
+    def _report(self) -> str:
+        lines = [f"{self.run_id}: {self._end - self._start:.3f}s, amostras a cada {self.interval * 1000:.0f} ms", ""]
+        for stage in self.stages:
+            lines.append(f"{stage['stage']}: {stage['duration']:.3f}s | pico {stage['peak_kb']:.1f} KiB | "
+                         f"saldo {stage['allocated_kb']:+.1f} KiB")
+            lines.extend(f"  {entry['size_kb']:+10.1f} KiB {entry['blocks']:+8d} blocos  {entry['where']}"
+                         for entry in stage["top"])
+            lines.append("")
+        return "\n".join(lines)
+
+    def summary(self) -> Dict[str, Any]:
+        """Arquivos gravados e tempo/alocações por etapa (para a UI e o resultado do run)."""
+        return {"run_id": self.run_id, "files": dict(self.files), "stages": list(self.stages)}
+
+
+def profile_run(label: str, enabled: Optional[bool] = None):
+    """ProfileRun se o perfil estiver ligado (por `enabled`; None segue WALTER_PROFILE), senão o run nulo."""
+    if not (PROFILE_ENABLED if enabled is None else enabled):
+        return NULL_RUN
+    return ProfileRun(label)
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Cache em disco do WebScraper: listas de URLs por busca e texto extraído por página.
+#
+# - Buscas: chave = query normalizada; vale por SCRAPE_SEARCH_TTL_SECONDS.
+# - Páginas: o resultado de fetch_page (título + 2000 caracteres de texto) e os
+#   validadores da resposta (ETag/Last-Modified). Dentro de SCRAPE_PAGE_TTL_SECONDS
+#   sai direto do cache; depois, o scraper faz um GET condicional e um 304 só renova a data.
+# - Falhas (status != 200, timeout...) ficam em cache negativo por SCRAPE_NEGATIVE_TTL_SECONDS.
+# - O arquivo é limitado a SCRAPE_CACHE_MAX_BYTES: as entradas acessadas há mais tempo saem primeiro.
+
+SCRAPE_CACHE_ENABLED = os.getenv("WALTER_SCRAPE_CACHE", "1") != "0"
+SCRAPE_CACHE_PATH = os.getenv("WALTER_SCRAPE_CACHE_PATH", ".cache/scrape_cache.sqlite")
+SCRAPE_SEARCH_TTL_SECONDS = float(os.getenv("WALTER_SCRAPE_SEARCH_TTL", str(24 * 3600)))
+SCRAPE_PAGE_TTL_SECONDS = float(os.getenv("WALTER_SCRAPE_PAGE_TTL", str(7 * 24 * 3600)))
+SCRAPE_NEGATIVE_TTL_SECONDS = float(os.getenv("WALTER_SCRAPE_NEGATIVE_TTL", "3600"))
+SCRAPE_CACHE_MAX_BYTES = int(os.getenv("WALTER_SCRAPE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class ScrapeCache:
+    def __init__(
+        self,
+        path: str = SCRAPE_CACHE_PATH,
+        search_ttl: float = SCRAPE_SEARCH_TTL_SECONDS,
+        page_ttl: float = SCRAPE_PAGE_TTL_SECONDS,
+        negative_ttl: float = SCRAPE_NEGATIVE_TTL_SECONDS,
+        max_bytes: int = SCRAPE_CACHE_MAX_BYTES,
+    ):
+        self.path = Path(path)
+        self.search_ttl = search_ttl
+        self.page_ttl = page_ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.metrics = {
+            "search_hits": 0, "search_misses": 0, "page_hits": 0, "page_revalidated": 0,
+            "page_misses": 0, "negative_hits": 0, "evictions": 0,
+        }
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS searches (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    urls TEXT NOT NULL,
+                    requested INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    ok INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_accessed ON searches (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at)")
+
+    def _count(self, metric: str):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    # ---------- Buscas ----------
+
+    def get_search(self, query: str, max_results: int) -> Optional[List[str]]:
+        """URLs de uma busca recente que pediu pelo menos max_results resultados."""
+        key = normalize_query(query)
+        with self._connect() as conn:
+            row = conn.execute("SELECT urls, requested, stored_at FROM searches WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < max_results or time.time() - row[2] > self.search_ttl:
+                self._count("search_misses")
+                return None
+            conn.execute("UPDATE searches SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._count("search_hits")
+        return json.loads(row[0])[:max_results]
+
+    def put_search(self, query: str, max_results: int, urls: List[str]):
+        now = time.time()
+        payload = json.dumps(urls)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO searches (key, query, urls, requested, stored_at, accessed_at, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_query(query), query, payload, max_results, now, now, len(payload)),
+            )
+        self._evict()
+
+    # ---------- Páginas ----------
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Entrada da página: {"result", "ok", "fresh", "etag", "last_modified"} ou None.
+        Falhas vencidas não são retornadas; páginas vencidas voltam com fresh=False (para o GET condicional).
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT ok, result, etag, last_modified, stored_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        if row is None:
+            self._count("page_misses")
+            return None
+
+        ok, age = bool(row[0]), time.time() - row[4]
+        if not ok:
+            if age > self.negative_ttl:
+                self._count("page_misses")
+                return None
+            self._count("negative_hits")
+            return {"result": json.loads(row[1]), "ok": False, "fresh": True, "etag": None, "last_modified": None}
+
+        fresh = age <= self.page_ttl
+        if fresh:
+            self._count("page_hits")
+        return {"result": json.loads(row[1]), "ok": True, "fresh": fresh, "etag": row[2], "last_modified": row[3]}
+
+    def put_page(self, url: str, result: Dict[str, Any], ok: bool = True,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        now = time.time()
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, ok, result, etag, last_modified, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, int(ok), payload, etag, last_modified, now, now, len(payload)),
+            )
+        self._evict()
+
+    def touch_page(self, url: str):
+        """Página revalidada (304): renova a data sem reescrever o conteúdo."""
+        self._count("page_revalidated")
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE pages SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+
+    # ---------- Manutenção ----------
+
+    def _evict(self):
+        with self._connect() as conn:
+            (total,) = conn.execute(
+                "SELECT COALESCE((SELECT SUM(size) FROM pages), 0) + COALESCE((SELECT SUM(size) FROM searches), 0)"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+            # Remove as entradas menos usadas das duas tabelas até voltar a 90% do limite
+            rows = conn.execute(
+                "SELECT 'pages', url, size, accessed_at FROM pages UNION ALL "
+                "SELECT 'searches', key, size, accessed_at FROM searches ORDER BY accessed_at"
+            ).fetchall()
+            target, removed = total - int(self.max_bytes * 0.9), 0
+            for table, key, size, _ in rows:
+                column = "url" if table == "pages" else "key"
+                conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+                removed += size
+                with self._lock:
+                    self.metrics["evictions"] += 1
+                if removed >= target:
+                    break
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages")
+            conn.execute("DELETE FROM searches")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.metrics)
+        with self._connect() as conn:
+            (metrics["pages"],) = conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+            (metrics["searches"],) = conn.execute("SELECT COUNT(*) FROM searches").fetchone()
+        return metrics
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_scrape_cache() -> Optional[ScrapeCache]:
+    """Instância compartilhada (None se WALTER_SCRAPE_CACHE=0)."""
+    global _cache
+    if not SCRAPE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ScrapeCache()
+    return _cache
@@ -1,103 +1,247 @@
-import requests
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List, Dict, Optional
 import asyncio
 import aiohttp
-from urllib.parse import urlparse
-import time
+import contextlib
+import os
 import random
+import threading
+import time
+import weakref
+from urllib.parse import urlparse
+
+from services.html_extract import extract_page
+from services.scrape_cache import ScrapeCache, get_scrape_cache
+
+# Scraper de longa duração: uma sessão aiohttp com pool de conexões e cache de DNS
+# por event loop (reaproveitada entre buscas), um limite global de requisições em
+# voo e um escalonador por host que impõe concorrência máxima e intervalo mínimo
+# entre requisições ao mesmo site, no lugar dos sleeps em série de antes.
+# Cada página tem timeout próprio e cada busca tem um orçamento total de tempo.
+# Buscas e páginas passam pelo cache em disco de services/scrape_cache.py: dentro
+# do TTL não há rede; depois dele, as páginas são revalidadas com GET condicional.
+
+SEARCH_URL = os.getenv("WALTER_SEARCH_URL", "https://html.duckduckgo.com/html/")
+SCRAPER_MAX_CONCURRENCY = int(os.getenv("WALTER_SCRAPER_MAX_CONCURRENCY", "16"))
+SCRAPER_PER_HOST_LIMIT = int(os.getenv("WALTER_SCRAPER_PER_HOST_LIMIT", "2"))
+# Intervalo mínimo (s) entre o início de duas requisições ao mesmo host, com jitter de até 50%
+SCRAPER_PER_HOST_DELAY = float(os.getenv("WALTER_SCRAPER_PER_HOST_DELAY", "0.2"))
+SCRAPER_PAGE_TIMEOUT = float(os.getenv("WALTER_SCRAPER_PAGE_TIMEOUT", "10"))
+SCRAPER_SEARCH_BUDGET = float(os.getenv("WALTER_SCRAPER_SEARCH_BUDGET", "20"))
+# Bytes lidos de cada página: o resto do corpo não é baixado (o texto extraído tem só 2000 caracteres)
+SCRAPER_MAX_BYTES = int(os.getenv("WALTER_SCRAPER_MAX_BYTES", str(1024 * 1024)))
+_READ_CHUNK = 64 * 1024
+
+class HostScheduler:
+    """
+    Concorrência global + por host e intervalo mínimo entre requisições ao mesmo host.
+
+        async with scheduler.slot(url):
+            ...
+    """
+
+    def __init__(self, max_concurrency: int = SCRAPER_MAX_CONCURRENCY,
+                 per_host_limit: int = SCRAPER_PER_HOST_LIMIT, per_host_delay: float = SCRAPER_PER_HOST_DELAY):
+        self.per_host_limit = per_host_limit
+        self.per_host_delay = per_host_delay
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def _reserve(self, host: str) -> float:
+        """Reserva o próximo horário livre do host e retorna quanto esperar até ele."""
+        now = time.monotonic()
+        start = max(now, self._next_start.get(host, 0.0))
+        self._next_start[host] = start + self.per_host_delay * random.uniform(1.0, 1.5)
+        return start - now
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str):
+        host = urlparse(url).netloc.lower()
+        semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with semaphore:
+            wait = self._reserve(host)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self._global:
+                yield
+
+
+def _decode(body: bytes, charset: Optional[str]) -> str:
+    # O corte por bytes pode partir um caractere multibyte no fim: substituído, não erro
+    try:
+        return body.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _result_urls(html: str, max_results: int) -> List[str]:
+    soup = BeautifulSoup(html, 'html.parser')
+    results = []
+    for result in soup.select('.result__url'):
+        url = result.get('href')
+        if url and not url.startswith('/'):
+            results.append(url)
+            if len(results) >= max_results:
+                break
+    return results
+
 
 class WebScraper:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = SCRAPER_MAX_CONCURRENCY, per_host_limit: int = SCRAPER_PER_HOST_LIMIT,
+                 per_host_delay: float = SCRAPER_PER_HOST_DELAY, page_timeout: float = SCRAPER_PAGE_TIMEOUT,
+                 search_url: str = SEARCH_URL, cache: Optional[ScrapeCache] = None, use_cache: bool = True,
+                 max_bytes: int = SCRAPER_MAX_BYTES):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.per_host_delay = per_host_delay
+        self.page_timeout = page_timeout
+        self.search_url = search_url
+        self.max_bytes = max_bytes
+        self.cache = (cache or get_scrape_cache()) if use_cache else None
         self.session = None
+        # Sessões e escalonadores ficam presos ao event loop em que foram criados
+        self._sessions = weakref.WeakKeyDictionary()
+        self._schedulers = weakref.WeakKeyDictionary()
 
     async def init_session(self):
-        if not self.session:
-            self.session = aiohttp.ClientSession(headers=self.headers)
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.per_host_limit,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True,
+            )
+            session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.page_timeout, connect=min(5, self.page_timeout)),
+            )
+            self._sessions[loop] = session
+            self._schedulers[loop] = HostScheduler(self.max_concurrency, self.per_host_limit, self.per_host_delay)
+        self.session = session
+        return session
 
     async def close_session(self):
-        if self.session:
-            await self.session.close()
-            self.session = None
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+        self.session = None
+
+    async def _get(self, url: str, max_bytes: Optional[int] = None, **kwargs):
+        """
+        GET passando pelo escalonador; retorna (status, html, headers da resposta).
+        Com max_bytes, o corpo é lido em blocos e a leitura para no limite.
+        """
+        session = await self.init_session()
+        scheduler = self._schedulers[asyncio.get_running_loop()]
+        async with scheduler.slot(url):
+            async with session.get(url, **kwargs) as response:
+                if max_bytes is None:
+                    return response.status, await response.text(), response.headers
+                if response.status != 200:
+                    return response.status, "", response.headers
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(_READ_CHUNK):
+                    body.extend(chunk)
+                    if len(body) >= max_bytes:
+                        break
+                return response.status, _decode(bytes(body[:max_bytes]), response.charset), response.headers
+
+    async def _cached(self, method: str, *args):
+        """Chamada ao cache em thread (SQLite é bloqueante); None sem cache."""
+        if self.cache is None:
+            return None
+        return await asyncio.to_thread(getattr(self.cache, method), *args)
 
     async def fetch_page(self, url: str) -> Dict:
-        """Busca o conteúdo de uma página de forma assíncrona"""
+        """Busca o conteúdo de uma página de forma assíncrona (cache em disco primeiro)"""
+        entry = await self._cached("get_page", url)
+        if entry is not None and entry["fresh"]:
+            return entry["result"]
+
+        # Entrada vencida: GET condicional com os validadores guardados
+        conditional = {}
+        if entry is not None:
+            if entry["etag"]:
+                conditional["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                conditional["If-Modified-Since"] = entry["last_modified"]
+
         try:
-            async with self.session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Remove scripts e styles
-                    for script in soup(["script", "style"]):
-                        script.decompose()
-                    
-                    # Extrai o texto principal
-                    text = soup.get_text()
-                    lines = (line.strip() for line in text.splitlines())
-                    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                    text = ' '.join(chunk for chunk in chunks if chunk)
-                    
-                    return {
-                        'url': url,
-                        'title': soup.title.string if soup.title else '',
-                        'content': text[:2000]
-                    }
-                return {'url': url, 'error': f'Status code: {response.status}'}
+            status, html, headers = await self._get(url, max_bytes=self.max_bytes, headers=conditional or None)
+            if status == 304 and entry is not None:
+                await self._cached("touch_page", url)
+                return entry["result"]
+            if status == 200:
+                # O parse é CPU: fora do event loop para não travar as outras requisições
+                result = await asyncio.to_thread(extract_page, html, url)
+                await self._cached("put_page", url, result, True, headers.get("ETag"), headers.get("Last-Modified"))
+                return result
+            result = {'url': url, 'error': f'Status code: {status}'}
+        except asyncio.TimeoutError:
+            result = {'url': url, 'error': f'Timeout após {self.page_timeout}s'}
         except Exception as e:
-            return {'url': url, 'error': str(e)}
+            result = {'url': url, 'error': str(e)}
+        # Cache negativo: a URL não é tentada de novo até vencer o TTL de falhas
+        await self._cached("put_page", url, result, False)
+        return result
 
-    async def search_and_scrape(self, query: str, max_results: int = 20) -> List[Dict]:
+    async def search_and_scrape(self, query: str, max_results: int = 20, budget: Optional[float] = SCRAPER_SEARCH_BUDGET) -> List[Dict]:
         """
-        Busca resultados usando DuckDuckGo e faz scraping do conteúdo
+        Busca resultados usando DuckDuckGo e faz scraping do conteúdo.
+        Páginas que não terminam dentro do orçamento `budget` (s) voltam com erro.
         """
-        await self.init_session()
-        
         try:
-            # Busca resultados no DuckDuckGo
-            search_url = f"https://html.duckduckgo.com/html/?q={query}"
-            async with self.session.get(search_url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-
-                    print("Search successful for query: ", query)
-                    
-                    # Extrai URLs dos resultados
-                    results = []
-                    for result in soup.select('.result__url'):
-                        url = result.get('href')
-                        if url and not url.startswith('/'):
-                            results.append(url)
-                            if len(results) >= max_results:
-                                break
-                    
-                    # Faz scraping do conteúdo de cada URL
-                    tasks = []
-                    for url in results:
-                        # Adiciona um pequeno delay aleatório para evitar bloqueios
-                        await asyncio.sleep(random.uniform(0.1, 0.3))
-                        tasks.append(self.fetch_page(url))
-                    
-                    scraped_results = await asyncio.gather(*tasks)
-                    return scraped_results
-                
-                return [{'error': f'Erro na busca: Status code {response.status}'}]
-                
+            results = await self._cached("get_search", query, max_results)
+            if results is None:
+                # Busca resultados no DuckDuckGo
+                status, html, _ = await self._get(self.search_url, params={"q": query})
+                if status != 200:
+                    return [{'error': f'Erro na busca: Status code {status}'}]
+
+                print("Search successful for query: ", query)
+                results = _result_urls(html, max_results)
+                # Busca sem resultados costuma ser bloqueio temporário: não vai para o cache
+                if results:
+                    await self._cached("put_search", query, max_results, results)
+
+            # Todas as páginas começam juntas; o escalonador espaça as que caem no mesmo host
+            tasks = [asyncio.ensure_future(self.fetch_page(url)) for url in results]
+            if not tasks:
+                return []
+            done, pending = await asyncio.wait(tasks, timeout=budget)
+            for task in pending:
+                task.cancel()
+            return [
+                task.result() if task in done else {'url': url, 'error': f'Orçamento de {budget}s esgotado'}
+                for url, task in zip(results, tasks)
+            ]
         except Exception as e:
             return [{'error': f'Erro geral: {str(e)}'}]
-        finally:
-            await self.close_session()
+
+_scraper = None
+_scraper_lock = threading.Lock()
+
+def get_web_scraper() -> WebScraper:
+    """Scraper compartilhado pelo processo (a sessão é reaproveitada entre buscas no mesmo event loop)."""
+    global _scraper
+    if _scraper is None:
+        with _scraper_lock:
+            if _scraper is None:
+                _scraper = WebScraper()
+    return _scraper
 
 async def get_search_results(query: str, max_results: int = 20) -> List[Dict]:
     """
     Função principal para buscar e fazer scraping de resultados
     """
-    scraper = WebScraper()
-    return await scraper.search_and_scrape(query, max_results)
+    return await get_web_scraper().search_and_scrape(query, max_results)
 
 # Exemplo de uso
 if __name__ == "__main__":
@@ -114,5 +258,6 @@ if __name__ == "__main__":
             print(f"Título: {result.get('title', 'N/A')}")
             print(f"Conteúdo: {result.get('content', 'N/A')[:10000]}...")
             print("-" * 80)
+        await get_web_scraper().close_session()
 
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
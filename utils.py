@@ -1,9 +1,11 @@
 import json
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 
 from pydantic import BaseModel, Field
 
+from score_table import ScoreTable
+
 # Modelos para uso nas funções utilitárias
 class FundScore(BaseModel):
     fund_name: str
@@ -14,20 +16,21 @@ class FundScoreList(BaseModel):
     scores: List[FundScore] = Field(default_factory=list)
 
 # Função para salvar resultados em JSON
-def save_fund_scores(fund_scores: List[FundScore], filename: str = "fund_scores.json"):
+def save_fund_scores(fund_scores: Union[List[FundScore], ScoreTable], filename: str = "fund_scores.json"):
     """
-    Salva a lista de pontuações de fundos em um arquivo JSON.
+    Salva a lista de pontuações de fundos em um arquivo JSON (ou Parquet, se o nome terminar em .parquet).
     
     Args:
-        fund_scores: Lista de objetos FundScore
+        fund_scores: Lista de objetos FundScore ou ScoreTable
         filename: Nome do arquivo para salvar os resultados
     """
-    # Converter para dicionários
-    scores_dict = [score.dict() for score in fund_scores]
+    table = ScoreTable.coerce(fund_scores)
     
     # Salvar no arquivo
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(scores_dict, f, ensure_ascii=False, indent=4)
+    if filename.endswith(".parquet"):
+        table.to_parquet(filename)
+    else:
+        table.to_json(filename)
     
     print(f"Pontuações salvas em {filename}")
 
@@ -53,41 +56,41 @@ def load_fund_scores(filename: str = "fund_scores.json") -> List[FundScore]:
     return [FundScore(**score) for score in scores_dict]
 
 # Função para filtrar fundos por pontuação mínima
-def filter_funds_by_score(fund_scores: List[FundScore], min_score: float = 50.0) -> List[FundScore]:
+def filter_funds_by_score(fund_scores: Union[List[FundScore], ScoreTable], min_score: float = 50.0):
     """
     Filtra a lista de fundos para incluir apenas aqueles com pontuação acima do limiar.
     
     Args:
-        fund_scores: Lista de objetos FundScore
+        fund_scores: Lista de objetos FundScore ou ScoreTable
         min_score: Pontuação mínima para incluir um fundo (padrão: 50.0)
         
     Returns:
-        Lista filtrada de objetos FundScore
+        ScoreTable filtrada, se a entrada for uma ScoreTable; caso contrário, lista de FundScore
     """
-    return [score for score in fund_scores if score.score >= min_score]
+    filtered = ScoreTable.coerce(fund_scores).filter_min_score(min_score)
+    if isinstance(fund_scores, ScoreTable):
+        return filtered
+    return filtered.to_fund_scores(FundScore)
 
 # Função para formatar os resultados para exibição
-def format_results_for_display(fund_scores: List[FundScore], company_name: str, limit: int = 10) -> str:
+def format_results_for_display(fund_scores: Union[List[FundScore], ScoreTable], company_name: str, limit: int = 10) -> str:
     """
     Formata os resultados para exibição.
     
     Args:
-        fund_scores: Lista de objetos FundScore
+        fund_scores: Lista de objetos FundScore ou ScoreTable
         company_name: Nome da empresa
         limit: Número máximo de fundos a incluir (padrão: 10)
         
     Returns:
         String formatada com os resultados
     """
-    # Ordenar por pontuação (do maior para o menor)
-    sorted_scores = sorted(fund_scores, key=lambda x: x.score, reverse=True)
-    
-    # Limitar ao número especificado
-    top_funds = sorted_scores[:limit]
+    # Selecionar os melhores (do maior para o menor; empates na ordem original)
+    top_funds = ScoreTable.coerce(fund_scores).top_k(limit)
     
     # Formatar a lista
-    fund_list = "\n".join([f"{i+1}. {fund.fund_name}: {fund.score:.1f} - {fund.reason}" 
-                         for i, fund in enumerate(top_funds)])
+    fund_list = "\n".join([f"{i+1}. {name}: {score:.1f} - {top_funds.reason(i)}" 
+                         for i, (name, score) in enumerate(zip(top_funds.names, top_funds.scores))])
     
     # Montar a mensagem completa
     message = f"""
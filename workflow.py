@@ -2,42 +2,60 @@ import os
 from dotenv import load_dotenv
 import operator
 import logging
-import pandas as pd
-import math
+import threading
+import time
 from typing import List, Dict, Any
-from langchain_aws import ChatBedrock
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from google.oauth2 import service_account
-import gspread
-from googleapiclient.discovery import build
 import concurrent.futures
 from functools import partial
-import boto3
-from botocore.config import Config
-
-config = Config(read_timeout=1000)
-
-client = boto3.client(service_name='bedrock-runtime', 
-                      region_name='us-east-1',
-                      config=config)
+from services import cassette
+from services.batch_planner import BatchPlan, get_batch_planner
+from services.profiling import profile_run
+
+# pandas/NumPy, LangChain (AWS/OpenAI), boto3 e as bibliotecas do Google são importados
+# no primeiro uso, dentro das funções, para não pesar no import deste módulo.
+
+_client = None
+_client_lock = threading.Lock()
+
+# Cliente do Bedrock criado apenas quando o Claude é usado pela primeira vez
+def get_bedrock_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import boto3
+                from botocore.config import Config
+                
+                config = Config(read_timeout=1000)
+                _client = boto3.client(service_name='bedrock-runtime', 
+                                       region_name='us-east-1',
+                                       config=config)
+    return _client
+
+def __getattr__(name):
+    # Compatibilidade: `workflow.client` continua disponível, mas só é criado ao ser acessado
+    if name == "client":
+        return get_bedrock_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
 # Configuração do modelo Claude
 def configure_claude():
+    from langchain_aws import ChatBedrock
     return ChatBedrock(
         model_id="arn:aws:bedrock:us-east-1:050451404360:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0",
         provider="anthropic",
         model_kwargs={"max_tokens": 20000},
         aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
         aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        client=client
+        client=get_bedrock_client()
     )
 
 def configure_haiku():
+    from langchain_aws import ChatBedrock
     return ChatBedrock(
         model_id="arn:aws:bedrock:us-east-1:050451404360:inference-profile/us.anthropic.claude-3-haiku-20240307-v1:0",
         provider="anthropic",
@@ -45,15 +63,40 @@ def configure_haiku():
     )
 
 def configure_o3():
+    from langchain_openai import ChatOpenAI
     return ChatOpenAI(
         model="o3-mini"
     )
 
 def configure_gpt_4o_mini():
+    from langchain_openai import ChatOpenAI
     return ChatOpenAI(
         model="gpt-4o-mini"
     )
 
+LLM_FACTORIES = {
+    "claude": configure_claude,
+    "o3": configure_o3,
+    "gpt-4o-mini": configure_gpt_4o_mini,
+    "haiku": configure_haiku,
+}
+
+_llm_pool = {}
+_llm_pool_lock = threading.Lock()
+
+# Pool de clientes LLM compartilhado pelo processo: os clientes são thread-safe e
+# reaproveitá-los mantém as conexões HTTP abertas entre lotes e entre execuções
+def get_llm(model="claude"):
+    if model not in _llm_pool:
+        with _llm_pool_lock:
+            if model not in _llm_pool:
+                if os.getenv("WALTER_FAKE_LLM"):
+                    from services.fake_llm import FakeChatModel
+                    _llm_pool[model] = FakeChatModel(model_name=f"fake-{model}")
+                else:
+                    _llm_pool[model] = LLM_FACTORIES[model]()
+    return _llm_pool[model]
+
 # Classes para estruturar os resultados
 class FundScore(BaseModel):
     fund_name: str = Field(description="Fund Name")
@@ -63,8 +106,11 @@ class FundScore(BaseModel):
 class FundScoreList(BaseModel):
     scores: List[FundScore]
 
-# Carregamento e preparação dos dados
-def load_data():
+# Leitura bruta da planilha (separada para poder ser gravada pela cassette)
+def _fetch_sheet_values(sheet_id):
+    from google.oauth2 import service_account
+    import gspread
+    
     # Configurar credenciais
     credentials = service_account.Credentials.from_service_account_file(
         ".secrets/service-account-admin.json",
@@ -75,21 +121,50 @@ def load_data():
     # Conectar ao Google Sheets
     gc = gspread.authorize(credentials)
     
-    # Extrair o ID da planilha
-    sheet_id = "11I9QFSMFn7UBfV0wz0-hAYgWtIKytTVnWA9pjquwgdk"
-    
     # Abrir a planilha e obter a primeira aba
     sheet = gc.open_by_key(sheet_id).sheet1
+    return sheet.get_all_values()
+
+# Carregamento e preparação dos dados
+def load_data():
+    import pandas as pd
+    
+    # Catálogo local (testes de carga e perfis sem credenciais do Google)
+    if os.getenv("WALTER_FUNDS_CSV"):
+        return pd.read_csv(os.getenv("WALTER_FUNDS_CSV"), dtype=str, keep_default_na=False)
+    
+    # Extrair o ID da planilha
+    sheet_id = "11I9QFSMFn7UBfV0wz0-hAYgWtIKytTVnWA9pjquwgdk"
     
     # Obter todos os dados e converter para DataFrame
-    data = sheet.get_all_values()
+    data = cassette.call("sheets", {"sheet_id": sheet_id}, lambda: _fetch_sheet_values(sheet_id))
     headers = data[0]
     df = pd.DataFrame(data[1:], columns=headers)
     
     return df
 
+CATALOG_TTL_SECONDS = float(os.getenv("WALTER_CATALOG_TTL_SECONDS", "600"))
+
+_catalog = None
+_catalog_loaded_at = 0.0
+_catalog_lock = threading.Lock()
+
+# Catálogo de fundos compartilhado pelo processo, recarregado após CATALOG_TTL_SECONDS
+def get_fund_catalog(max_age=None):
+    global _catalog, _catalog_loaded_at
+    max_age = CATALOG_TTL_SECONDS if max_age is None else max_age
+    with _catalog_lock:
+        if _catalog is None or time.monotonic() - _catalog_loaded_at > max_age:
+            _catalog = load_data()
+            _catalog_loaded_at = time.monotonic()
+        # Cópia: filter_data altera colunas do DataFrame recebido
+        return _catalog.copy()
+
 # Carregamento de documentos do Google Docs
 def setup_gdocs():
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+    
     SCOPES = ['https://www.googleapis.com/auth/documents.readonly']
     creds = service_account.Credentials.from_service_account_file(
         '.secrets/service-account-admin.json',
@@ -176,7 +251,7 @@ def batch_splitter(df, batch_size):
     return [df[i:i+batch_size] for i in range(0, len(df), batch_size)]
 
 # Função para processar um único lote
-def process_batch(batch, inputs, parameters, llm, previous_scores=None, gdoc_content=None, batch_index=0, total_batches=0):
+def process_batch(batch, inputs, parameters, llm, previous_scores=None, gdoc_content=None, batch_index=0, total_batches=0, raise_on_error=False):
     use_docs = parameters.get("use_docs", False)
     # Preparar orientação baseada em pontuações anteriores
     previous_scores_guidance = ""
@@ -242,6 +317,8 @@ def process_batch(batch, inputs, parameters, llm, previous_scores=None, gdoc_con
     {content}
     """
     
+    from langchain_core.prompts import ChatPromptTemplate
+    
     prompt = ChatPromptTemplate.from_messages([
         ("system", system_prompt.format(previous_scores_guidance=previous_scores_guidance)),
         ("human", human_prompt)
@@ -256,7 +333,7 @@ def process_batch(batch, inputs, parameters, llm, previous_scores=None, gdoc_con
         variables["content"] = gdoc_content["content"]
     
     structured_llm = llm.with_structured_output(FundScoreList)
-    chain = prompt | structured_llm
+    chain = prompt | cassette.wrap_llm(structured_llm, f"score_fund:{_model_name(llm)}")
     
     # Invocar o modelo
     try:
@@ -265,20 +342,35 @@ def process_batch(batch, inputs, parameters, llm, previous_scores=None, gdoc_con
         return fund_scores.scores
     except Exception as e:
         print(f"Erro ao processar lote {batch_index+1}: {str(e)}")
+        if raise_on_error:
+            raise
         return []
 
-# Pontuação dos fundos com paralelização
-def score_fund(df, inputs, parameters, model="claude"):
+# Notificar o progresso (usado pelo runner de jobs); nunca deixa o callback derrubar o workflow
+def _notify(progress_callback, event):
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(event)
+    except Exception as e:
+        print(f"Erro no callback de progresso: {e}")
+
+def _model_name(llm):
+    return getattr(llm, "model_name", None) or getattr(llm, "model_id", "")
+
+# Pontuação dos fundos com paralelização; com batch_timings, acrescenta (tamanho, segundos) de cada lote pontuado
+def score_fund(df, inputs, parameters, model="claude", progress_callback=None, batch_timings=None):
     cols_for_ai = ["name", "investment_geography", "prefered_industry_enriched", "description", "observations"]
     df = df[cols_for_ai]
-    if model == "claude":
-        llm_factory = configure_claude
-    elif model == "o3":
-        llm_factory = configure_o3
-    elif model == "gpt-4o-mini":
-        llm_factory = configure_gpt_4o_mini
-    elif model == "haiku":
-        llm_factory = configure_haiku
+    llm = get_llm(model)
+
+    def timed_batch(**kwargs):
+        started = time.perf_counter()
+        scores = process_batch(**kwargs)
+        # Lotes que falharam (lista vazia) não entram no perfil de latência
+        if batch_timings is not None and scores:
+            batch_timings.append((len(kwargs["batch"]), time.perf_counter() - started))
+        return scores
 
     # Verificar se um ID de Google Doc foi fornecido
     gdoc_content = None
@@ -302,18 +394,23 @@ def score_fund(df, inputs, parameters, model="claude"):
     
     # Fase 1: Processar primeiro lote para obter pontuações de referência
     if batches:
-        llm = llm_factory()
-        first_batch_scores = process_batch(
-            batches[0], 
-            inputs, 
-            parameters, 
-            llm, 
-            previous_scores=None, 
+        first_batch_scores = timed_batch(
+            batch=batches[0],
+            inputs=inputs,
+            parameters=parameters,
+            llm=llm,
+            previous_scores=None,
             gdoc_content=gdoc_content,
             batch_index=0,
             total_batches=len(batches)
         )
         raw_scores.extend(first_batch_scores)
+        _notify(progress_callback, {
+            "type": "batch",
+            "batch_index": 0,
+            "total_batches": len(batches),
+            "scores": first_batch_scores,
+        })
         
         # Fase 2: Processar lotes restantes em paralelo
         remaining_batches = batches[1:]
@@ -321,33 +418,35 @@ def score_fund(df, inputs, parameters, model="claude"):
         if remaining_batches:
             # Executar processamento paralelo
             with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Criar um LLM para cada worker
-                futures = []
+                # Todos os workers compartilham o cliente do pool
+                futures = {}
                 for i, batch in enumerate(remaining_batches):
-                    # Criar uma nova instância do modelo para cada worker
-                    worker_llm = llm_factory()
-                    
                     # Chamar diretamente a função sem usar partial
                     # Isso evita a confusão de argumentos que estava ocorrendo
-                    futures.append(
-                        executor.submit(
-                            process_batch,
-                            batch=batch,
-                            inputs=inputs,
-                            parameters=parameters,
-                            llm=worker_llm,
-                            previous_scores=raw_scores,
-                            gdoc_content=gdoc_content,
-                            batch_index=i+1,
-                            total_batches=len(batches)
-                        )
+                    future = executor.submit(
+                        timed_batch,
+                        batch=batch,
+                        inputs=inputs,
+                        parameters=parameters,
+                        llm=llm,
+                        previous_scores=raw_scores,
+                        gdoc_content=gdoc_content,
+                        batch_index=i+1,
+                        total_batches=len(batches)
                     )
+                    futures[future] = i + 1
                 
                 # Coletar resultados à medida que são concluídos
                 for future in concurrent.futures.as_completed(futures):
                     try:
                         batch_scores = future.result()
                         raw_scores.extend(batch_scores)
+                        _notify(progress_callback, {
+                            "type": "batch",
+                            "batch_index": futures[future],
+                            "total_batches": len(batches),
+                            "scores": batch_scores,
+                        })
                     except Exception as e:
                         print(f"Erro em worker thread: {str(e)}")
 
@@ -355,88 +454,151 @@ def score_fund(df, inputs, parameters, model="claude"):
 
 # Normalizar pontuações
 def normalize_scores(raw_scores):
-    if not raw_scores:
-        return []
-    
-    min_score = min(score.score for score in raw_scores)
-    max_score = max(score.score for score in raw_scores)
-    
-    if max_score > min_score:  # evitar divisão por zero
-        return [
-            FundScore(
-                fund_name=score.fund_name,
-                score=100 * (score.score - min_score) / (max_score - min_score),
-                reason=score.reason
-            ) for score in raw_scores
-        ]
-    else:
-        # Caso todas as pontuações sejam iguais
-        return [
-            FundScore(
-                fund_name=score.fund_name,
-                score=50.0,  # valor médio arbitrário
-                reason=score.reason
-            ) for score in raw_scores
-        ]
+    """
+    Normaliza as pontuações para a escala 0-100.
+    Aceita uma lista de FundScore ou uma ScoreTable e retorna uma ScoreTable.
+    """
+    from score_table import ScoreTable
+    return ScoreTable.coerce(raw_scores).normalize()
 
 # Selecionar os melhores fundos
 def select_top_funds(normalized_scores, percentage):
-    # Ordenar scores
-    sorted_scores = sorted(normalized_scores, key=lambda x: x.score, reverse=True)
-    
-    # Calcular número de fundos a manter
-    to_keep = math.ceil(percentage * len(sorted_scores))
-    
-    # Retornar os melhores fundos
-    return sorted_scores[:to_keep]
+    """
+    Retorna a fração `percentage` dos melhores fundos, em ordem decrescente, como ScoreTable.
+    """
+    from score_table import ScoreTable
+    return ScoreTable.coerce(normalized_scores).top_fraction(percentage)
+
+# Tamanho aproximado dos templates de prompt de process_batch, em caracteres
+_SCORE_PROMPT_CHARS = 3000
+
+def plan_batches(filtered_df, inputs, parameters, model, gdoc_content=None):
+    """
+    Plano de lotes da pontuação (services/batch_planner.py).
+
+    Com parameters["auto_tune"], batch_size e max_workers são escolhidos para o prazo
+    parameters["target_seconds"] e o orçamento parameters["max_cost"] (USD); sem isso,
+    ficam os dos parâmetros e o plano só traz a previsão. Tokens estimados em 4
+    caracteres por token: templates + inputs (+ Google Doc) por chamada e a tabela por fundo.
+    """
+    planner = get_batch_planner()
+    model_name = _model_name(get_llm(model)) or model
+    sample = filtered_df[["name", "investment_geography", "prefered_industry_enriched", "description", "observations"]].head(20)
+    tokens_per_fund = len(sample.to_string()) // max(len(sample), 1) // 4
+    prompt_tokens = (_SCORE_PROMPT_CHARS + len(str(inputs)) + len((gdoc_content or {}).get("content", ""))) // 4
+    funds = len(filtered_df)
+
+    if parameters.get("auto_tune"):
+        plan = planner.plan(funds, model_name, target_seconds=parameters.get("target_seconds"),
+                            max_cost=parameters.get("max_cost") or None,
+                            prompt_tokens=prompt_tokens, tokens_per_fund=tokens_per_fund)
+        print(f"Plano de lotes: {plan.batch_size} fundos por lote, {plan.max_workers} workers "
+              f"(previsto {plan.predicted_seconds}s; {plan.reason})")
+        return plan
+
+    batch_size, max_workers = parameters.get("batch_size", 10), parameters["max_workers"]
+    seconds, cost = planner.predict(model_name, funds, batch_size, max_workers, prompt_tokens, tokens_per_fund)
+    return BatchPlan(batch_size=batch_size, max_workers=max_workers, batches=-(-funds // batch_size),
+                     predicted_seconds=round(seconds, 1), predicted_cost=round(cost, 4) if cost is not None else None,
+                     model=model_name, reason="definido nos parâmetros")
 
 # Função principal que orquestra todo o fluxo
-def run_fund_selection_workflow(inputs, parameters):
+def run_fund_selection_workflow(inputs, parameters, progress_callback=None):
+    """
+    Executa o fluxo completo de seleção de fundos.
+
+    Args:
+        inputs: Dados da empresa e da rodada
+        parameters: Parâmetros de geração (batch_size, surviving_percentage, auto_tune, profile, ...)
+        progress_callback: Função opcional chamada com eventos de progresso
+            ({"type": "stage", "stage": ...} e {"type": "batch", ...})
+
+    Returns:
+        Dicionário com "top_funds" (lista de FundScore), "fund_names" e "plan" (lotes,
+        workers e tempo previsto x real da pontuação); com o perfil ligado, também
+        "profile" (arquivos gravados e tempo/alocações por etapa)
+    """
 
+    # Cópia: os lotes e workers escolhidos abaixo não vazam para o dicionário do chamador
+    # (o st.session_state.parameters do app, que ficaria preso no primeiro plano)
+    parameters = dict(parameters)
     use_docs = parameters.get("use_docs", False)
-
-    # Carregar dados
-    print("Carregando dados...")
-    df = load_data()
-    
-    # Filtrar dados
-    print("Filtrando dados...")
-    filtered_df = filter_data(df, inputs)
-    
-    # Carregar conteúdo do Google Doc se disponível
-    if parameters.get("gdoc_id") and use_docs:
-        print(f"Carregando conteúdo do Google Doc: {parameters['gdoc_id']}...")
-        try:
-            docs_service = setup_gdocs()
-            gdoc_content = get_gdoc_content(docs_service, parameters["gdoc_id"])
-            print(f"Google Doc carregado: {gdoc_content['title']}")
-        except Exception as e:
-            print(f"Erro ao carregar o Google Doc: {e}")
-    
-    # Definir número máximo de workers se não estiver nos parâmetros
-    if "max_workers" not in parameters:
-        parameters["max_workers"] = 4
-    
-    # Pontuar fundos
-    print("Pontuando fundos...")
-    raw_scores = score_fund(filtered_df, inputs, parameters, model="o3")
-    
-    # Normalizar pontuações
-    print("Normalizando pontuações...")
-    normalized_scores = normalize_scores(raw_scores)
-    
-    # Selecionar os melhores fundos
-    print("Selecionando melhores fundos...")
-    surviving_percentage = parameters.get("surviving_percentage", 0.5)
-    top_funds = select_top_funds(normalized_scores, surviving_percentage)
-    
-    # Extrair nomes dos fundos selecionados
-    fund_names = [fund.fund_name for fund in top_funds]
-    
-    return {
+    # Perfil por etapa (services/profiling.py); desligado, as etapas são nullcontext
+    profiler = profile_run("workflow", parameters.get("profile"))
+
+    with profiler:
+        # Carregar dados
+        print("Carregando dados...")
+        _notify(progress_callback, {"type": "stage", "stage": "load"})
+        with profiler.stage("load"):
+            df = get_fund_catalog()
+
+        # Filtrar dados
+        print("Filtrando dados...")
+        _notify(progress_callback, {"type": "stage", "stage": "filter"})
+        with profiler.stage("filter"):
+            filtered_df = filter_data(df, inputs)
+
+        # Carregar conteúdo do Google Doc se disponível
+        gdoc_content = None
+        if parameters.get("gdoc_id") and use_docs:
+            print(f"Carregando conteúdo do Google Doc: {parameters['gdoc_id']}...")
+            try:
+                with profiler.stage("gdoc"):
+                    docs_service = setup_gdocs()
+                    gdoc_content = get_gdoc_content(docs_service, parameters["gdoc_id"])
+                print(f"Google Doc carregado: {gdoc_content['title']}")
+            except Exception as e:
+                print(f"Erro ao carregar o Google Doc: {e}")
+
+        # Definir número máximo de workers se não estiver nos parâmetros
+        if "max_workers" not in parameters:
+            parameters["max_workers"] = 4
+
+        # Lotes e workers escolhidos pelo perfil de latência do modelo (ou os dos parâmetros) e a previsão
+        model = "o3"
+        plan = plan_batches(filtered_df, inputs, parameters, model, gdoc_content)
+        parameters["batch_size"], parameters["max_workers"] = plan.batch_size, plan.max_workers
+        _notify(progress_callback, {"type": "plan", **plan.to_dict()})
+
+        # Pontuar fundos
+        print("Pontuando fundos...")
+        _notify(progress_callback, {"type": "stage", "stage": "score", "total_funds": len(filtered_df)})
+        batch_timings = []
+        with profiler.stage("score"):
+            score_started = time.perf_counter()
+            raw_scores = score_fund(filtered_df, inputs, parameters, model=model, progress_callback=progress_callback,
+                                    batch_timings=batch_timings)
+            plan.actual_seconds = round(time.perf_counter() - score_started, 1)
+        get_batch_planner().record(plan.model, batch_timings)
+
+        # Normalizar pontuações
+        print("Normalizando pontuações...")
+        _notify(progress_callback, {"type": "stage", "stage": "normalize"})
+        with profiler.stage("normalize"):
+            normalized_scores = normalize_scores(raw_scores)
+
+        # Selecionar os melhores fundos
+        print("Selecionando melhores fundos...")
+        _notify(progress_callback, {"type": "stage", "stage": "select"})
+        surviving_percentage = parameters.get("surviving_percentage", 0.5)
+        with profiler.stage("select"):
+            top_table = select_top_funds(normalized_scores, surviving_percentage)
+
+            # Extrair nomes dos fundos selecionados
+            fund_names = top_table.names.tolist()
+
+            # Conversão para pydantic apenas na saída (UI)
+            top_funds = top_table.to_fund_scores(FundScore)
+
+    result = {
         "top_funds": top_funds,
-        "fund_names": fund_names
+        "fund_names": fund_names,
+        "plan": plan.to_dict(),
     }
+    if profiler.enabled:
+        result["profile"] = profiler.summary()
+    return result
 
 # Exemplo de uso
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+import math
+import os
+import time
+import uuid
+from contextlib import closing
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+from workflow import (
+    FundScore,
+    _notify,
+    batch_splitter,
+    filter_data,
+    get_fund_catalog,
+    get_gdoc_content,
+    get_llm,
+    plan_batches,
+    process_batch,
+    setup_gdocs,
+)
+from services.profiling import NULL_RUN, profile_run
+
+# Versão do workflow de seleção de fundos como grafo do LangGraph:
+#
+#   load (catálogo + filtro + plano de lotes) → score_batch × N (Send) → gather → ... → normalize → select
+#
+# Cada lote é uma tarefa própria (Send): o primeiro roda sozinho (suas notas servem de
+# referência) e os demais em ondas de até max_workers tarefas. O LangGraph grava o
+# resultado de cada tarefa como pending write assim que ela termina (DynamoDBSaver por
+# padrão), então se a execução cair no meio de uma onda, rodar de novo com o mesmo
+# thread_id pontua só os lotes que ainda não tinham resultado gravado.
+#
+# O catálogo é filtrado no próprio nó de carga: só os fundos filtrados entram no estado
+# (e nos metadados dos checkpoints, que guardam os writes de cada nó).
+#
+# O JobManager usa este grafo no lugar de run_fund_selection_workflow com
+# WALTER_JOBS_CHECKPOINTS=1 (services/jobs.py), com o id do job como thread_id. O perfil
+# (parâmetro "profile" ou WALTER_PROFILE) cobre as etapas dos nós executados neste processo:
+# numa retomada, só o que faltava.
+
+CHECKPOINT_TABLE = os.getenv("WALTER_CHECKPOINT_TABLE", "walter_checkpoints")
+CHECKPOINT_WRITES_TABLE = os.getenv("WALTER_CHECKPOINT_WRITES_TABLE", "walter_checkpoint_writes")
+CHECKPOINT_REGION = os.getenv("WALTER_CHECKPOINT_REGION", "us-east-1")
+# DynamoDB Local / moto server (ex.: http://localhost:8000)
+CHECKPOINT_ENDPOINT_URL = os.getenv("WALTER_CHECKPOINT_ENDPOINT_URL")
+# Procura checkpoints no formato antigo de chave; desligar depois de rodar migrate_checkpoint_keys
+CHECKPOINT_LEGACY_KEYS = os.getenv("WALTER_CHECKPOINT_LEGACY_KEYS", "1") != "0"
+
+# Um lote que falha é tentado de novo nas próximas ondas; depois disso fica vazio
+MAX_BATCH_ATTEMPTS = 3
+
+AI_COLUMNS = ["name", "investment_geography", "prefered_industry_enriched", "description", "observations"]
+
+
+def _merge_dicts(left: Dict, right: Dict) -> Dict:
+    return {**(left or {}), **(right or {})}
+
+
+class FundSelectionState(TypedDict, total=False):
+    inputs: Dict[str, Any]
+    parameters: Dict[str, Any]
+    model: str
+    gdoc_content: Optional[Dict[str, str]]
+    funds: List[Dict[str, Any]]
+    plan: Dict[str, Any]
+    total_batches: int
+    # Resultados por lote (chave = índice do lote); cada tarefa grava só o seu
+    batch_results: Annotated[Dict[str, List[Dict[str, Any]]], _merge_dicts]
+    batch_attempts: Annotated[Dict[str, int], _merge_dicts]
+    # (tamanho, segundos) dos lotes pontuados, para o perfil de latência do planner
+    batch_timings: Annotated[Dict[str, List[float]], _merge_dicts]
+    normalized_scores: List[Dict[str, Any]]
+    top_funds: List[Dict[str, Any]]
+    fund_names: List[str]
+
+
+class BatchTask(TypedDict):
+    """Entrada de uma tarefa score_batch (enviada com Send)."""
+    index: int
+    total_batches: int
+    funds: List[Dict[str, Any]]
+    inputs: Dict[str, Any]
+    parameters: Dict[str, Any]
+    model: str
+    gdoc_content: Optional[Dict[str, str]]
+    previous_scores: List[Dict[str, Any]]
+    attempts: int
+
+
+def make_load_node(progress_callback=None, profiler=NULL_RUN):
+    def load_node(state: FundSelectionState) -> FundSelectionState:
+        parameters = dict(state["parameters"])
+        _notify(progress_callback, {"type": "stage", "stage": "load"})
+        with profiler.stage("load"):
+            catalog = get_fund_catalog()
+
+        _notify(progress_callback, {"type": "stage", "stage": "filter"})
+        with profiler.stage("filter"):
+            filtered_df = filter_data(catalog, state["inputs"])
+
+        gdoc_content = None
+        if parameters.get("gdoc_id") and parameters.get("use_docs"):
+            try:
+                with profiler.stage("gdoc"):
+                    gdoc_content = get_gdoc_content(setup_gdocs(), parameters["gdoc_id"])
+            except Exception as e:
+                print(f"Erro ao carregar o Google Doc: {e}")
+
+        # Mesmo plano de lotes do workflow sem checkpoints (auto_tune incluído)
+        plan = plan_batches(filtered_df, state["inputs"], parameters, state.get("model", "o3"), gdoc_content)
+        parameters["batch_size"], parameters["max_workers"] = plan.batch_size, plan.max_workers
+        funds = filtered_df[AI_COLUMNS].to_dict(orient="records")
+        return {
+            "funds": funds,
+            "gdoc_content": gdoc_content,
+            "parameters": parameters,
+            "plan": plan.to_dict(),
+            "total_batches": math.ceil(len(funds) / plan.batch_size),
+        }
+
+    return load_node
+
+
+def score_batch_node(task: BatchTask) -> FundSelectionState:
+    import pandas as pd
+
+    key = str(task["index"])
+    started = time.perf_counter()
+    try:
+        scores = process_batch(
+            pd.DataFrame(task["funds"], columns=AI_COLUMNS),
+            task["inputs"],
+            task["parameters"],
+            get_llm(task["model"]),
+            previous_scores=[FundScore(**s) for s in task["previous_scores"]] or None,
+            gdoc_content=task["gdoc_content"],
+            batch_index=task["index"],
+            total_batches=task["total_batches"],
+            raise_on_error=True,
+        )
+    except Exception as e:
+        attempts = task["attempts"] + 1
+        print(f"Erro no lote {key} (tentativa {attempts}/{MAX_BATCH_ATTEMPTS}): {e}")
+        if attempts < MAX_BATCH_ATTEMPTS:
+            return {"batch_attempts": {key: attempts}}
+        return {"batch_attempts": {key: attempts}, "batch_results": {key: []}}
+    return {
+        "batch_results": {key: [s.model_dump() for s in scores]},
+        "batch_timings": {key: [len(task["funds"]), time.perf_counter() - started]},
+    }
+
+
+def gather_node(state: FundSelectionState) -> FundSelectionState:
+    # Junta as tarefas de uma onda: o roteamento roda uma vez, com todos os resultados dela
+    return {}
+
+
+def route_batches(state: FundSelectionState):
+    """Send de uma tarefa por lote pendente (o lote 0 antes dos demais) ou "normalize"."""
+    from langgraph.types import Send
+
+    parameters = state["parameters"]
+    done = state.get("batch_results") or {}
+    attempts = state.get("batch_attempts") or {}
+    batches = batch_splitter(state["funds"], parameters["batch_size"])
+    pending = [i for i in range(len(batches)) if str(i) not in done]
+    if not pending:
+        return "normalize"
+
+    if pending[0] == 0:
+        wave = [0]
+    else:
+        wave = pending[:parameters.get("max_workers", 4)]
+    return [
+        Send("score_batch", BatchTask(
+            index=index,
+            total_batches=len(batches),
+            funds=batches[index],
+            inputs=state["inputs"],
+            parameters=parameters,
+            model=state.get("model", "o3"),
+            gdoc_content=state.get("gdoc_content"),
+            previous_scores=done.get("0", []),
+            attempts=attempts.get(str(index), 0),
+        ))
+        for index in wave
+    ]
+
+
+def normalize_node(state: FundSelectionState) -> FundSelectionState:
+    from score_table import ScoreTable
+
+    results = state.get("batch_results") or {}
+    raw_scores = [s for key in sorted(results, key=int) for s in results[key]]
+    return {"normalized_scores": ScoreTable.from_fund_scores(raw_scores).normalize().to_records()}
+
+
+def select_node(state: FundSelectionState) -> FundSelectionState:
+    from score_table import ScoreTable
+
+    surviving_percentage = state["parameters"].get("surviving_percentage", 0.5)
+    top_table = ScoreTable.from_fund_scores(state["normalized_scores"]).top_fraction(surviving_percentage)
+    return {"top_funds": top_table.to_records(), "fund_names": top_table.names.tolist()}
+
+
+def build_fund_selection_graph(checkpointer=None, progress_callback=None, profiler=NULL_RUN):
+    from langgraph.graph import END, START, StateGraph
+
+    def stage(name, node):
+        def wrapped(state):
+            _notify(progress_callback, {"type": "stage", "stage": name})
+            with profiler.stage(name):
+                return node(state)
+        return wrapped
+
+    def score_batch(task: BatchTask) -> FundSelectionState:
+        # Lotes da mesma onda são etapas simultâneas: as amostras saem rotuladas "score+score"
+        with profiler.stage("score"):
+            return score_batch_node(task)
+
+    builder = StateGraph(FundSelectionState)
+    builder.add_node("load", make_load_node(progress_callback, profiler))
+    builder.add_node("score_batch", score_batch)
+    builder.add_node("gather", gather_node)
+    builder.add_node("normalize", stage("normalize", normalize_node))
+    builder.add_node("select", stage("select", select_node))
+
+    builder.add_edge(START, "load")
+    builder.add_conditional_edges("load", route_batches, ["score_batch", "normalize"])
+    builder.add_edge("score_batch", "gather")
+    builder.add_conditional_edges("gather", route_batches, ["score_batch", "normalize"])
+    builder.add_edge("normalize", "select")
+    builder.add_edge("select", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def get_checkpointer():
+    """DynamoDBSaver configurado pelas variáveis WALTER_CHECKPOINT_*."""
+    from database.dynamo_db_memory import DynamoDBSaver
+
+    return DynamoDBSaver(
+        table_name=CHECKPOINT_TABLE,
+        writes_table_name=CHECKPOINT_WRITES_TABLE,
+        region_name=CHECKPOINT_REGION,
+        endpoint_url=CHECKPOINT_ENDPOINT_URL,
+        legacy_key_fallback=CHECKPOINT_LEGACY_KEYS,
+    )
+
+
+def run_fund_selection_graph(inputs, parameters, thread_id=None, checkpointer=None, model="o3", progress_callback=None):
+    """
+    Executa (ou retoma) o workflow de seleção de fundos com checkpoints.
+
+    Args:
+        inputs: Dados da empresa e da rodada
+        parameters: Parâmetros de geração
+        thread_id: Identificador da execução; reutilize-o para retomar após uma falha
+        checkpointer: Checkpointer do LangGraph (padrão: DynamoDBSaver via get_checkpointer)
+        model: Modelo usado para pontuar
+        progress_callback: Mesmo formato de eventos de run_fund_selection_workflow; os
+            eventos "batch" saem depois que o resultado do lote foi entregue ao checkpointer,
+            e os de lotes recuperados do checkpoint na retomada vêm com "resumed": True
+
+    Returns:
+        Dicionário com "top_funds" (lista de FundScore), "fund_names", "plan" e "thread_id";
+        com o perfil ligado, também "profile" (como em run_fund_selection_workflow)
+    """
+    from services.batch_planner import get_batch_planner
+
+    thread_id = thread_id or uuid.uuid4().hex
+    checkpointer = checkpointer if checkpointer is not None else get_checkpointer()
+    profiler = profile_run("workflow", parameters.get("profile"))
+    graph = build_fund_selection_graph(checkpointer, progress_callback, profiler)
+
+    # Dois passos do grafo por onda de lotes; o limite padrão (25) é pequeno para runs grandes
+    config = {"configurable": {"thread_id": thread_id}, "recursion_limit": 1000}
+
+    try:
+        snapshot = graph.get_state(config)
+        finished = not snapshot.next and snapshot.values.get("fund_names") is not None
+        # Se todas as tarefas do passo interrompido já gravaram o resultado, snapshot.next vem
+        # vazio: o que indica a retomada é haver checkpoint de um run não terminado
+        if snapshot.values and not finished:
+            print(f"Retomando execução {thread_id} a partir de {snapshot.next or [t.name for t in snapshot.tasks]}")
+            graph_input = None
+        else:
+            graph_input = {"inputs": inputs, "parameters": {"max_workers": 4, **parameters}, "model": model}
+
+        if not finished:
+            started = time.perf_counter()
+            total_batches = snapshot.values.get("total_batches")
+            reported = set()
+
+            def notify_batches(results, resumed):
+                for key, scores in (results or {}).items():
+                    if key in reported:
+                        continue
+                    reported.add(key)
+                    _notify(progress_callback, {
+                        "type": "batch",
+                        "batch_index": int(key),
+                        "total_batches": total_batches,
+                        "scores": scores,
+                        "resumed": resumed,
+                    })
+
+            # Na retomada, os lotes que já estavam no checkpoint (passos concluídos e tarefas
+            # do passo interrompido que chegaram a gravar) saem primeiro, como recuperados
+            if graph_input is None and snapshot.values.get("funds") is not None:
+                _notify(progress_callback, {"type": "stage", "stage": "score",
+                                            "total_funds": len(snapshot.values["funds"])})
+                notify_batches(snapshot.values.get("batch_results"), True)
+                for task in snapshot.tasks:
+                    notify_batches((task.result or {}).get("batch_results"), True)
+            with profiler, closing(graph.stream(graph_input, config, stream_mode="updates")) as updates:
+                for update in updates:
+                    # Tarefas cujo resultado já estava no checkpoint são repassadas com __metadata__.cached
+                    resumed = update.get("__metadata__", {}).get("cached", False)
+                    for node, values in update.items():
+                        if node == "load":
+                            total_batches = values["total_batches"]
+                            _notify(progress_callback, {"type": "plan", **values["plan"]})
+                            _notify(progress_callback, {"type": "stage", "stage": "score",
+                                                        "total_funds": len(values["funds"])})
+                        elif node == "score_batch":
+                            notify_batches(values.get("batch_results"), resumed)
+            actual_seconds = round(time.perf_counter() - started, 1)
+        state = graph.get_state(config).values
+    finally:
+        # Com WALTER_CHECKPOINT_WRITE_BEHIND os checkpoints ficam em buffer: grava tudo, mesmo se o run falhar
+        flush = getattr(checkpointer, "flush", None)
+        if flush is not None:
+            flush()
+
+    plan = dict(state.get("plan") or {})
+    if not finished and plan:
+        plan["actual_seconds"] = actual_seconds
+        get_batch_planner().record(plan["model"], [tuple(t) for t in (state.get("batch_timings") or {}).values()])
+
+    result = {
+        "top_funds": [FundScore(**f) for f in state["top_funds"]],
+        "fund_names": state["fund_names"],
+        "plan": plan,
+        "thread_id": thread_id,
+    }
+    if profiler.enabled and not finished:
+        result["profile"] = profiler.summary()
+    return result